@@ -0,0 +1,399 @@
+from copy import copy
+from multiprocessing import Process, Queue
+from queue import Empty
+from random import choice, sample, seed
+from sys import stdout
+from time import time
+from traceback import format_exc
+
+import numpy as np
+from algorithm.parameters import params
+from fitness.evaluation import evaluate_fitness
+from operators.initialisation import initialisation
+from stats.stats import print_generation_stats, stats, update_stats
+from utilities.algorithm.initialise_run import pool_init
+from utilities.stats import trackers
+from utilities.stats.file_io import save_best_ind_to_file, \
+    save_stats_headers, save_stats_to_file
+from utilities.stats.save_plots import save_plot_from_data
+
+# Stats which are merged across islands, and how they are merged. Stats
+# which have been removed from the run by clean_stats are skipped.
+MERGED_STATS = {
+    'total_inds': np.sum,
+    'regens': np.sum,
+    'invalids': np.sum,
+    'runtime_error': np.sum,
+    'unique_inds': np.sum,
+    'subtree_cache_hits': np.sum,
+    'subtree_cache_misses': np.sum,
+    'ave_genome_length': np.mean,
+    'max_genome_length': np.max,
+    'min_genome_length': np.min,
+    'ave_used_codons': np.mean,
+    'max_used_codons': np.max,
+    'min_used_codons': np.min,
+    'ave_tree_depth': np.mean,
+    'max_tree_depth': np.max,
+    'min_tree_depth': np.min,
+    'ave_tree_nodes': np.mean,
+    'max_tree_nodes': np.max,
+    'min_tree_nodes': np.min,
+    'ave_fitness': np.nanmean,
+}
+
+
+def search_loop():
+    """
+    An island model search process for an evolutionary algorithm. ISLANDS
+    sub-populations of POPULATION_SIZE individuals each are evolved in
+    separate processes, each using the normal step function. Every
+    MIGRATION_INTERVAL generations, each island sends MIGRATION_SIZE
+    emigrants to its neighbours in the MIGRATION_TOPOLOGY, and takes in any
+    immigrants which have arrived from its own neighbours according to the
+    MIGRATION_POLICY. Islands never wait for one another.
+
+    Islands report their stats to the main process after every generation.
+    Once all islands have finished a generation, their stats are merged
+    into global stats, along with the best and average fitness of each
+    island, and saved as usual. If an island fails, the other islands are
+    stopped.
+
+    :return: The final populations of all islands combined.
+    """
+
+    if hasattr(params['FITNESS_FUNCTION'], 'multi_objective'):
+        s = "algorithm.island_model.search_loop\n" \
+            "Error: the island model does not support multiple objective " \
+            "optimisation."
+        raise Exception(s)
+
+    if params['MULTICORE']:
+        s = "algorithm.island_model.search_loop\n" \
+            "Error: the island model already uses one process per island.\n" \
+            "       MULTICORE cannot be used with the island model."
+        raise Exception(s)
+
+    if params['MIGRATION_TOPOLOGY'] not in ("ring", "random", "full"):
+        s = "algorithm.island_model.search_loop\n" \
+            "Error: unknown migration topology '%s'.\n" \
+            "       Valid topologies are 'ring', 'random' and 'full'." \
+            % params['MIGRATION_TOPOLOGY']
+        raise Exception(s)
+
+    if params['MIGRATION_POLICY'] not in ("best_worst", "best_random",
+                                          "random_worst", "random_random"):
+        s = "algorithm.island_model.search_loop\n" \
+            "Error: unknown migration policy '%s'.\n" \
+            "       Valid policies are 'best_worst', 'best_random', " \
+            "'random_worst' and 'random_random'." % params['MIGRATION_POLICY']
+        raise Exception(s)
+
+    # Each island has an inbox of immigrants. All islands report to the
+    # main process through a single queue.
+    inboxes = [Queue() for _ in range(params['ISLANDS'])]
+    reports = Queue()
+
+    islands = [Process(target=island, args=(i, inboxes, reports, params))
+               for i in range(params['ISLANDS'])]
+
+    for process in islands:
+        process.start()
+
+    # Reports of each generation, by generation and island.
+    received = {}
+    generation, finished = 0, 0
+    individuals, unique, subtree_cache = [], 0, [0, 0]
+
+    try:
+        while finished < params['ISLANDS']:
+            try:
+                message = reports.get(timeout=1)
+
+            except Empty:
+                if any([p.exitcode not in (None, 0) for p in islands]):
+                    s = "algorithm.island_model.search_loop\n" \
+                        "Error: an island process has died unexpectedly."
+                    raise Exception(s)
+                continue
+
+            if message[0] == "generation":
+                _, index, gen, island_stats, best = message
+                received.setdefault(gen, {})[index] = (island_stats, best)
+
+                while len(received.get(generation, {})) == params['ISLANDS']:
+                    # All islands have finished this generation.
+                    get_island_stats(generation, received.pop(generation))
+                    generation += 1
+
+            elif message[0] == "end":
+                _, index, population, runtime_errors, island_unique, \
+                    island_subtree_cache = message
+                individuals.extend(population)
+                trackers.runtime_error_cache.extend(runtime_errors)
+                unique += island_unique
+                subtree_cache = [a + b for a, b in zip(subtree_cache,
+                                                       island_subtree_cache)]
+                finished += 1
+
+            else:
+                _, index, error = message
+                s = "algorithm.island_model.search_loop\n" \
+                    "Error: an exception was raised on island %d.\n%s" \
+                    % (index, error)
+                raise Exception(s)
+
+    except BaseException:
+        # Stop the other islands, which would otherwise run on after the
+        # run has failed.
+        for process in islands:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        raise
+
+    for process in islands:
+        process.join()
+
+    # The final population is made up of all islands. The final stats cover
+    # all islands through the counts merged from them.
+    trackers.merged_stats = {'total_inds': stats['total_inds'],
+                             'unique_inds': unique,
+                             'subtree_cache_hits': subtree_cache[0],
+                             'subtree_cache_misses': subtree_cache[1]}
+
+    return individuals
+
+
+def island(index, inboxes, reports, params_):
+    """
+    Run the evolutionary process of a single island. Runs in a separate
+    process.
+
+    :param index: The index of the island.
+    :param inboxes: A list of the queues of immigrants of all islands.
+    :param reports: The queue of reports to the main process.
+    :param params_: The parameters of the run.
+    :return: Nothing.
+    """
+
+    # Set the parameters on Windows, where the process does not inherit them.
+    pool_init(params_)
+
+    try:
+        # Islands do not save or print anything themselves.
+        params['DEBUG'], params['SILENT'], params['VERBOSE'] = True, True, \
+                                                                False
+
+        # Every island needs its own random numbers, from both random and
+        # numpy, which forked processes would otherwise share.
+        seed(params['RANDOM_SEED'] + index)
+        np.random.seed(params['RANDOM_SEED'] + index)
+
+        if trackers.cache.file_name:
+            # Database connections cannot be shared between processes.
+            trackers.cache.open()
+
+        # Initialise and evaluate the population.
+        individuals = initialisation(params['POPULATION_SIZE'])
+        individuals = evaluate_fitness(individuals)
+
+        report_island(index, individuals, reports)
+
+        for generation in range(1, (params['GENERATIONS'] + 1)):
+            stats['gen'] = generation
+
+            # New generation
+            individuals = params['STEP'](individuals)
+
+            if generation % params['MIGRATION_INTERVAL'] == 0:
+                individuals = migrate(index, individuals, inboxes)
+
+            report_island(index, individuals, reports)
+
+        if trackers.cache.file_name:
+            trackers.cache.close()
+
+        # Do not wait for emigrants to be taken in by islands which have
+        # already finished.
+        for inbox in inboxes:
+            inbox.cancel_join_thread()
+
+        reports.put(("end", index, individuals, trackers.runtime_error_cache,
+                     len(trackers.cache), (trackers.subtree_cache.hits,
+                                           trackers.subtree_cache.misses)))
+
+    except BaseException:
+        reports.put(("error", index, format_exc()))
+
+
+def report_island(index, individuals, reports):
+    """
+    Report the stats and the best individual of the current generation of
+    an island to the main process.
+
+    :param index: The index of the island.
+    :param individuals: The population of the island.
+    :param reports: The queue of reports to the main process.
+    :return: Nothing.
+    """
+
+    best = max(individuals)
+
+    if not trackers.best_ever or best > trackers.best_ever:
+        trackers.best_ever = best
+
+    update_stats(individuals, False)
+
+    reports.put(("generation", index, stats['gen'],
+                 {key: stats[key] for key in MERGED_STATS if key in stats},
+                 trackers.best_ever))
+
+
+def migrate(index, individuals, inboxes):
+    """
+    Send emigrants from an island to its neighbours, and replace individuals
+    on the island with any immigrants which have arrived. Islands do not
+    wait for immigrants; immigrants which have not arrived yet are taken in
+    at the next migration.
+
+    :param index: The index of the island.
+    :param individuals: The population of the island.
+    :param inboxes: A list of the queues of immigrants of all islands.
+    :return: The population of the island after migration.
+    """
+
+    emigrant_policy, replacement_policy = params['MIGRATION_POLICY'].split("_")
+    size = min(params['MIGRATION_SIZE'], len(individuals))
+
+    # Choose emigrants.
+    if emigrant_policy == "best":
+        emigrants = sorted(individuals, reverse=True)[:size]
+    else:
+        emigrants = sample(individuals, size)
+
+    for target in get_neighbours(index):
+        inboxes[target].put(emigrants)
+
+    # Collect all immigrants which have arrived.
+    immigrants = []
+    while True:
+        try:
+            immigrants.extend(inboxes[index].get_nowait())
+        except Empty:
+            break
+
+    immigrants = immigrants[:len(individuals)]
+
+    # Replace individuals with immigrants.
+    if replacement_policy == "worst":
+        individuals.sort(reverse=True)
+        replaced = range(len(individuals) - len(immigrants), len(individuals))
+    else:
+        replaced = sample(range(len(individuals)), len(immigrants))
+
+    for i, immigrant in zip(replaced, immigrants):
+        individuals[i] = immigrant
+
+    return individuals
+
+
+def get_neighbours(index):
+    """
+    Get the islands to which an island sends emigrants, according to the
+    migration topology.
+
+    :param index: The index of the island.
+    :return: A list of the indices of the neighbouring islands.
+    """
+
+    others = [i for i in range(params['ISLANDS']) if i != index]
+
+    if not others:
+        return []
+
+    elif params['MIGRATION_TOPOLOGY'] == "ring":
+        return [(index + 1) % params['ISLANDS']]
+
+    elif params['MIGRATION_TOPOLOGY'] == "random":
+        return [choice(others)]
+
+    return others
+
+
+def get_island_stats(generation, island_reports):
+    """
+    Merge the stats of all islands for a generation into the global stats.
+    Save statistics to utilities.trackers.stats_list and to file. Print
+    statistics. Save fitness plot information.
+
+    :param generation: The generation.
+    :param island_reports: A dictionary of the stats and best individual of
+    each island, by island index.
+    :return: Nothing.
+    """
+
+    stats['gen'] = generation
+
+    # Merge the stats of all islands.
+    for key, merge in MERGED_STATS.items():
+        if key in stats:
+            stats[key] = merge([island_reports[i][0][key] for i in
+                                sorted(island_reports)])
+
+    if params['CACHE']:
+        stats['unused_search'] = 100 - stats['unique_inds'] / \
+                                 stats['total_inds'] * 100
+
+    # Get best individual over all islands.
+    for i in sorted(island_reports):
+        island_stats, best = island_reports[i]
+
+        if not trackers.best_ever or best > trackers.best_ever:
+            trackers.best_ever = best
+
+        stats['island_%d_best_fitness' % i] = best.fitness
+        stats['island_%d_ave_fitness' % i] = island_stats['ave_fitness']
+
+    stats['best_fitness'] = trackers.best_ever.fitness
+
+    # Time Stats
+    trackers.time_list.append(time() - stats['time_adjust'])
+    stats['time_taken'] = trackers.time_list[-1] - trackers.time_list[-2]
+    stats['total_time'] = trackers.time_list[-1] - trackers.time_list[0]
+
+    # Save fitness plot information
+    if params['SAVE_PLOTS'] and not params['DEBUG']:
+        trackers.best_fitness_list.append(trackers.best_ever.fitness)
+
+        if params['VERBOSE']:
+            save_plot_from_data(trackers.best_fitness_list, "best_fitness")
+
+    # Print statistics
+    if params['VERBOSE']:
+        print_generation_stats()
+
+    elif not params['SILENT']:
+        # Print simple display output.
+        perc = stats['gen'] / (params['GENERATIONS'] + 1) * 100
+        stdout.write("Evolution: %d%% complete\r" % perc)
+        stdout.flush()
+
+    # Save stats to list.
+    if params['VERBOSE'] or not params['DEBUG']:
+        trackers.stats_list.append(copy(stats))
+
+    # Save stats to file.
+    if not params['DEBUG']:
+
+        if stats['gen'] == 0:
+            save_stats_headers(stats)
+
+        save_stats_to_file(stats)
+
+        if params['SAVE_ALL']:
+            save_best_ind_to_file(stats, trackers.best_ever, False,
+                                  stats['gen'])
+
+        elif params['VERBOSE']:
+            save_best_ind_to_file(stats, trackers.best_ever)
@@ -10,6 +10,14 @@ params = {
     # Set default step and search loop functions
     'SEARCH_LOOP': 'search_loop',
     'STEP': 'step',
+    # For the asynchronous steady-state search loop (search_loop_async), the
+    # number of evaluations which are kept running at once. None means twice
+    # the number of cores.
+    'ASYNC_IN_FLIGHT': None,
+    # For the asynchronous steady-state search loop, the number of finished
+    # evaluations between reports of statistics. None means the population
+    # size.
+    'REPORT_INTERVAL': None,
 
     # Evolutionary Parameters
     'POPULATION_SIZE': 500,
@@ -30,6 +38,30 @@ params = {
     'DATASET_TRAIN': "Vladislavleva4/Train.txt",
     'DATASET_TEST': None,
     'DATASET_DELIMITER': None,
+    # Memory layout of input data: "F" stores each column (i.e. x[:, 0])
+    # contiguously, "C" stores each row contiguously.
+    'DATASET_ORDER': "F",
+    # Data type of floating point datasets, e.g. "float32" to halve the
+    # memory used by the dataset.
+    'DATASET_DTYPE': "float64",
+    # Parse datasets only once, save them as binary (.npy) files, and load
+    # them as memory maps shared by all processes in later runs.
+    'DATASET_CACHE': False,
+    # Directory of the binary dataset files. None saves them next to the
+    # dataset files.
+    'DATASET_CACHE_DIR': None,
+    # Check the contents of the dataset files, rather than only their size
+    # and modification time, before their binary files are used.
+    'DATASET_CACHE_VERIFY': False,
+    # Evaluate Boolean problems on truth tables packed into 64-bit words,
+    # scoring 64 fitness cases per bitwise operation.
+    'BITSLICE': False,
+    # Save the test suites generated for regex seeds to disk, and load them
+    # in later runs rather than generating them again.
+    'REGEX_TEST_CACHE': False,
+    # Directory of the saved regex test suites. None saves them in the
+    # "seeds" folder.
+    'REGEX_TEST_CACHE_DIR': None,
 
     # Set grammar file
     'GRAMMAR_FILE': "supervised_learning/Vladislavleva4.bnf",
@@ -44,6 +76,64 @@ params = {
 
     # Optimise constants in the supervised_learning fitness function.
     'OPTIMIZE_CONSTANTS': False,
+    # How the gradient of the loss with respect to the constants is found:
+    # "analytic" derives it from the phenotype (falling back to finite
+    # differences where it cannot), "finite" uses finite differences.
+    'CONSTANTS_GRADIENT': "analytic",
+    # Optimise the constants of a whole population as a batch. Individuals
+    # whose phenotypes only differ in the numbering of their constants are
+    # optimised once, and with MULTICORE the batch is split evenly over the
+    # pool of workers.
+    'BATCH_OPTIMIZE_CONSTANTS': False,
+    # Keep the optimised constants and loss of each structural form of
+    # phenotype (i.e. the phenotype with its constants made consecutive),
+    # so that forms which are seen again are not optimised again. With
+    # MULTICORE, each worker process keeps its own cache.
+    'CONSTANTS_CACHE': False,
+    # The maximum number of forms in the constants cache. None means the
+    # cache is unbounded.
+    'CONSTANTS_CACHE_SIZE': 100000,
+    # Start the optimisation of the constants of a child from the optimised
+    # constants of its parent, if it has the same number of constants.
+    'CONSTANTS_WARM_START': False,
+    # Budgets for the optimisation of constants. Every individual in a
+    # population is first scored at its initial constants, and only the
+    # most promising are then optimised: the best CONSTANTS_TOP_K, the best
+    # fraction CONSTANTS_TOP_FRACTION, and only for as long as
+    # CONSTANTS_TIME_BUDGET seconds per generation. None means no limit.
+    # Any budget implies BATCH_OPTIMIZE_CONSTANTS and CONSTANTS_CACHE. With
+    # MULTICORE, budgets apply to the share of the population of each
+    # worker process.
+    'CONSTANTS_TOP_K': None,
+    'CONSTANTS_TOP_FRACTION': None,
+    'CONSTANTS_TIME_BUDGET': None,
+
+    # Evaluation engine for the supervised_learning fitness function.
+    # "eval" evaluates each phenotype on its own, "dag" evaluates whole
+    # populations at once as an expression DAG in which sub-expressions
+    # shared between individuals are only evaluated once.
+    'EVALUATION_ENGINE': "eval",
+
+    # Keep the output arrays of subtrees on the training set across
+    # generations, so that only the parts of a phenotype which have changed
+    # are evaluated. Implies the "dag" evaluation engine. With MULTICORE,
+    # each worker process keeps its own cache, which is not counted in the
+    # stats of the main process.
+    'SUBTREE_CACHE': False,
+    # The maximum memory used by the subtree cache, in megabytes.
+    'SUBTREE_CACHE_SIZE': 256,
+
+    # Measure training fitness on samples of the training data: None (the
+    # full training data), "minibatch", "interleaved" or "racing". See
+    # fitness.supervised_learning.supervised_learning.
+    'SUBSAMPLE': None,
+    # The fraction of the training data in each sample.
+    'SUBSAMPLE_SIZE': 0.1,
+    # The number of chunks of the training data used for racing.
+    'RACING_CHUNKS': 4,
+    # The threshold which racing individuals must beat: "tournament" or
+    # "elite".
+    'RACING_THRESHOLD': "tournament",
 
     # Specify target for target problems
     'TARGET': "ponyge_rocks",
@@ -131,6 +221,31 @@ params = {
     'MULTICORE': False,
     # Set the number of cpus to be used for multiprocessing
     'CORES': cpu_count(),
+    # Share a fitness cache between all workers of the multicore pool.
+    # Workers check the shared cache before evaluating an individual, and
+    # await the result of any other worker which is already evaluating the
+    # same phenotype. The size and eviction policy are set by CACHE_SIZE and
+    # CACHE_EVICTION.
+    'SHARED_CACHE': False,
+    # Address ("host:port") on which to listen for network workers. If set,
+    # individuals are evaluated by workers started with
+    # "ponyge.py --worker host:port" rather than by a local pool, and
+    # MULTICORE is turned on. CORES should then be set to the number of
+    # workers, as it is used to divide up the work.
+    'BROKER': None,
+    # Address ("host:port") of a broker. If set, this process runs as a
+    # network worker for that broker rather than running evolution.
+    'WORKER': None,
+    # Key which workers need in order to connect to a broker. Jobs are
+    # pickled, so only use the broker on a trusted network.
+    'BROKER_AUTHKEY': "ponyge2",
+    # Maximum number of jobs in flight on each network worker.
+    'BROKER_IN_FLIGHT': 2,
+    # Number of seconds between heartbeats sent by network workers.
+    'HEARTBEAT_INTERVAL': 1.0,
+    # Number of seconds after which a network worker which has not been
+    # heard from is dropped, and its jobs are re-queued.
+    'HEARTBEAT_TIMEOUT': 10.0,
 
     # STATE SAVING/LOADING
     # Save the state of the evolutionary run every generation. You can
@@ -174,6 +289,23 @@ params = {
     # with mutated versions of the original individual. Hopefully this will
     # encourage diversity in the population.
     'MUTATE_DUPLICATES': False,
+    # Set the maximum number of entries held in the cache in memory. None
+    # means the cache can grow indefinitely.
+    'CACHE_SIZE': None,
+    # Set the policy for evicting entries from a full cache. Either "lru"
+    # (least recently used) or "lfu" (least frequently used).
+    'CACHE_EVICTION': "lru",
+    # Specify an SQLite database file in which all cache entries are
+    # stored. Entries evicted from memory are looked up again from disk, and
+    # later runs on the same problem can warm-start from the cache of
+    # earlier runs.
+    'CACHE_FILE': None,
+    # Key cache entries by a 128-bit digest of the phenotype rather than by
+    # the phenotype string itself. Saves memory with long phenotypes.
+    'CACHE_DIGEST': False,
+    # Also store the full phenotype of each cache entry and check it on
+    # lookup, to guard against digest collisions. Requires CACHE_DIGEST.
+    'CACHE_DIGEST_VERIFY': False,
 
     # MULTI-AGENT Parameters
     # True or False for multi-agent
@@ -184,6 +316,24 @@ params = {
     # each other
     'INTERACTION_PROBABILITY': 0.5,
 
+    # ISLAND MODEL Parameters
+    # For the island model search loop (island_model.search_loop), the
+    # number of islands. Each island is a sub-population of POPULATION_SIZE
+    # individuals evolved in a separate process.
+    'ISLANDS': cpu_count(),
+    # Number of generations between migrations.
+    'MIGRATION_INTERVAL': 10,
+    # Number of individuals which emigrate from each island per migration.
+    'MIGRATION_SIZE': 1,
+    # Islands to which each island sends emigrants. Either "ring" (the next
+    # island), "random" (a random island) or "full" (all other islands).
+    'MIGRATION_TOPOLOGY': "ring",
+    # How emigrants are chosen and which individuals are replaced by
+    # immigrants, as "<emigrants>_<replaced>". Emigrants are either the
+    # "best" or "random" individuals, and immigrants replace either the
+    # "worst" or "random" individuals, e.g. "best_worst".
+    'MIGRATION_POLICY': "best_worst",
+
     # OTHER
     # Set machine name (useful for doing multiple runs)
     'MACHINE': machine_name
@@ -270,6 +420,22 @@ def set_params(command_line_args, create_files=True):
     # NOTE that command line arguments overwrite all previously set parameters.
     params.update(cmd_args)
 
+    if params['WORKER']:
+        # Network workers take on the parameters of the run from the broker.
+        return
+
+    if params['BROKER']:
+        # Evaluate individuals in parallel on network workers.
+        params['MULTICORE'] = True
+
+    if params['CONSTANTS_TOP_K'] is not None or \
+            params['CONSTANTS_TOP_FRACTION'] is not None or \
+            params['CONSTANTS_TIME_BUDGET'] is not None:
+        # Budgets are shared out over whole populations, and optimised
+        # constants are kept so that they are not optimised again.
+        params['BATCH_OPTIMIZE_CONSTANTS'] = True
+        params['CONSTANTS_CACHE'] = True
+
     if params['LOAD_STATE']:
         # Load run from state.
         from utilities.algorithm.state import load_state
@@ -290,6 +456,16 @@ def set_params(command_line_args, create_files=True):
             params['STEP'] = "steady_state_step"
             params['GENERATION_SIZE'] = 2
 
+        elif params['SEARCH_LOOP'].split(".")[-1] == "search_loop_async":
+            # The asynchronous search loop breeds two children at a time.
+            params['GENERATION_SIZE'] = 2
+
+            # Elites are protected from generational replacement as in the
+            # generational search loop.
+            if params['ELITE_SIZE'] is None:
+                params['ELITE_SIZE'] = return_one_percent(1, params[
+                    'POPULATION_SIZE'])
+
         else:
             # Elite size is set to either 1 or 1% of the population size,
             # whichever is bigger if no elite size is previously set.
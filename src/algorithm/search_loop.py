@@ -1,11 +1,21 @@
+from heapq import nlargest
 from multiprocessing import Pool
+from queue import Queue
 
 from algorithm.parameters import params
-from fitness.evaluation import evaluate_fitness
+from fitness.evaluation import Payload, evaluate_fitness, evaluate_payload, \
+    record_evaluation
+from operators.crossover import crossover_inds
 from operators.initialisation import initialisation
+from operators.mutation import mutation
+from operators.replacement import generational, steady_state
+from operators.selection import selection
 from stats.stats import get_stats, stats
+from utilities.algorithm.broker import Broker
 from utilities.algorithm.initialise_run import pool_init
 from utilities.stats import trackers
+from utilities.stats.trackers import cache
+from utilities.stats.shared_cache import SharedCache
 
 
 def search_loop():
@@ -17,10 +27,9 @@ def search_loop():
     the specified number of generations.
     """
 
-    if params['MULTICORE']:
+    if uses_pool():
         # initialize pool once, if multi-core is enabled
-        params['POOL'] = Pool(processes=params['CORES'], initializer=pool_init,
-                              initargs=(params,))  # , maxtasksperchild=1)
+        start_pool()
 
     # Initialise population
     individuals = initialisation(params['POPULATION_SIZE'])
@@ -38,9 +47,9 @@ def search_loop():
         # New generation
         individuals = params['STEP'](individuals)
 
-    if params['MULTICORE']:
+    if uses_pool():
         # Close the workers pool (otherwise they'll live on forever).
-        params['POOL'].close()
+        close_pool()
 
     return individuals
 
@@ -56,10 +65,9 @@ def search_loop_from_state():
 
     individuals = trackers.state_individuals
 
-    if params['MULTICORE']:
+    if uses_pool():
         # initialize pool once, if multi-core is enabled
-        params['POOL'] = Pool(processes=params['CORES'], initializer=pool_init,
-                              initargs=(params,))  # , maxtasksperchild=1)
+        start_pool()
 
     # Traditional GE
     for generation in range(stats['gen'] + 1, (params['GENERATIONS'] + 1)):
@@ -68,8 +76,377 @@ def search_loop_from_state():
         # New generation
         individuals = params['STEP'](individuals)
 
+    if uses_pool():
+        # Close the workers pool (otherwise they'll live on forever).
+        close_pool()
+
+    return individuals
+
+
+def uses_pool():
+    """
+    Check whether the run uses a pool of workers for multi-core evaluation.
+    Fitness functions which evaluate individuals in parallel themselves
+    (i.e. set "parallel_evaluation = True") are not sent to a pool, so none
+    is started for them.
+
+    :return: Whether or not a pool of workers is used.
+    """
+
+    return params['MULTICORE'] and not \
+        getattr(params['FITNESS_FUNCTION'], 'parallel_evaluation', False)
+
+
+def start_pool():
+    """
+    Start the pool of workers used for multi-core evaluation. This is either
+    a local multiprocessing pool, or a broker which hands out evaluations to
+    workers over the network if BROKER is set.
+
+    :return: Nothing.
+    """
+
+    if params['BROKER']:
+        if params['SHARED_CACHE']:
+            s = "algorithm.search_loop.start_pool\n" \
+                "Error: the shared cache cannot be used with network " \
+                "workers."
+            raise Exception(s)
+
+        params['POOL'] = Broker(params['BROKER'], params['BROKER_AUTHKEY'],
+                                params['BROKER_IN_FLIGHT'],
+                                params['HEARTBEAT_TIMEOUT'])
+
+    else:
+        if params['SHARED_CACHE']:
+            # Start the shared cache before the pool so that workers can
+            # access it.
+            params['SHARED_CACHE'] = SharedCache(params['CACHE_SIZE'],
+                                                 params['CACHE_EVICTION'])
+
+        if hasattr(params['FITNESS_FUNCTION'], 'share_data'):
+            # Workers attach to the datasets in shared memory rather than
+            # each receiving its own copy.
+            params['FITNESS_FUNCTION'].share_data()
+
+        params['POOL'] = Pool(processes=params['CORES'], initializer=pool_init,
+                              initargs=(params,))  # , maxtasksperchild=1)
+
+
+def close_pool():
+    """
+    Close the pool of workers used for multi-core evaluation, the shared
+    cache if one is used, and the shared memory of the datasets.
+
+    :return: Nothing.
+    """
+
+    params['POOL'].close()
+
+    if params['SHARED_CACHE']:
+        params['SHARED_CACHE'].shutdown()
+
+    if hasattr(params['FITNESS_FUNCTION'], 'unlink_data'):
+        params['FITNESS_FUNCTION'].unlink_data()
+
+
+def search_loop_async():
+    """
+    An asynchronous steady-state search process for an evolutionary
+    algorithm. Rather than waiting for the slowest evaluation of each
+    generation, a new pair of children is bred from the current population
+    and submitted for evaluation as soon as a worker is free. Each evaluated
+    child is added to the population by a steady-state form of the
+    replacement operator (see replace_async).
+
+    The search runs for the same number of evaluations as a generational
+    run (i.e. POPULATION_SIZE * GENERATIONS). Statistics are reported every
+    REPORT_INTERVAL finished evaluations, with stats['gen'] counting the
+    number of reports. The context of the fitness function (e.g. the sample
+    of the training data) is updated at the same interval. Without multicore
+    evaluation, children are evaluated one at a time.
+
+    :return: The final population after the evolutionary process has run for
+    the specified number of evaluations.
+    """
+
+    if hasattr(params['FITNESS_FUNCTION'], 'multi_objective'):
+        s = "algorithm.search_loop.search_loop_async\n" \
+            "Error: the asynchronous search loop does not support " \
+            "multiple objective optimisation."
+        raise Exception(s)
+
+    if params['MULTICORE'] and \
+            getattr(params['FITNESS_FUNCTION'], 'parallel_evaluation', False):
+        s = "algorithm.search_loop.search_loop_async\n" \
+            "Error: the fitness function evaluates individuals in parallel " \
+            "itself.\n" \
+            "       Multi-core evaluation cannot be used with the " \
+            "asynchronous search loop."
+        raise Exception(s)
+
+    if params['REPLACEMENT'] not in (generational, steady_state):
+        s = "algorithm.search_loop.search_loop_async\n" \
+            "Error: the asynchronous search loop only supports generational " \
+            "and steady_state replacement."
+        raise Exception(s)
+
+    if params['MULTICORE']:
+        # initialize pool once, if multi-core is enabled
+        start_pool()
+
+    # Initialise population
+    individuals = initialisation(params['POPULATION_SIZE'])
+
+    # Evaluate initial population
+    individuals = evaluate_fitness(individuals)
+
+    # Generate statistics for run so far
+    get_stats(individuals)
+
+    budget = params['POPULATION_SIZE'] * params['GENERATIONS']
+    interval = params['REPORT_INTERVAL'] or params['POPULATION_SIZE']
+    max_in_flight = params['ASYNC_IN_FLIGHT'] or 2 * params['CORES']
+
+    # Results of evaluations by the pool of workers.
+    results = Queue()
+
+    # Children which have been submitted for evaluation, by name, and (if
+    # the fitness cache is used) children which await the evaluation of an
+    # identical phenotype, by phenotype.
+    submitted, awaiting = {}, {}
+
+    # Children which have been evaluated but not yet added to the population.
+    finished = []
+
+    produced, completed = 0, 0
+
+    while completed < budget:
+
+        while produced < budget and len(submitted) < max_in_flight and \
+                not finished:
+            # Breed new children while there are free workers. Children
+            # which have already been evaluated (or found in the cache) are
+            # added to the population before the next children are bred, so
+            # that they can be selected as parents.
+            for child in breed(individuals)[:budget - produced]:
+                produced += 1
+                child.name = produced
+
+                child, eval_ind = check_async(child, awaiting)
+
+                if not eval_ind:
+                    if child.fitness is not None:
+                        # The fitness of the child is already known.
+                        finished.append(child)
+
+                elif params['MULTICORE']:
+                    # Submit the child to the pool of workers.
+                    if params['CACHE']:
+                        awaiting.setdefault(child.phenotype, [])
+
+                    submit_async(child, results)
+                    submitted[child.name] = child
+
+                else:
+                    # Evaluate the child.
+                    phenotype = child.phenotype
+                    child.evaluate()
+
+                    finished.extend(complete_async(child, phenotype,
+                                                   awaiting))
+
+        if not finished:
+            # Wait for any worker to finish.
+            result = results.get()
+
+            if isinstance(result, BaseException):
+                raise result
+
+            child = submitted.pop(result['name'])
+            phenotype = child.phenotype
+
+            for key, value in result.items():
+                setattr(child, key, value)
+
+            finished.extend(complete_async(child, phenotype, awaiting))
+
+        for child in finished:
+            # Add the child to the population.
+            replace_async(child, individuals)
+
+            completed += 1
+
+            if completed % interval == 0:
+                stats['gen'] += 1
+
+                # Generate statistics for run so far
+                get_stats(individuals)
+
+                if hasattr(params['FITNESS_FUNCTION'], 'update_context'):
+                    # Let the fitness function update any state which the
+                    # evaluations of the next children depend on.
+                    params['FITNESS_FUNCTION'].update_context(individuals)
+
+        finished = []
+
     if params['MULTICORE']:
         # Close the workers pool (otherwise they'll live on forever).
-        params['POOL'].close()
+        close_pool()
 
     return individuals
+
+
+def replace_async(child, individuals):
+    """
+    Add an evaluated child to the population, using a steady-state form of
+    the replacement operator. For steady_state replacement, the child
+    replaces the worst individual in the population (the Genitor model). For
+    generational replacement, the child replaces the oldest individual which
+    is not one of the ELITE_SIZE best individuals, so that each individual
+    survives for about one generation's worth of evaluations unless it is an
+    elite. The population is kept in order of age, oldest first.
+
+    :param child: An evaluated child.
+    :param individuals: The current population, which is changed in place.
+    :return: Nothing.
+    """
+
+    if params['REPLACEMENT'] is steady_state:
+        # Replace the worst individual in the population.
+        worst = individuals.index(min(individuals))
+        individuals[worst] = child
+
+    else:
+        # Replace the oldest individual which is not an elite.
+        elites = set(id(ind) for ind in
+                     nlargest(params['ELITE_SIZE'], individuals))
+
+        oldest = next((i for i, ind in enumerate(individuals)
+                       if id(ind) not in elites), 0)
+
+        del individuals[oldest]
+        individuals.append(child)
+
+
+def breed(individuals):
+    """
+    Breed a pair of children from the population by selection, crossover
+    and mutation.
+
+    :param individuals: The current population.
+    :return: A list of two new (unevaluated) children.
+    """
+
+    children = None
+
+    while children is None:
+        # Select parents from the population.
+        parents = selection(individuals)
+
+        # Perform crossover on selected parents. Retry if crossover failed.
+        children = crossover_inds(parents[0], parents[1])
+
+    # Mutate the children.
+    return mutation(children)
+
+
+def check_async(child, awaiting):
+    """
+    Check whether a newly bred child needs to be evaluated, following the
+    same rules for invalid individuals and for the fitness cache as
+    fitness.evaluation.evaluate_fitness. Sets the fitness of the child if it
+    is already known.
+
+    :param child: A newly bred child.
+    :param awaiting: A dictionary of the phenotypes which are currently
+    being evaluated, and the children which await their evaluation.
+    :return: The child (or a mutated replacement of the child if
+    MUTATE_DUPLICATES is set), and whether or not it must be evaluated.
+    """
+
+    child.fitness, eval_ind = None, True
+
+    if child.invalid:
+        # Invalid individuals cannot be evaluated and are given a bad
+        # default fitness.
+        child.fitness = params['FITNESS_FUNCTION'].default_fitness
+        stats['invalids'] += 1
+        eval_ind = False
+
+    elif params['CACHE'] and (child.phenotype in cache or
+                              child.phenotype in awaiting):
+        # The phenotype has been encountered before, or is being evaluated.
+
+        if params['LOOKUP_FITNESS']:
+            if child.phenotype in cache:
+                # Set the fitness as the previous fitness from the cache.
+                child.fitness = cache[child.phenotype]
+
+            else:
+                # Set the fitness once the phenotype has been evaluated.
+                awaiting[child.phenotype].append(child)
+
+            eval_ind = False
+
+        elif params['LOOKUP_BAD_FITNESS']:
+            # Give the child a bad default fitness.
+            child.fitness = params['FITNESS_FUNCTION'].default_fitness
+            eval_ind = False
+
+        elif params['MUTATE_DUPLICATES']:
+            # Mutate the child to produce a new phenotype which has not been
+            # encountered yet.
+            name = child.name
+
+            while (not child.phenotype) or child.phenotype in cache or \
+                    child.phenotype in awaiting:
+                child = params['MUTATION'](child)
+                stats['regens'] += 1
+
+            child.name = name
+            child.fitness = None
+
+    return child, eval_ind
+
+
+def submit_async(child, results):
+    """
+    Submit a child for evaluation by the pool of workers. The result of the
+    evaluation (or any exception raised) is put on the results queue.
+
+    :param child: A child to be evaluated.
+    :param results: A queue of results of evaluations.
+    :return: Nothing.
+    """
+
+    attributes = getattr(params['FITNESS_FUNCTION'], 'payload_attributes',
+                         [])
+
+    params['POOL'].apply_async(evaluate_payload, (Payload(child, attributes),),
+                               callback=results.put,
+                               error_callback=results.put)
+
+
+def complete_async(child, phenotype, awaiting):
+    """
+    Record the evaluation of a child, and pass its fitness on to any
+    children which await the evaluation of the same phenotype.
+
+    :param child: An evaluated child.
+    :param phenotype: The phenotype of the child at the time it was
+    submitted for evaluation.
+    :param awaiting: A dictionary of the phenotypes which are currently
+    being evaluated, and the children which await their evaluation.
+    :return: A list of the evaluated child and the children which awaited
+    it.
+    """
+
+    record_evaluation(child)
+
+    duplicates = awaiting.pop(phenotype, [])
+
+    for ind in duplicates:
+        ind.fitness = child.fitness
+
+    return [child] + duplicates
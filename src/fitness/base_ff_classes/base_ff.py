@@ -1,4 +1,5 @@
 import numpy as np
+from utilities.fitness.compile_phenotype import get_code
 
 np.seterr(all="raise")
 
@@ -17,6 +18,28 @@ class base_ff:
     # Default fitness objective is to minimise fitness.
     maximise = False
 
+    # Fitness functions which over-write evaluate_batch() must set this flag
+    # to True. Populations are then handed to the fitness function as a
+    # whole rather than one individual at a time.
+    batch_evaluation = False
+
+    # Fitness functions which evaluate batches in parallel themselves, e.g.
+    # by managing their own worker processes, set this flag to True as well.
+    # With multicore evaluation, their batches are then evaluated in the
+    # main process rather than being sent to the pool of workers.
+    parallel_evaluation = False
+
+    # With multicore evaluation only the phenotype of each individual is sent
+    # to the worker processes. Fitness functions which need any other
+    # attributes of an individual must list them here.
+    payload_attributes = []
+
+    # Any state of the fitness function which changes during a run and which
+    # evaluations depend on, e.g. the sample of the training data used in the
+    # current generation. The context is sent to the worker processes along
+    # with the individuals to be evaluated.
+    context = None
+
     def __init__(self):
         pass
 
@@ -52,6 +75,75 @@ class base_ff:
 
         return fitness
 
+    def call_batch(self, individuals, **kwargs):
+        """
+        Evaluate a list of individuals at once using the evaluate_batch()
+        function. If any individual in the batch produces a runtime error,
+        the batch is re-evaluated one individual at a time so that the error
+        (and the default fitness) is attributed to the individuals which
+        actually caused it.
+
+        :param individuals: A list of valid individuals to be evaluated.
+        :param kwargs: Optional extra arguments.
+        :return: A list of fitnesses, in the same order as the individuals.
+        """
+
+        try:
+            fitnesses = self.evaluate_batch(individuals, **kwargs)
+
+        except (FloatingPointError, ZeroDivisionError, OverflowError,
+                MemoryError):
+            # Fall back to per-individual evaluation.
+            fitnesses = [self(ind, **kwargs) for ind in individuals]
+
+        except Exception as err:
+            print(err)
+            raise
+
+        return fitnesses
+
+    def evaluate_batch(self, individuals, **kwargs):
+        """
+        Optional batched fitness execution call. Fitness functions which
+        can amortise set-up costs over a whole population (e.g. by sharing
+        data preparation, compiled code or external processes between
+        individuals) can over-write this function, and must then set the
+        class attribute "batch_evaluation = True". The default implementation
+        simply evaluates each individual in turn.
+
+        :param individuals: A list of valid individuals to be evaluated.
+        :param kwargs: Optional extra arguments.
+        :return: A list of fitnesses, in the same order as the individuals.
+        """
+
+        return [self(ind, **kwargs) for ind in individuals]
+
+    def update_context(self, individuals):
+        """
+        Optional call which is made in the main process before a population
+        is evaluated. Fitness functions whose evaluations depend on state
+        which changes during a run can over-write this function in order to
+        update their context, using set_context(). The default
+        implementation does nothing.
+
+        :param individuals: The population which is about to be evaluated.
+        :return: Nothing.
+        """
+
+        pass
+
+    def set_context(self, context):
+        """
+        Set the context of the fitness function. Called in the main process
+        by update_context(), and in worker processes with the context which
+        was sent along with the individuals to be evaluated.
+
+        :param context: A picklable context.
+        :return: Nothing.
+        """
+
+        self.context = context
+
     def evaluate(self, ind, **kwargs):
         """
         Default fitness execution call for all fitness functions. When
@@ -64,7 +156,8 @@ class base_ff:
         :return: The fitness of the evaluated individual.
         """
 
-        # Evaluate the fitness of the phenotype
-        fitness = eval(ind.phenotype)
+        # Evaluate the fitness of the phenotype. The compiled phenotype is
+        # cached for repeated evaluations.
+        fitness = eval(get_code(ind.phenotype))
 
         return fitness
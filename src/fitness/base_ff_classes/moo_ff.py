@@ -36,6 +36,23 @@ class moo_ff:
         for f in fitness_functions:
             self.default_fitness.append(f.default_fitness)
 
+        # Use batched evaluation if any of the individual fitness functions
+        # supports it.
+        self.batch_evaluation = any([getattr(ff, 'batch_evaluation', False)
+                                     for ff in self.fitness_functions])
+
+        # Evaluate batches in the main process if any of the individual
+        # fitness functions evaluates them in parallel itself.
+        self.parallel_evaluation = any(
+            [getattr(ff, 'parallel_evaluation', False) for ff in
+             self.fitness_functions])
+
+        # Send all attributes needed by any of the individual fitness
+        # functions to the worker processes.
+        self.payload_attributes = sorted(set(
+            [attr for ff in self.fitness_functions for attr in
+             getattr(ff, 'payload_attributes', [])]))
+
     def __call__(self, ind):
         """
         Note that math functions used in the solutions are imported from either
@@ -58,6 +75,34 @@ class moo_ff:
 
         return fitness
 
+    def call_batch(self, individuals):
+        """
+        Evaluate a list of individuals on all fitness functions at once.
+        Each individual fitness function evaluates the whole batch, so
+        fitness functions which implement evaluate_batch() can amortise
+        their set-up costs across the population.
+
+        :param individuals: A list of valid individuals to be evaluated.
+        :return: A list of fitness vectors, one per individual.
+        """
+
+        # Evaluate the whole batch on each objective in turn.
+        objectives = [ff.call_batch(individuals) for ff in
+                      self.fitness_functions]
+
+        fitnesses = []
+        for fitness in zip(*objectives):
+            fitness = list(fitness)
+
+            if any([isnan(i) for i in fitness]):
+                # Check if any objective fitness value is NaN, if so set
+                # default fitness.
+                fitness = self.default_fitness
+
+            fitnesses.append(fitness)
+
+        return fitnesses
+
     @staticmethod
     def value(fitness_vector, objective_index):
         """
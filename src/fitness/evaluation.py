@@ -23,14 +23,35 @@ def evaluate_fitness(individuals):
            individuals which have not been encountered yet by the search
            process.
 
+    If the fitness function supports batched evaluation (i.e. it implements
+    evaluate_batch() and sets "batch_evaluation = True"), all individuals
+    which need to be evaluated are passed to the fitness function at once.
+    With multi-core evaluation, lightweight payloads rather than whole
+    individuals are sent to the pool of workers, and batches are split into
+    one chunk per core. Fitness functions which evaluate batches in parallel
+    themselves (i.e. set "parallel_evaluation = True") are handed their
+    batches in the main process instead.
+
     :param individuals: A population of individuals to be evaluated.
     :return: A population of fully evaluated individuals.
     """
 
-    results, pool = [], None
+    # Fitness functions which support batched evaluation are handed all
+    # individuals which need to be evaluated at once, after the cache has
+    # been checked.
+    batch = params['FITNESS_FUNCTION'].batch_evaluation
+
+    # Fitness functions which evaluate batches in parallel themselves are
+    # not sent to the pool of workers.
+    multicore = params['MULTICORE'] and not \
+        getattr(params['FITNESS_FUNCTION'], 'parallel_evaluation', False)
+
+    to_evaluate, duplicates, pending = [], [], {}
 
-    if params['MULTICORE']:
-        pool = params['POOL']
+    if hasattr(params['FITNESS_FUNCTION'], 'update_context'):
+        # Let the fitness function update any state which evaluations of
+        # this population depend on.
+        params['FITNESS_FUNCTION'].update_context(individuals)
 
     for name, ind in enumerate(individuals):
         ind.name = name
@@ -46,14 +67,23 @@ def evaluate_fitness(individuals):
             eval_ind = True
 
             # Valid individuals can be evaluated.
-            if params['CACHE'] and ind.phenotype in cache:
+            if params['CACHE'] and (ind.phenotype in cache or
+                                    ind.phenotype in pending):
                 # The individual has been encountered before in
-                # the utilities.trackers.cache.
+                # the utilities.trackers.cache, or is already waiting to be
+                # evaluated.
 
                 if params['LOOKUP_FITNESS']:
-                    # Set the fitness as the previous fitness from the
-                    # cache.
-                    ind.fitness = cache[ind.phenotype]
+                    if ind.phenotype in cache:
+                        # Set the fitness as the previous fitness from the
+                        # cache.
+                        ind.fitness = cache[ind.phenotype]
+
+                    else:
+                        # Set the fitness once the individual which is
+                        # waiting to be evaluated has been evaluated.
+                        duplicates.append(ind)
+
                     eval_ind = False
 
                 elif params['LOOKUP_BAD_FITNESS']:
@@ -64,7 +94,8 @@ def evaluate_fitness(individuals):
                 elif params['MUTATE_DUPLICATES']:
                     # Mutate the individual to produce a new phenotype
                     # which has not been encountered yet.
-                    while (not ind.phenotype) or ind.phenotype in cache:
+                    while (not ind.phenotype) or ind.phenotype in cache or \
+                            ind.phenotype in pending:
                         ind = params['MUTATION'](ind)
                         stats['regens'] += 1
 
@@ -72,63 +103,318 @@ def evaluate_fitness(individuals):
                     individuals[name] = ind
                     ind.name = name
 
-            if eval_ind:
-                results = eval_or_append(ind, results, pool)
+            if eval_ind and (batch or multicore):
+                # The individual is evaluated later on, either as part of a
+                # batch or by the pool of workers. Any further copies of its
+                # phenotype in the population await its result rather than
+                # being evaluated again.
+                to_evaluate.append(ind)
+                pending[ind.phenotype] = ind
 
-    if params['MULTICORE']:
-        for result in results:
-            # Execute all jobs in the pool.
-            ind = result.get()
+            elif eval_ind:
+                # Evaluate the individual.
+                ind.evaluate()
 
-            # Set the fitness of the evaluated individual by placing the
-            # evaluated individual back into the population.
-            individuals[ind.name] = ind
+                record_evaluation(ind)
 
-            # Add the evaluated individual to the cache.
-            cache[ind.phenotype] = ind.fitness
+    if to_evaluate and multicore:
+        # Evaluate all waiting individuals using the pool of workers.
+        evaluate_multicore(individuals, to_evaluate, batch)
+
+    elif to_evaluate:
+        # Evaluate the whole batch.
+        evaluate_batch(to_evaluate)
+
+        for ind in to_evaluate:
+            record_evaluation(ind)
+
+    for ind in duplicates:
+        # Duplicates which were awaiting evaluation share the fitness of the
+        # first evaluated copy of their phenotype.
+        ind.fitness = pending[ind.phenotype].fitness
+
+    if params['CACHE']:
+        # Write any new cache entries to disk.
+        cache.flush()
+
+    return individuals
 
-            # Check if individual had a runtime error.
-            if ind.runtime_error:
-                runtime_error_cache.append(ind.phenotype)
+
+def evaluate_batch(individuals):
+    """
+    Evaluates a batch of individuals at once using the batched evaluation
+    call of the fitness function. Sets the fitness of each individual.
+
+    :param individuals: A list of valid individuals to be evaluated.
+    :return: The list of evaluated individuals.
+    """
+
+    fitnesses = params['FITNESS_FUNCTION'].call_batch(individuals)
+
+    for ind, fitness in zip(individuals, fitnesses):
+        ind.fitness = fitness
 
     return individuals
 
 
-def eval_or_append(ind, results, pool):
+def evaluate_multicore(individuals, to_evaluate, batch):
     """
-    Evaluates an individual if sequential evaluation is being used. If
-    multi-core parallel evaluation is being used, adds the individual to the
-    pool to be evaluated.
+    Evaluates a list of individuals using the multicore pool of workers.
+    Rather than pickling whole individuals (including their genomes and
+    derivation trees), only lightweight payloads are sent to the workers.
+    Work is submitted in chunks and results are applied to the individuals
+    in the population as they come back.
 
-    :param ind: An individual to be evaluated.
-    :param results: A list of individuals to be evaluated by the multicore
-    pool of workers.
-    :param pool: A pool of workers for multicore evaluation.
-    :return: The evaluated individual or the list of individuals to be
-    evaluated.
+    :param individuals: The population.
+    :param to_evaluate: A list of valid individuals from the population to
+    be evaluated.
+    :param batch: Whether or not the fitness function supports batched
+    evaluation.
+    :return: Nothing.
     """
 
-    if params['MULTICORE']:
-        # Add the individual to the pool of jobs.
-        results.append(pool.apply_async(ind.evaluate, ()))
-        return results
+    pool = params['POOL']
+
+    attributes = getattr(params['FITNESS_FUNCTION'], 'payload_attributes',
+                         [])
+    payloads = [Payload(ind, attributes) for ind in to_evaluate]
+
+    if batch:
+        # Split the batch evenly over all available cores.
+        size = -(-len(payloads) // params['CORES'])
+        chunks = [payloads[i:i + size] for i in range(0, len(payloads),
+                                                        size)]
+        results = [result for chunk in
+                   pool.imap_unordered(evaluate_payload_batch, chunks)
+                   for result in chunk]
 
     else:
-        # Evaluate the individual.
-        ind.evaluate()
-
-        # Check if individual had a runtime error.
-        if ind.runtime_error:
-            runtime_error_cache.append(ind.phenotype)
-
-        if params['CACHE']:
-            # The phenotype string of the individual does not appear
-            # in the cache, it must be evaluated and added to the
-            # cache.
-
-            if (isinstance(ind.fitness, list) and not
-            any([np.isnan(i) for i in ind.fitness])) or \
-                    (not isinstance(ind.fitness, list) and not
-                    np.isnan(ind.fitness)):
-                # All fitnesses are valid.
-                cache[ind.phenotype] = ind.fitness
+        # Submit several chunks per core so that the load stays balanced
+        # when evaluation times vary.
+        chunksize = max(1, len(payloads) // (params['CORES'] * 4))
+        results = pool.imap_unordered(evaluate_payload, payloads, chunksize)
+
+    for result in results:
+        # Set the fitness (and any other attributes set by the fitness
+        # function) of the evaluated individual in the population.
+        ind = individuals[result.pop('name')]
+
+        for key, value in result.items():
+            setattr(ind, key, value)
+
+        record_evaluation(ind)
+
+
+class Payload(object):
+    """
+    A lightweight stand-in for an individual, which is sent to the workers of
+    the multicore pool for evaluation. Only the name and phenotype of the
+    individual are sent, along with any other attributes that the fitness
+    function declares it needs in its "payload_attributes" list and the
+    current context of the fitness function. In particular the genome and
+    derivation tree are not sent.
+    """
+
+    def __init__(self, ind, attributes):
+        """
+        Create a payload for an individual.
+
+        :param ind: An individual to be evaluated.
+        :param attributes: A list of names of additional attributes of the
+        individual needed by the fitness function.
+        """
+
+        self.name = ind.name
+        self.phenotype = ind.phenotype
+        self.runtime_error = False
+        self.context = getattr(params['FITNESS_FUNCTION'], 'context', None)
+
+        # Attributes which the individual does not have are sent as None.
+        for attribute in attributes:
+            setattr(self, attribute, getattr(ind, attribute, None))
+
+    def result(self, sent):
+        """
+        Get the result of the evaluation of the payload. Only the fitness,
+        runtime error and any attributes which were set by the fitness
+        function are returned.
+
+        :param sent: The attributes of the payload before evaluation.
+        :return: A dictionary of the evaluated attributes, including the
+        name of the individual.
+        """
+
+        # Compiled phenotypes cannot be sent back.
+        return {key: value for key, value in vars(self).items() if
+                key in ('name', 'fitness', 'runtime_error') or
+                (key != 'compiled' and sent.get(key) is not value)}
+
+
+def evaluate_payload(payload):
+    """
+    Evaluates a single payload in a worker of the multicore pool. If a shared
+    cache is used, it is checked first, and the result of any other worker
+    which is already evaluating the same phenotype is awaited.
+
+    :param payload: A payload to be evaluated.
+    :return: The result of the evaluation.
+    """
+
+    shared = params['SHARED_CACHE']
+
+    set_context(payload)
+
+    if shared:
+        key = cache.key(payload.phenotype)
+
+        value, owned = shared.claim(key)
+
+        if value is None and not owned:
+            # Await the evaluation of another worker.
+            value = shared.wait(key)
+
+        if value is not None:
+            # Take the result from the shared cache.
+            return dict(value, name=payload.name)
+
+    sent = dict(vars(payload))
+
+    try:
+        payload.fitness = params['FITNESS_FUNCTION'](payload)
+
+    except BaseException:
+        if shared:
+            # Let other workers evaluate this phenotype instead.
+            shared.release(key)
+        raise
+
+    result = payload.result(sent)
+
+    if shared:
+        shared.publish(key, {k: v for k, v in result.items() if k != 'name'})
+
+    return result
+
+
+def evaluate_payload_batch(payloads):
+    """
+    Evaluates a batch of payloads at once in a worker of the multicore pool,
+    using the batched evaluation call of the fitness function. If a shared
+    cache is used, only payloads which are neither in the shared cache nor
+    being evaluated by another worker are evaluated in the batch.
+
+    :param payloads: A list of payloads to be evaluated.
+    :return: A list of the results of the evaluations.
+    """
+
+    shared = params['SHARED_CACHE']
+    results, claimed, waiting = [], [], []
+
+    if payloads:
+        set_context(payloads[0])
+
+    for payload in payloads:
+        if shared:
+            value, owned = shared.claim(cache.key(payload.phenotype))
+
+            if value is not None:
+                results.append(dict(value, name=payload.name))
+            elif owned:
+                claimed.append(payload)
+            else:
+                waiting.append(payload)
+
+        else:
+            claimed.append(payload)
+
+    results.extend(evaluate_claimed(claimed))
+
+    for payload in waiting:
+        # Await the evaluation of another worker.
+        value = shared.wait(cache.key(payload.phenotype))
+
+        if value is None:
+            # The other worker gave up, evaluate the payload here.
+            results.extend(evaluate_claimed([payload]))
+
+        else:
+            results.append(dict(value, name=payload.name))
+
+    return results
+
+
+def evaluate_claimed(payloads):
+    """
+    Evaluates a batch of payloads for which the current worker is
+    responsible, and publishes the results to the shared cache if one is
+    used.
+
+    :param payloads: A list of payloads to be evaluated.
+    :return: A list of the results of the evaluations.
+    """
+
+    shared = params['SHARED_CACHE']
+    sent = [dict(vars(payload)) for payload in payloads]
+
+    try:
+        fitnesses = params['FITNESS_FUNCTION'].call_batch(payloads)
+
+    except BaseException:
+        if shared:
+            # Let other workers evaluate these phenotypes instead.
+            for payload in payloads:
+                shared.release(cache.key(payload.phenotype))
+        raise
+
+    results = []
+
+    for payload, fitness, before in zip(payloads, fitnesses, sent):
+        payload.fitness = fitness
+        result = payload.result(before)
+
+        if shared:
+            shared.publish(cache.key(before['phenotype']),
+                           {k: v for k, v in result.items() if k != 'name'})
+
+        results.append(result)
+
+    return results
+
+
+def record_evaluation(ind):
+    """
+    Records the result of the evaluation of an individual in the runtime
+    error cache and, if specified, the fitness cache.
+
+    :param ind: An evaluated individual.
+    :return: Nothing.
+    """
+
+    # Check if individual had a runtime error.
+    if ind.runtime_error:
+        runtime_error_cache.append(cache.key(ind.phenotype))
+
+    if params['CACHE']:
+        # The phenotype string of the individual does not appear
+        # in the cache, it must be evaluated and added to the
+        # cache.
+
+        if (isinstance(ind.fitness, list) and not
+        any([np.isnan(i) for i in ind.fitness])) or \
+                (not isinstance(ind.fitness, list) and not
+                np.isnan(ind.fitness)):
+            # All fitnesses are valid.
+            cache[ind.phenotype] = ind.fitness
+
+
+def set_context(payload):
+    """
+    Set the context of the fitness function in a worker of the multicore
+    pool to the context which was sent along with a payload.
+
+    :param payload: A payload to be evaluated.
+    :return: Nothing.
+    """
+
+    if payload.context is not None:
+        params['FITNESS_FUNCTION'].set_context(payload.context)
@@ -7,6 +7,9 @@ class minimise_nodes(base_ff):
     derivation tree.
     """
 
+    # The number of nodes is needed for multicore evaluation.
+    payload_attributes = ['nodes']
+
     def __init__(self):
         # Initialise base fitness function class.
         super().__init__()
@@ -1,17 +1,19 @@
 import json
-from subprocess import Popen, PIPE
 import sys
+from multiprocessing.connection import wait
 from os import path
+from subprocess import PIPE, Popen
 
 from algorithm.parameters import params
 from fitness.base_ff_classes.base_ff import base_ff
 
 
-
 class progsys(base_ff):
     """Fitness function for program synthesis problems. Grammars and datasets
     for 29 benchmark problems from doi.org/10.1145/2739480.2754769 are
-    provided. Evaluation is done in a separate python process."""
+    provided. Evaluation is done in separate python processes, which load the
+    training and test data once when they start. With MULTICORE, there is one
+    evaluation process per core, and programs are evaluated concurrently."""
 
     # constants required for formatting the code correctly
     INSERTCODE = "<insertCodeHere>"
@@ -25,6 +27,10 @@ class progsys(base_ff):
     FORCOUNTER = "forCounter"
     FORCOUNTERUNNUMBERED = "forCounter%"
 
+    # Programs are evaluated by a pool of evaluation processes.
+    batch_evaluation = True
+    parallel_evaluation = True
+
     def __init__(self):
         # Initialise base fitness function class.
         super().__init__()
@@ -32,35 +38,101 @@ class progsys(base_ff):
         self.training, self.test, self.embed_header, self.embed_footer = \
             self.get_data(params['DATASET_TRAIN'], params['DATASET_TEST'],
                           params['GRAMMAR_FILE'])
-        self.eval = self.create_eval_process()
-        if params['MULTICORE']:
-            print("Warming: multi-core is not supported with progsys "
-                  "as fitness function.\n"
-                  "Fitness function only allows sequential evaluation.")
+
+        n_processes = params['CORES'] if params['MULTICORE'] else 1
+        self.evals = [self.create_eval_process() for _ in
+                      range(n_processes)]
 
     def evaluate(self, ind, **kwargs):
+        """
+        Evaluate a single individual.
+
+        :param ind: An individual to be evaluated.
+        :param kwargs: Optional extra arguments, e.g. the distribution (i.e.
+        training or test) upon which evaluation is to be performed.
+        :return: The fitness of the evaluated individual.
+        """
+
+        return self.evaluate_batch([ind], **kwargs)[0]
+
+    def evaluate_batch(self, individuals, **kwargs):
+        """
+        Evaluate a list of individuals concurrently, by sending each program
+        to the next idle evaluation process.
+
+        :param individuals: A list of valid individuals to be evaluated.
+        :param kwargs: Optional extra arguments, e.g. the distribution (i.e.
+        training or test) upon which evaluation is to be performed.
+        :return: A list of fitnesses, in the same order as the individuals.
+        """
 
         dist = kwargs.get('dist', 'training')
 
+        fitnesses = [None] * len(individuals)
+        waiting = list(reversed(range(len(individuals))))
+
+        # The individual evaluated by each busy evaluation process, by the
+        # position of the process in the pool.
+        busy = {}
+
+        while waiting or busy:
+            for i, process in enumerate(self.evals):
+                if waiting and i not in busy:
+                    busy[i] = waiting.pop()
+                    self.send(process, individuals[busy[i]], dist)
+
+            ready = wait([self.evals[i].stdout for i in busy])
+
+            for i in list(busy):
+                if self.evals[i].stdout in ready:
+                    fitnesses[busy.pop(i)] = self.receive(i)
+
+        return fitnesses
+
+    def send(self, process, ind, dist):
+        """
+        Send the program of an individual to an evaluation process. Only the
+        program is sent, along with the name of the dataset to run it on.
+
+        :param process: An evaluation process.
+        :param ind: An individual to be evaluated.
+        :param dist: The distribution (i.e. training or test) upon which
+        evaluation is to be performed.
+        :return: Nothing.
+        """
+
         program = self.format_program(ind.phenotype,
                                       self.embed_header, self.embed_footer)
-        data = self.training if dist == "training" else self.test
-        program = "{}\n{}\n".format(data, program)
-        eval_json = json.dumps({'script': program, 'timeout': 1.0,
+        eval_json = json.dumps({'script': program, 'dataset': dist,
+                                'timeout': 1.0,
                                 'variables': ['cases', 'caseQuality',
                                               'quality']})
 
-        self.eval.stdin.write((eval_json + '\n').encode())
-        self.eval.stdin.flush()
-        result_json = self.eval.stdout.readline()
+        process.stdin.write((eval_json + '\n').encode())
+        process.stdin.flush()
 
-        result = json.loads(result_json.decode())
+    def receive(self, i):
+        """
+        Receive the result of an evaluation from an evaluation process.
+
+        :param i: The position of the evaluation process in the pool.
+        :return: The quality of the evaluated program.
+        """
+
+        result_json = self.evals[i].stdout.readline()
+
+        if result_json:
+            result = json.loads(result_json.decode())
+
+        else:
+            # The evaluation process has exited.
+            result = {'exception': 'JSONDecodeError'}
 
         if 'exception' in result and 'JSONDecodeError' in result['exception']:
-            self.eval.stdin.close()
-            self.eval = self.create_eval_process()
-            
-       	if 'quality' in	result:
+            self.evals[i].stdin.close()
+            self.evals[i] = self.create_eval_process()
+
+        if 'quality' in result:
             if result['quality'] > sys.maxsize:
                 result['quality'] = sys.maxsize
 
@@ -68,10 +140,11 @@ class progsys(base_ff):
             result['quality'] = sys.maxsize
         return result['quality']
 
-    @staticmethod
-    def create_eval_process():
-        """create separate python process for evaluation"""
-        return Popen([sys.executable, 'scripts/python_script_evaluation.py'],
+    def create_eval_process(self):
+        """create separate python process for evaluation, which loads the
+        training and test data"""
+        return Popen([sys.executable, 'scripts/python_script_evaluation.py',
+                      '--training', self.training, '--test', self.test],
                      stdout=PIPE, stdin=PIPE)
 
     def format_program(self, individual, header, footer):
@@ -137,9 +210,9 @@ class progsys(base_ff):
         return string_builder
 
     def get_data(self, train, test, grammar):
-        """ Return the training and test data for the current experiment.
-        A new get_data method is required to load from a sub folder and to
-        read the embed file"""
+        """ Return the files of the training and test data for the current
+        experiment. A new get_data method is required to load from a sub
+        folder and to read the embed file"""
         train_set = path.join("..", "datasets", "progsys", train)
         test_set = path.join("..", "datasets", "progsys", test)
 
@@ -152,7 +225,4 @@ class progsys(base_ff):
         if insert > 0:
             embed_header = embed_code[:insert]
             embed_footer = embed_code[insert + len(self.INSERTCODE):]
-        with open(train_set, 'r') as train_file, \
-                open(test_set, 'r') as test_file:
-            return train_file.read(), test_file.read(), \
-                   embed_header, embed_footer
+        return train_set, test_set, embed_header, embed_footer
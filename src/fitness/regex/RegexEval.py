@@ -1,5 +1,7 @@
 import re
-from multiprocessing import Process, Queue
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait
+from time import perf_counter
 
 import fitness.regex.testing.RegexTestGenerator as TestGen
 from algorithm.parameters import params
@@ -24,47 +26,103 @@ class RegexEval(base_ff):
     test_cases = []
     seed_regex = None
     time = True
-    q = Queue()
-    pstartup, prunner = None, None
+
+    # Regexes are evaluated by a pool of long-lived worker processes.
+    batch_evaluation = True
+    parallel_evaluation = True
+
+    # The time limit in seconds for the evaluation of a single regex.
+    # Workers which exceed it (e.g. through catastrophic backtracking) are
+    # killed and replaced.
+    timeout = 1
+
+    # The total time in seconds spent timing the test cases of a single
+    # regex. Test cases are run adaptively within their share of the
+    # budget, see fitness.regex.testing.RegexTimer.
+    time_budget = 0.1
+
+    # The pool of workers, as a list of (process, connection) pairs.
+    workers = None
 
     def __init__(self):
         # Initialise base fitness function class.
         super().__init__()
 
-        if params['MULTICORE']:
-            s = "fitness.regex.RegexEval.RegexEval\n" \
-                "Error: multi-core evaluation cannot be used with RegexEval " \
-                "fitness function, as this fitness function already manages " \
-                "processes using the multiprocessing library."
-            raise Exception(s)
-
-    def call_fitness(self, individual, q):
+    def call_fitness(self, regex_string):
         """
-        This method is called when this class is instantiated with an
-        individual (a regex)
-        
-        :param individual:
-        :param q:
-        :return:
+        Evaluate a regex on all test cases.
+
+        :param regex_string: The phenotype of an individual, i.e. a regex.
+        :return: The fitness of the regex.
         """
-        regex_string = individual.phenotype
+
         try:
             compiled_regex = re.compile(regex_string)
             eval_results = self.test_regex(compiled_regex)
             result_error, time_sum = self.calculate_fitness(eval_results)
-            fitness = result_error + time_sum
 
-            # We are running this code in a thread so put the fitness on the
-            # queue so it can be read back by the first length of the phenotype
-            # puts parsimony pressure toward shorter regex
-            q.put(fitness)
+            return result_error + time_sum
 
         except:  # Error as e:
-            # if the regex is broken, or the thread is timedout, return a
-            # really bad fitness
-            # print(e)
-            # traceback.print_exc()
-            q.put(RegexEval.default_fitness)
+            # if the regex is broken, return a really bad fitness
+            return RegexEval.default_fitness
+
+    def run_worker(self, connection):
+        """
+        The main loop of a worker process. Regexes are received over the
+        connection and their fitnesses are sent back, until None is received.
+
+        :param connection: The worker end of a pipe to the main process.
+        :return: Nothing.
+        """
+
+        for regex_string in iter(connection.recv, None):
+            connection.send(self.call_fitness(regex_string))
+
+    def start_worker(self):
+        """
+        Start a new worker process. Workers are forked from the main process
+        and so inherit the test cases.
+
+        :return: A tuple of the worker process and the main process end of
+        its pipe.
+        """
+
+        connection, worker_connection = Pipe()
+
+        process = Process(target=self.run_worker, args=(worker_connection,),
+                          name="RegexEval.worker", daemon=True)
+        process.start()
+
+        return process, connection
+
+    def replace_worker(self, i):
+        """
+        Kill a worker of the pool and start a new worker in its place.
+
+        :param i: The position of the worker in the pool.
+        :return: Nothing.
+        """
+
+        process, connection = RegexEval.workers[i]
+
+        process.terminate()
+        process.join()
+        connection.close()
+
+        RegexEval.workers[i] = self.start_worker()
+
+    def start_workers(self):
+        """
+        Start the pool of workers, with one worker per core if MULTICORE is
+        set.
+
+        :return: Nothing.
+        """
+
+        n_workers = params['CORES'] if params['MULTICORE'] else 1
+
+        RegexEval.workers = [self.start_worker() for _ in range(n_workers)]
 
     def calculate_fitness(self, eval_results):
         """
@@ -92,22 +150,38 @@ class RegexEval(base_ff):
         """
 
         results = list()
-        testing_iterations = 1
+        deadline = perf_counter() + self.time_budget
+        n_cases = len(RegexEval.test_cases)
 
-        for test_case in RegexEval.test_cases:
+        for i, test_case in enumerate(RegexEval.test_cases):
+            # Share the remaining time budget between the remaining cases.
+            budget = max(deadline - perf_counter(), 0) / (n_cases - i)
             results.append(time_regex_test_case(compiled_regex, test_case,
-                                                testing_iterations))
+                                                budget))
         return results
 
     def evaluate(self, ind, **kwargs):
         """
-        When this class is instantiated with individual, evaluate in a new
-        process, timeout and kill process if it runs for 1 second.
+        Evaluate a single individual using the pool of workers.
 
         :param ind: An individual to be evaluated.
         :return: The fitness of the evaluated individual.
         """
 
+        return self.evaluate_batch([ind])[0]
+
+    def evaluate_batch(self, individuals, **kwargs):
+        """
+        Evaluate a list of individuals in parallel using the pool of
+        workers. Each worker evaluates one regex at a time. A watchdog kills
+        any worker whose regex runs for longer than the time limit, and
+        replaces it with a new worker.
+
+        :param individuals: A list of valid individuals to be evaluated.
+        :param kwargs: Optional extra arguments.
+        :return: A list of fitnesses, in the same order as the individuals.
+        """
+
         if RegexEval.seed_regex is None:
             # We can't initialise the seed regex when we initialise the
             # fitness function as the representation.individual.Individual
@@ -115,8 +189,10 @@ class RegexEval(base_ff):
 
             RegexEval.seed_regex = params['SEED_INDIVIDUALS'][0]
 
-            RegexEval.test_cases = TestGen.generate_test_suite(
-                RegexEval.seed_regex.phenotype)
+            # With MULTICORE, the test suite is generated in parallel.
+            RegexEval.test_cases = TestGen.get_test_suite(
+                RegexEval.seed_regex.phenotype,
+                params['CORES'] if params['MULTICORE'] else 1)
 
             if len(RegexEval.test_cases) == 0:
                 s = "fitness.regex.RegexEval.RegexEval\n" \
@@ -124,31 +200,55 @@ class RegexEval(base_ff):
                     "       Please add at least one passing regex test string."
                 raise Exception(s)
 
-        if RegexEval.pstartup is None:
-            RegexEval.pstartup = Process(target=self.call_fitness,
-                                         name="self.call_fitness")
-        RegexEval.pstartup._args = (ind, RegexEval.q)
+        if RegexEval.workers is None:
+            self.start_workers()
+
+        fitnesses = [None] * len(individuals)
+        waiting = list(reversed(range(len(individuals))))
+
+        # The individual evaluated by each busy worker, and its deadline, by
+        # the position of the worker in the pool.
+        busy = {}
+
+        while waiting or busy:
+            # Hand out regexes to idle workers.
+            for i, (process, connection) in enumerate(RegexEval.workers):
+                if waiting and i not in busy:
+                    index = waiting.pop()
+                    connection.send(individuals[index].phenotype)
+                    busy[i] = index, perf_counter() + self.timeout
+
+            # Wait for the first worker to finish or the earliest deadline.
+            remaining = min([deadline for _, deadline in busy.values()]) - \
+                perf_counter()
+            ready = wait([RegexEval.workers[i][1] for i in busy],
+                         max(remaining, 0))
+
+            for i in list(busy):
+                process, connection = RegexEval.workers[i]
+                index, deadline = busy[i]
+
+                if connection in ready:
+                    try:
+                        fitnesses[index] = connection.recv()
 
-        RegexEval.pstartup.start()
-        RegexEval.prunner = RegexEval.pstartup
-        RegexEval.pstartup = Process(target=self.call_fitness,
-                                     name="self.call_fitness")
+                    except EOFError:
+                        # The worker died, replace it.
+                        self.replace_worker(i)
+                        fitnesses[index] = self.default_fitness
 
-        # Set one second time limit for running thread.
-        self.prunner.join(1)
+                    del busy[i]
 
-        # If thread is active
-        if self.prunner.is_alive():
-            # After one second, if prunner is still running, kill it.
-            print("Regex evaluation timeout reached, "
-                  "killing evaluation process")
-            self.prunner.terminate()
-            self.prunner.join()
+                elif perf_counter() >= deadline:
+                    # The regex timed out, kill the worker.
+                    print("Regex evaluation timeout reached, "
+                          "killing evaluation process")
+                    self.replace_worker(i)
+                    del busy[i]
 
-            # Count individual as a runtime error.
-            stats['runtime_error'] += 1
+                    # Count individual as a runtime error.
+                    stats['runtime_error'] += 1
 
-            return self.default_fitness
+                    fitnesses[index] = self.default_fitness
 
-        else:
-            return self.q.get()
+        return fitnesses
@@ -1,10 +1,20 @@
+import json
 import re
+from hashlib import blake2b
+from multiprocessing import Pool
+from os import getcwd, getpid, makedirs, path, replace
 
+from algorithm.parameters import params
 from fitness.regex.testing.RegexTest import RegexTest
-from fitness.regex.testing.RegexTimer import time_regex_test_case
 
+# The version of the test suite generator. Cached test suites are keyed by
+# the version, so it must be increased whenever a change to the generator
+# (e.g. to the known test strings) changes the suites it generates.
+GENERATOR_VERSION = 1
 
-def generate_equivalence_test_suite_replacement(a_match, compiled_regex):
+
+def generate_equivalence_test_suite_replacement(a_match, compiled_regex,
+                                                pool=None):
     """
     This is a 'booster' for test suite generation. We know a single good
     match, and we can use that to find search strings which do not
@@ -16,6 +26,8 @@ def generate_equivalence_test_suite_replacement(a_match, compiled_regex):
 
     :param a_match:
     :param compiled_regex:
+    :param pool: An optional multiprocessing pool, over which the positions
+    of the search string are split.
     :return:
     """
     test_cases = []
@@ -23,20 +35,41 @@ def generate_equivalence_test_suite_replacement(a_match, compiled_regex):
     # find one which does not match.
     # compiled_regex = re.compile(a_regex)
     if len(a_match.matches) > 0:
-        for i in range(0, len(a_match.search_string)):
-            for char in [a for a in range(ord('0'), ord('9'))] + \
-                        [ord('a'), ord('Z')]:
-                new_search_string = a_match.search_string[:i] + \
-                                    chr(char) + \
-                                    a_match.search_string[i + 1:]
-                a_test_case_string = RegexTest(new_search_string)
-                vals = time_regex_test_case(compiled_regex, a_test_case_string,
-                                            1)
-                if len(list(vals[1])) == 0:
-                    test_cases.append(a_test_case_string)
+        jobs = [(compiled_regex, a_match.search_string, i) for i in
+                range(0, len(a_match.search_string))]
+
+        if pool is None:
+            failing = [replace_and_fail(*job) for job in jobs]
+        else:
+            failing = pool.starmap(replace_and_fail, jobs)
+
+        for new_search_strings in failing:
+            test_cases += [RegexTest(new_search_string) for
+                           new_search_string in new_search_strings]
     return test_cases
 
 
+def replace_and_fail(compiled_regex, search_string, i):
+    """
+    Replace one character of a search string with each of a set of
+    characters, and find the new search strings which the regex does not
+    match.
+
+    :param compiled_regex:
+    :param search_string:
+    :param i: The position of the character to replace.
+    :return: A list of the new search strings which do not match.
+    """
+    failing = []
+    for char in [a for a in range(ord('0'), ord('9'))] + \
+                [ord('a'), ord('Z')]:
+        new_search_string = search_string[:i] + chr(char) + \
+                            search_string[i + 1:]
+        if compiled_regex.search(new_search_string) is None:
+            failing.append(new_search_string)
+    return failing
+
+
 def generate_equivalence_test_suite_length(a_match, compiled_regex):
     """
     Generate shorter or longer test cases, add those which do not match
@@ -80,16 +113,73 @@ def add_test_case_if_fails(new_search_string, compiled_regex, test_cases):
     :param compiled_regex:
     :return:
     """
-    a_test_case_string = RegexTest(new_search_string)
-    vals = time_regex_test_case(compiled_regex, a_test_case_string, 1)
-    if len(list(vals[1])) == 0:
-        test_cases.append(a_test_case_string)
+    if compiled_regex.search(new_search_string) is None:
+        test_cases.append(RegexTest(new_search_string))
+
+
+def get_test_suite(regex_string, processes=1):
+    """
+    Get the test suite of a regex. If REGEX_TEST_CACHE is set, generated
+    test suites are saved to disk in REGEX_TEST_CACHE_DIR (by default, the
+    "seeds" folder), keyed by a digest of the regex and the version of the
+    generator, and later runs load them rather than generating them again.
 
+    Only the search strings of the test cases are saved. Their matches are
+    found again with the regex when the suite is loaded.
 
-def generate_test_suite(regex_string):
+    :param regex_string: The regex (i.e. the phenotype of the seed).
+    :param processes: The number of processes used to generate the suite.
+    :return: A list of test cases.
+    """
+
+    if not params['REGEX_TEST_CACHE']:
+        return generate_test_suite(regex_string, processes)
+
+    # Get the name of the test suite file.
+    digest = blake2b(digest_size=16)
+    digest.update(repr((regex_string, GENERATOR_VERSION)).encode())
+
+    cache_dir = params['REGEX_TEST_CACHE_DIR'] or \
+        path.join(getcwd(), "..", "seeds")
+    file_name = path.join(cache_dir, "regex_tests.%s.json" %
+                          digest.hexdigest())
+
+    if path.isfile(file_name):
+        with open(file_name) as f:
+            search_strings = json.load(f)
+
+        compiled_regex = re.compile(regex_string)
+        test_cases = []
+
+        for search_string in search_strings:
+            test_case = RegexTest(search_string)
+            test_case.matches = list(compiled_regex.finditer(search_string))
+            test_cases.append(test_case)
+
+        print("Number of test cases in suite:", len(test_cases))
+
+        return test_cases
+
+    test_cases = generate_test_suite(regex_string, processes)
+
+    # Save the suite under a temporary name and then rename it, so that
+    # other processes never load a partly written file.
+    makedirs(cache_dir, exist_ok=True)
+
+    temp_file = "%s.%d.tmp" % (file_name, getpid())
+    with open(temp_file, "w") as f:
+        json.dump([test_case.search_string for test_case in test_cases], f)
+    replace(temp_file, file_name)
+
+    return test_cases
+
+
+def generate_test_suite(regex_string, processes=1):
     """
     
     :param regex_string:
+    :param processes: The number of processes used to try out the
+    replacements of the characters of matching strings.
     :return:
     """
 
@@ -168,12 +258,21 @@ def generate_test_suite(regex_string):
 
     compiled_regex = re.compile(regex_string)
     test_cases = []
-    for test_string in known_test_strings:
+    pool = Pool(processes) if processes > 1 else None
+
+    try:
+        for test_string in known_test_strings:
+            test_cases += generate_tests_if_string_match(compiled_regex,
+                                                         test_string, pool)
+
+        # if we don't have any known test strings, see if the regex matches
+        # it.
         test_cases += generate_tests_if_string_match(compiled_regex,
-                                                     test_string)
+                                                     regex_string, pool)
 
-    # if we don't have any known test strings, see if the regex matches it.
-    test_cases += generate_tests_if_string_match(compiled_regex, regex_string)
+    finally:
+        if pool is not None:
+            pool.close()
 
     print("Number of test cases in suite:", len(test_cases))
 
@@ -196,25 +295,26 @@ def add_re_match_to_test(matches, passing_test_string):
     return passing_test_string
 
 
-def generate_tests_if_string_match(compiled_regex, test_string):
+def generate_tests_if_string_match(compiled_regex, test_string, pool=None):
     """
     
     :param compiled_regex:
     :param test_string:
+    :param pool: An optional multiprocessing pool.
     :return:
     """
 
     test_cases = []
     a_test_candidate = RegexTest(test_string)
-    vals = time_regex_test_case(compiled_regex, a_test_candidate, 1)
+    matches = list(compiled_regex.finditer(test_string))
 
-    if len(list(vals[1])) > 0:  # the regex found a match, add it
-        a_positive_test = add_re_match_to_test(vals[1], a_test_candidate)
+    if len(matches) > 0:  # the regex found a match, add it
+        a_positive_test = add_re_match_to_test(matches, a_test_candidate)
         test_cases.append(a_positive_test)
 
         # now find regex which negate
         test_cases += generate_equivalence_test_suite_replacement(
-            a_positive_test, compiled_regex)
+            a_positive_test, compiled_regex, pool)
         test_cases += generate_equivalence_test_suite_length(
             a_positive_test, compiled_regex)
     return test_cases
@@ -1,53 +1,144 @@
-import timeit
-import traceback
+import gc
+from bisect import insort
+from functools import lru_cache
+from math import ceil, floor, sqrt
+from statistics import median
+from time import perf_counter_ns
 
-# http://stackoverflow.com/questions/24812253/
-# how-can-i-capture-return-value-with-python-timeit-module/
-timeit.template = """
-def inner(_it, _timer{init}):
-    {setup}
-    _t0 = _timer()
-    for _i in _it:
-        retval = {stmt}
-    _t1 = _timer()
-    return _t1 - _t0, retval
-"""
+# Runs of each test case which are not timed, e.g. while caches warm up.
+WARMUP_RUNS = 1
 
+# The minimum and maximum number of timed runs of each test case.
+MIN_RUNS = 10
+MAX_RUNS = 100
 
-def time_regex_test_case(compiled_regex, test_case, iterations):
+# Runs of a test case are repeated until the confidence interval of the
+# median time (at the confidence level of CONFIDENCE_Z standard errors) is
+# within RELATIVE_PRECISION of the median. The median, and its
+# distribution-free confidence interval, are not thrown by the occasional
+# run which is interrupted by the operating system.
+CONFIDENCE_Z = 1.96
+RELATIVE_PRECISION = 0.05
+
+
+def empty_run():
+    """
+    A run which does nothing, used to calibrate the overhead of the timer.
+
+    :return: An empty list of matches.
+    """
+
+    return []
+
+
+@lru_cache(maxsize=None)
+def timer_overhead(samples=1000):
     """
-    Execute and time a single regex on a single test case
-    
-    :param compiled_regex:
-    :param test_case:
-    :param iterations:
-    :return:
+    Calibrate the overhead of timing a run, i.e. the median time measured
+    for a run which does nothing. The overhead is subtracted from every
+    timed run. It is only measured once per process.
+
+    :param samples: The number of empty runs to time.
+    :return: The overhead in nanoseconds.
+    """
+
+    times = []
+
+    for _ in range(samples):
+        t0 = perf_counter_ns()
+        empty_run()
+        t1 = perf_counter_ns()
+        times.append(t1 - t0)
+
+    return sorted(times)[len(times) // 2]
+
+
+def time_regex_test_case(compiled_regex, test_case, budget=None):
     """
+    Execute and time a single regex on a single test case. The regex is run
+    adaptively: after WARMUP_RUNS untimed runs, timed runs are repeated
+    until the median time is known to within RELATIVE_PRECISION, MAX_RUNS
+    runs have been timed, or the time budget is used up. At least one run is
+    always timed.
+
+    :param compiled_regex: A compiled regex.
+    :param test_case: A test case (see fitness.regex.testing.RegexTest).
+    :param budget: The time budget in seconds, or None for no budget.
+    :return: A list of the median time of a run in seconds (less the overhead
+    of the timer), the matches of the regex, the number of timed runs, and
+    the test case.
+    """
+
+    search_string = test_case.search_string
+    finditer = compiled_regex.finditer
+    overhead = timer_overhead()
+
+    deadline = None if budget is None else \
+        perf_counter_ns() + int(budget * 1e9)
+
+    # As in timeit, garbage collection is turned off while the runs are
+    # timed, so that it does not add to the time of whichever run it
+    # happens to interrupt.
+    gc_enabled = gc.isenabled()
+    gc.disable()
 
     try:
-        repeats = 10
-        search_string = test_case.search_string
+        matches, times = time_runs(finditer, search_string, overhead,
+                                   deadline)
+
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return [median(times) / 1e9, matches, len(times), test_case]
+
+
+def time_runs(finditer, search_string, overhead, deadline):
+    """
+    Time the runs of a regex on a search string, until the median time is
+    known precisely enough, MAX_RUNS runs have been timed, or the deadline
+    has passed.
+
+    :param finditer: The finditer method of a compiled regex.
+    :param search_string: The search string of a test case.
+    :param overhead: The overhead of the timer in nanoseconds.
+    :param deadline: The deadline (from perf_counter_ns), or None.
+    :return: The matches of the regex, and the sorted list of the times of
+    the timed runs in nanoseconds.
+    """
+
+    runs, times = 0, []
+
+    while True:
+        # Timing bug, lazy eval defers computation if we don't
+        # force (convert to list evals result here)
+        # https://swizec.com/blog/python-and-lazy-evaluation/swizec/5148
+        t0 = perf_counter_ns()
+        matches = list(finditer(search_string))
+        t1 = perf_counter_ns()
 
-        def wrap():
-            # Timing bug, lazy eval defers computation if we don't
-            # force (convert to list evals result here)
-            # https://swizec.com/blog/python-and-lazy-evaluation/swizec/5148
-            return list(compiled_regex.finditer(search_string))
+        runs += 1
+        out_of_time = deadline is not None and t1 >= deadline
 
-        t = timeit.Timer(wrap)
-        repeat_iterations = t.repeat(repeat=repeats, number=iterations)
+        if runs <= WARMUP_RUNS and not out_of_time:
+            continue
 
-        best_run = list(repeat_iterations[0])
+        # Keep the times sorted.
+        insort(times, max(t1 - t0 - overhead, 0))
+        n = len(times)
 
-        for repeated_timeit in repeat_iterations:
-            if best_run[0] > list(repeated_timeit)[0]:
-                best_run = list(repeated_timeit)
+        if out_of_time or n >= MAX_RUNS:
+            break
 
-        return_vals = list(best_run)
-        return_vals.append(iterations)
-        return_vals.append(test_case)
+        if n >= MIN_RUNS:
+            # The ranks of the bounds of the confidence interval of the
+            # median.
+            half_width = CONFIDENCE_Z * sqrt(n) / 2
+            lower = max(int(floor(n / 2 - half_width)), 0)
+            upper = min(int(ceil(n / 2 + half_width)), n - 1)
 
-    except:
-        traceback.print_exc()
+            if times[upper] - times[lower] <= \
+                    2 * RELATIVE_PRECISION * median(times):
+                break
 
-    return return_vals
+    return matches, times
@@ -1,10 +1,20 @@
-import itertools
 import random
 
 import numpy as np
 from algorithm.parameters import params
 from fitness.supervised_learning.supervised_learning import supervised_learning
 from utilities.fitness.error_metric import Hamming_error
+from utilities.fitness.get_data import format_dataset
+
+try:
+    from numpy import bitwise_count
+
+except ImportError:
+    # bitwise_count requires numpy 2.0 or later.
+    bitwise_count = None
+
+# The number of set bits of every byte.
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
 
 
 class boolean_problem(supervised_learning):
@@ -24,6 +34,12 @@ class boolean_problem(supervised_learning):
     --extra_parameters nparity 3 --grammar
     supervised_learning/boolean.bnf
 
+    With BITSLICE, the truth table is packed into 64-bit words: bit j of
+    word w of each input column (and of the target) holds fitness case
+    64 * w + j. Phenotypes built from the bitwise operators &, |, ^, ~ (and
+    if_then_else) then evaluate 64 fitness cases per operation, and the
+    Hamming error is the number of set bits (the popcount) of the
+    mismatches between the packed outputs and the packed target.
     """
 
     def __init__(self):
@@ -49,16 +65,71 @@ class boolean_problem(supervised_learning):
             target = eval(target_name)
 
         # generate all input combinations for n variables, to become
-        # the fitness cases
-        Ls = [[False, True] for i in range(n)]
-        X = np.array(list(itertools.product(*Ls)))
+        # the fitness cases, in the same order as itertools.product (the
+        # first variable is the most significant bit of the case number).
+        X = (np.arange(2 ** n)[:, None] >> np.arange(n - 1, -1, -1)) & 1
+        X = X.astype(bool)
         # evaluate the target function at the fitness cases
-        self.training_exp = np.array([target(xi) for xi in X])
-        self.training_in = X.T
+        y = np.array([target(xi) for xi in X])
+
+        if params['BITSLICE']:
+            if params['ERROR_METRIC'] is not Hamming_error:
+                s = "fitness.supervised_learning.boolean_problem." \
+                    "boolean_problem\n" \
+                    "Error: BITSLICE requires the Hamming_error metric."
+                raise Exception(s)
+
+            if params['SUBSAMPLE']:
+                s = "fitness.supervised_learning.boolean_problem." \
+                    "boolean_problem\n" \
+                    "Error: the training data cannot be sampled with " \
+                    "BITSLICE."
+                raise Exception(s)
+
+            # Each column x[:, i] is a packed input variable.
+            self.training_in = pack_bits(X)
+            self.training_exp = pack_bits(y)
+
+            # The bits of the last word which hold fitness cases. Padding
+            # bits may be set by ~, so they are masked out of the error.
+            self.mask = pack_bits(np.ones(len(y), dtype=bool))
+
+        else:
+            self.training_exp = y
+            self.training_in = format_dataset(X)
 
         # In Boolean problems we don't want a separate test set
         assert not params['DATASET_TEST']
 
+    def get_error(self, y, yhat):
+        """
+        Get the error between the expected and the estimated outputs. With
+        BITSLICE, both are packed truth tables and the error is the number
+        of fitness cases where they differ.
+
+        :param y: The expected outputs.
+        :param yhat: The estimated outputs.
+        :return: The value of the error metric.
+        """
+
+        if not params['BITSLICE']:
+            return super().get_error(y, yhat)
+
+        if isinstance(yhat, (bool, np.bool_)):
+            # Phenotypes that don't refer to x are constants.
+            yhat = np.full_like(y, ~np.uint64(0) if yhat else 0)
+
+        elif getattr(yhat, 'dtype', None) != y.dtype or \
+                yhat.shape != y.shape:
+            s = "fitness.supervised_learning.boolean_problem." \
+                "boolean_problem.get_error\n" \
+                "Error: phenotypes must use the bitwise operators &, |, " \
+                "^, ~ and if_then_else with BITSLICE.\n" \
+                "       Got an estimate of type %s." % type(yhat).__name__
+            raise Exception(s)
+
+        return popcount((y ^ yhat) & self.mask)
+
 
 # Some target functions. Each just accepts a single instance, eg
 # nparity([False, False, True]) -> True
@@ -120,3 +191,42 @@ def make_random_boolean_fn(n):
 def binlist2int(x):
     """Convert a list of binary digits to integer"""
     return int("".join(map(str, map(int, x))), 2)
+
+
+def pack_bits(a):
+    """
+    Pack a truth table into 64-bit words. Bit j of word w holds fitness
+    case 64 * w + j. Padding bits of the last word are zero.
+
+    :param a: An array of booleans, with one row per fitness case and
+    optionally one column per variable.
+    :return: An array of unsigned 64-bit words with one row per word and
+    the same columns, stored column-contiguous.
+    """
+
+    n_words = -(-len(a) // 64)
+
+    # Pad each column to a whole number of words, one column per row.
+    padded = np.zeros((n_words * 64,) + a.shape[1:], dtype=bool)
+    padded[:len(a)] = a
+    padded = np.ascontiguousarray(padded.reshape(n_words * 64, -1).T)
+
+    # Pack each column into bytes, with the first case in the lowest bit,
+    # and view every eight bytes as one little-endian word.
+    words = np.packbits(padded, axis=1, bitorder="little").view("<u8")
+
+    return words.T if a.ndim > 1 else words[0]
+
+
+def popcount(words):
+    """
+    Count the set bits of an array of 64-bit words.
+
+    :param words: An array of unsigned 64-bit words.
+    :return: The total number of set bits.
+    """
+
+    if bitwise_count is not None:
+        return int(bitwise_count(words).sum())
+
+    return int(POPCOUNT[np.ascontiguousarray(words).view(np.uint8)].sum())
@@ -4,6 +4,7 @@ import numpy as np
 from algorithm.parameters import params
 from fitness.supervised_learning.supervised_learning import supervised_learning
 from utilities.fitness.error_metric import Hamming_error
+from utilities.fitness.get_data import format_dataset
 
 
 # import random
@@ -70,7 +71,7 @@ class if_else_classifier(supervised_learning):
         X = np.array(list(itertools.product(*Ls)))
         # evaluate the target function at the fitness cases
         self.training_exp = np.array([target(xi) for xi in X])
-        self.training_in = X.T
+        self.training_in = format_dataset(X.T, "C")
 
         # In these Classifier problems we don't want a separate test
         # set, and we don't optimize constants.
@@ -5,6 +5,7 @@ import numpy as np
 from algorithm.parameters import params
 from fitness.supervised_learning.regression import regression
 from utilities.fitness.error_metric import rmse
+from utilities.fitness.get_data import format_dataset
 
 
 class regression_random_polynomial(regression):
@@ -53,15 +54,17 @@ class regression_random_polynomial(regression):
         p = Polynomial.from_random(degree, n_vars)
 
         # generate a set of fitness cases for training
-        self.training_in = np.random.random((n_vars, n_samples))
-        self.training_exp = p.eval(self.training_in)
+        self.training_in = format_dataset(
+            np.random.random((n_vars, n_samples)), "C")
+        self.training_exp = format_dataset(p.eval(self.training_in))
 
         # if we want a separate test set, generate a set of fitness
         # cases for it
         if params['DATASET_TEST']:
             self.training_test = True
-            self.test_in = np.random.random((n_vars, n_samples))
-            self.test_exp = p.eval(self.training_in)
+            self.test_in = format_dataset(
+                np.random.random((n_vars, n_samples)), "C")
+            self.test_exp = format_dataset(p.eval(self.training_in))
 
 
 class Polynomial:
@@ -1,15 +1,31 @@
+from random import getrandbits
+from time import time
+
 import numpy as np
 
 np.seterr(all="raise")
 
 from algorithm.parameters import params
-from utilities.fitness.get_data import get_data
+from utilities.fitness.compile_phenotype import compile_phenotype
+from utilities.fitness.expression_dag import ExpressionDAG, RUNTIME_ERRORS
+from utilities.fitness.get_data import format_dataset, get_data
 from utilities.fitness.math_functions import *
-from utilities.fitness.optimize_constants import optimize_constants
+from utilities.fitness.optimize_constants import make_consts_consecutive, \
+    optimize_constants
+from utilities.fitness.shared_array import SharedArray, SharedMemory
+from utilities.stats import trackers
 
 from fitness.base_ff_classes.base_ff import base_ff
 
 
+# The datasets of supervised learning problems.
+DATASETS = ('training_in', 'training_exp', 'test_in', 'test_exp')
+
+# The maximum size in bytes of a block of estimates which are scored at once
+# by a batched error metric.
+BLOCK_BYTES = 2 ** 26
+
+
 class supervised_learning(base_ff):
     """
     Fitness function for supervised learning, ie regression and
@@ -22,10 +38,35 @@ class supervised_learning(base_ff):
     while F1-score, hinge-loss and others are suitable for
     classification.
 
+    Training fitness can optionally be measured on samples of the training
+    data (see SUBSAMPLE):
+        1. "minibatch": every generation is evaluated on a new random sample
+           of SUBSAMPLE_SIZE of the training data.
+        2. "interleaved": generations alternate between the full training
+           data and a new random sample of SUBSAMPLE_SIZE of it.
+        3. "racing": individuals are evaluated on progressively larger
+           chunks of the training data (doubling in size, RACING_CHUNKS in
+           total). Evaluation stops early once the partial error is so
+           large that the individual cannot beat the threshold of the
+           current population (see RACING_THRESHOLD). The fitness of such
+           an individual is a lower bound on its error. Requires an error
+           metric which is a sum or mean of non-negative pointwise errors,
+           and phenotypes which are evaluated row by row.
+    The final population and the best individual are re-scored on the full
+    training data at the end of the run.
+
     This is an abstract class which exists just to be subclassed:
     should not be instantiated.
     """
 
+    # The sample of the training data (inputs and outputs) used in the
+    # current generation, if the training data are sampled.
+    sample = None
+
+    # Whether or not training fitnesses are measured on samples of the
+    # training data.
+    sampled = False
+
     def __init__(self):
         # Initialise base fitness function class.
         super().__init__()
@@ -41,10 +82,52 @@ class supervised_learning(base_ff):
         if params['DATASET_TEST']:
             self.training_test = True
 
+        if params['EVALUATION_ENGINE'] not in ("eval", "dag"):
+            s = "fitness.supervised_learning.supervised_learning." \
+                "supervised_learning\n" \
+                "Error: unknown evaluation engine '%s'.\n" \
+                "       Valid engines are 'eval' and 'dag'." \
+                % params['EVALUATION_ENGINE']
+            raise Exception(s)
+
+        # Evaluate whole populations at once using an expression DAG. The
+        # DAG does not optimise constants. The subtree cache is only used by
+        # the DAG.
+        self.batch_evaluation = (params['EVALUATION_ENGINE'] == "dag" or
+                                 params['SUBTREE_CACHE']) and \
+            not params['OPTIMIZE_CONSTANTS']
+
+        if params['OPTIMIZE_CONSTANTS']:
+            if params['CONSTANTS_GRADIENT'] not in ("analytic", "finite"):
+                s = "fitness.supervised_learning.supervised_learning." \
+                    "supervised_learning\n" \
+                    "Error: unknown constants gradient '%s'.\n" \
+                    "       Valid gradients are 'analytic' and 'finite'." \
+                    % params['CONSTANTS_GRADIENT']
+                raise Exception(s)
+
+            # Optimise the constants of whole populations at once.
+            self.batch_evaluation = bool(params['BATCH_OPTIMIZE_CONSTANTS'])
+
+            if params['CONSTANTS_WARM_START']:
+                # Workers need the constants of the parents.
+                self.payload_attributes = ['parent_consts']
+
+        if params['SUBSAMPLE']:
+            self.check_subsample()
+
+            self.sampled = True
+
+            if params['SUBSAMPLE'] == "racing":
+                # Individuals race on their own.
+                self.batch_evaluation = False
+
     def evaluate(self, ind, **kwargs):
         """
         Note that math functions used in the solutions are imported from either
-        utilities.fitness.math_functions or called from numpy.
+        utilities.fitness.math_functions or called from numpy. Phenotypes are
+        compiled once and then re-used, see
+        utilities.fitness.compile_phenotype.
 
         :param ind: An individual to be evaluated.
         :param kwargs: An optional parameter for problems with training/test
@@ -55,22 +138,7 @@ class supervised_learning(base_ff):
 
         dist = kwargs.get('dist', 'training')
 
-        if dist == "training":
-            # Set training datasets.
-            x = self.training_in
-            y = self.training_exp
-
-        elif dist == "test":
-            # Set test datasets.
-            x = self.test_in
-            y = self.test_exp
-
-        else:
-            raise ValueError("Unknown dist: " + dist)
-
-        shape_mismatch_txt = """Shape mismatch between y and yhat. Please check
-that your grammar uses the `x[:, 0]` style, not `x[0]`. Please see change
-at https://github.com/PonyGE/PonyGE2/issues/130."""
+        x, y = self.get_dataset(dist)
 
         if params['OPTIMIZE_CONSTANTS']:
             # if we are training, then optimize the constants by
@@ -80,39 +148,604 @@ at https://github.com/PonyGE/PonyGE2/issues/130."""
             # ind.opt_consts (eg (0.5, 0.7). Later, when testing,
             # use the saved string and constants to evaluate.
             if dist == "training":
-                return optimize_constants(x, y, ind)
+                return optimize_constants(x, y, ind,
+                                          kwargs.get('optimize', True))
 
             else:
                 # this string has been created during training
                 phen = ind.phenotype_consec_consts
                 c = ind.opt_consts
-                # phen will refer to x (ie test_in), and possibly to c
-                yhat = eval(phen)
-                assert np.isrealobj(yhat)
-                # check whether yhat is a constant or an array (see below).
-                if np.ndim(yhat) != 0: 
-                    if y.shape != yhat.shape:
-                        raise ValueError(shape_mismatch_txt)
-
-                # let's always call the error function with the
-                # true values first, the estimate second
-                return params['ERROR_METRIC'](y, yhat)
+                # phen will refer to x (ie test_in), and possibly to c.
+                # It has already been compiled during training.
+                yhat = compile_phenotype(ind, phen)(x, c)
+
+                return self.get_error(y, yhat)
+
+        elif dist == "training" and params['SUBSAMPLE'] == "racing" and \
+                self.context is not None:
+            # Race the individual against the current threshold.
+            return self.race(ind, x, y)
+
+        else:
+            # phenotype won't refer to C. The compiled phenotype is kept
+            # with the individual for later evaluations, e.g. on test data.
+            yhat = compile_phenotype(ind)(x, None)
+
+            return self.get_error(y, yhat)
+
+    def evaluate_batch(self, individuals, **kwargs):
+        """
+        Evaluate a whole population at once using an expression DAG (see
+        utilities.fitness.expression_dag). Sub-expressions which are shared
+        between individuals are only evaluated once. Individuals whose
+        phenotypes cannot be added to the DAG are evaluated on their own.
+        Only used if EVALUATION_ENGINE is set to "dag" or SUBTREE_CACHE is
+        set. With SUBTREE_CACHE, the outputs of subtrees on the training set
+        are also kept across generations.
+
+        If the error metric has a batched version, the estimates of the
+        individuals are copied into blocks (one row per unique phenotype)
+        and each block is scored at once.
+
+        With OPTIMIZE_CONSTANTS (and BATCH_OPTIMIZE_CONSTANTS), the
+        constants of the individuals are optimised instead, see
+        optimize_batch().
+
+        :param individuals: A list of valid individuals to be evaluated.
+        :param kwargs: An optional parameter for problems with training/test
+        data. Specifies the distribution (i.e. training or test) upon which
+        evaluation is to be performed.
+        :return: A list of fitnesses, in the same order as the individuals.
+        """
+
+        if params['OPTIMIZE_CONSTANTS']:
+            return self.optimize_batch(individuals, **kwargs)
+
+        dist = kwargs.get('dist', 'training')
+
+        x, y = self.get_dataset(dist)
+
+        # Outputs of subtrees are only cached on the training set.
+        cache = None
+        if params['SUBTREE_CACHE'] and dist == "training":
+            cache = trackers.subtree_cache
+
+        fitnesses = [None] * len(individuals)
+
+        # The individuals with each root node of the DAG.
+        dag, roots = ExpressionDAG(), {}
+
+        for i, ind in enumerate(individuals):
+            root = dag.add(ind.phenotype)
+
+            if root is None:
+                fitnesses[i] = self(ind, **kwargs)
+            else:
+                roots.setdefault(root, []).append(i)
+
+        def set_fitness(root, fitness):
+            for i in roots[root]:
+                fitnesses[i] = fitness
+
+                if fitness is base_ff.default_fitness:
+                    # As in base_ff, these individuals are valid but have
+                    # produced a runtime error.
+                    individuals[i].runtime_error = True
+
+        # Blocks of estimates for the batched error metric. Estimates are
+        # copied into the block, so the values of the DAG are not modified.
+        batch = getattr(params['ERROR_METRIC'], 'batch', None)
+        dtype = np.result_type(y.dtype, np.float32)
+        size = max(1, BLOCK_BYTES // max(1, y.size * dtype.itemsize))
+        block, waiting = None, []
+
+        for root, yhat in dag.evaluate(x, cache=cache):
+            try:
+                if isinstance(yhat, Exception):
+                    raise yhat
+
+                if batch is None:
+                    set_fitness(root, self.get_error(y, yhat))
+                    continue
+
+                self.check_estimate(y, yhat)
+
+                if block is None:
+                    block = np.empty((min(size, len(roots)), y.size), dtype)
+
+                block[len(waiting)] = yhat
+
+            except RUNTIME_ERRORS:
+                set_fitness(root, base_ff.default_fitness)
+                continue
+
+            waiting.append(root)
+
+            if len(waiting) == len(block):
+                self.score_block(y, block, waiting, set_fitness)
+                waiting = []
+
+        if waiting:
+            self.score_block(y, block[:len(waiting)], waiting, set_fitness)
+
+        return fitnesses
+
+    def optimize_batch(self, individuals, **kwargs):
+        """
+        Optimise the constants of a batch of individuals. Phenotypes which
+        only differ in the numbering of their constants (e.g. "c[3] * x[:, 0]"
+        and "c[1] * x[:, 0]") have the same form once their constants are
+        made consecutive, and so the same optimal constants and fitness. The
+        constants of each form are only optimised once, for the first
+        individual with that form, and the result is shared with the other
+        individuals.
+
+        If a budget is set for the optimisation of constants (see
+        optimize_budgeted()), only the most promising forms are optimised.
+
+        :param individuals: A list of valid individuals to be evaluated.
+        :param kwargs: An optional parameter for problems with training/test
+        data. Specifies the distribution (i.e. training or test) upon which
+        evaluation is to be performed.
+        :return: A list of fitnesses, in the same order as the individuals.
+        """
+
+        if kwargs.get('dist', 'training') != "training":
+            # Constants are only optimised on the training set.
+            return [self(ind, **kwargs) for ind in individuals]
+
+        keys = [make_consts_consecutive(ind.phenotype)[0] for ind in
+                individuals]
+
+        # The first individual with each form.
+        forms = {}
+        for form, ind in zip(keys, individuals):
+            forms.setdefault(form, ind)
+
+        if params['CONSTANTS_TOP_K'] is not None or \
+                params['CONSTANTS_TOP_FRACTION'] is not None or \
+                params['CONSTANTS_TIME_BUDGET'] is not None:
+            fitness = self.optimize_budgeted(forms, **kwargs)
+
+        else:
+            fitness = {form: self(ind, **kwargs) for form, ind in
+                       forms.items()}
+
+        for form, ind in zip(keys, individuals):
+            first = forms[form]
+
+            if ind is not first:
+                # Share the constants of the first individual with this form.
+                ind.phenotype_original = ind.phenotype
+                ind.phenotype_consec_consts = first.phenotype_consec_consts
+                ind.runtime_error = first.runtime_error
+
+                if hasattr(first, 'opt_consts'):
+                    ind.opt_consts = first.opt_consts
+                    ind.phenotype = first.phenotype
+
+        return [fitness[form] for form in keys]
+
+    def optimize_budgeted(self, forms, **kwargs):
+        """
+        Optimise the constants of only the most promising forms of
+        phenotype. Every form is first scored at its initial constants,
+        which costs a single evaluation. Forms whose constants have been
+        optimised before are taken from the constants cache instead. The
+        remaining forms are then optimised best first: only the best
+        CONSTANTS_TOP_K, only the best fraction CONSTANTS_TOP_FRACTION, and
+        only until CONSTANTS_TIME_BUDGET seconds have passed. Forms which are
+        not optimised keep the fitness of their initial constants.
+
+        :param forms: A dictionary of the first individual with each form,
+        by form.
+        :param kwargs: Optional extra arguments for evaluation.
+        :return: A dictionary of fitnesses, by form.
+        """
+
+        fitness, ranked = {}, []
+
+        for form, ind in forms.items():
+            cached = form in trackers.constants_cache
+
+            fitness[form] = self(ind, optimize=False, **kwargs)
+
+            if not cached and not ind.runtime_error and \
+                    np.isfinite(fitness[form]):
+                ranked.append(form)
+
+        # Best first.
+        ranked.sort(key=lambda form: fitness[form], reverse=self.maximise)
+
+        n = len(ranked)
+        if params['CONSTANTS_TOP_K'] is not None:
+            n = min(n, params['CONSTANTS_TOP_K'])
+        if params['CONSTANTS_TOP_FRACTION'] is not None:
+            n = min(n, int(np.ceil(len(ranked) *
+                                   params['CONSTANTS_TOP_FRACTION'])))
+
+        start = time()
+
+        for form in ranked[:n]:
+            if params['CONSTANTS_TIME_BUDGET'] is not None and \
+                    time() - start >= params['CONSTANTS_TIME_BUDGET']:
+                break
+
+            # Optimise from the original phenotype, which still refers to
+            # the constants.
+            ind = forms[form]
+            ind.phenotype = ind.phenotype_original
+
+            fitness[form] = self(ind, **kwargs)
+
+        return fitness
+
+    def score_block(self, y, block, waiting, set_fitness):
+        """
+        Score a block of estimates at once using the batched error metric.
+        If this produces a runtime error, each estimate is scored on its own
+        instead, so that the error is only attributed to the individuals
+        which actually caused it.
+
+        :param y: The expected outputs.
+        :param block: A 2-D array of estimates, one row per root node.
+        :param waiting: The root nodes of the rows of the block.
+        :param set_fitness: A function which sets the fitness of the
+        individuals with a root node.
+        :return: Nothing.
+        """
+
+        try:
+            errors = params['ERROR_METRIC'].batch(y, block)
+
+        except RUNTIME_ERRORS:
+            errors = []
+
+            for yhat in block:
+                try:
+                    errors.append(params['ERROR_METRIC'](y, yhat))
+
+                except RUNTIME_ERRORS:
+                    errors.append(base_ff.default_fitness)
+
+        for root, error in zip(waiting, errors):
+            set_fitness(root, error)
+
+    def get_dataset(self, dist):
+        """
+        Get the inputs and expected outputs of a dataset.
+
+        :param dist: The distribution (i.e. training or test).
+        :return: The inputs and expected outputs.
+        """
+
+        if dist == "training" and self.sample is not None:
+            # Set the sample of the training datasets.
+            return self.sample
+
+        elif dist == "training":
+            # Set training datasets.
+            return self.training_in, self.training_exp
+
+        elif dist == "test":
+            # Set test datasets.
+            return self.test_in, self.test_exp
+
+        else:
+            raise ValueError("Unknown dist: " + dist)
+
+    def check_subsample(self):
+        """
+        Check that the parameters of the run allow the training data to be
+        sampled. The fitness cache is turned off, with a warning.
+
+        :return: Nothing.
+        """
+
+        s = "fitness.supervised_learning.supervised_learning." \
+            "supervised_learning.check_subsample\n"
+
+        if params['SUBSAMPLE'] not in ("minibatch", "interleaved", "racing"):
+            s += "Error: unknown subsample mode '%s'.\n" \
+                 "       Valid modes are 'minibatch', 'interleaved' and " \
+                 "'racing'." % params['SUBSAMPLE']
+            raise Exception(s)
+
+        if params['RACING_THRESHOLD'] not in ("tournament", "elite"):
+            s += "Error: unknown racing threshold '%s'.\n" \
+                 "       Valid thresholds are 'tournament' and 'elite'." \
+                 % params['RACING_THRESHOLD']
+            raise Exception(s)
+
+        if params['SHARED_CACHE'] or params['SUBTREE_CACHE'] or \
+                params['CONSTANTS_CACHE']:
+            s += "Error: fitnesses change from one generation to the next " \
+                 "when the training data are sampled.\n" \
+                 "       The shared cache, subtree cache and constants " \
+                 "cache cannot be used with SUBSAMPLE."
+            raise Exception(s)
+
+        if params['CACHE']:
+            # The fitness cache is on in most parameter files, so it is
+            # turned off rather than refused.
+            print("Warning (in fitness.supervised_learning."
+                  "supervised_learning.supervised_learning.check_subsample)"
+                  "\nWarning: fitnesses change from one generation to the "
+                  "next when the training data are sampled.\n"
+                  "         The fitness cache has been turned off.")
+            params['CACHE'] = False
+
+        if params['SUBSAMPLE'] == "racing" and params['OPTIMIZE_CONSTANTS']:
+            s += "Error: constants cannot be optimised while racing."
+            raise Exception(s)
+
+    def update_context(self, individuals):
+        """
+        Choose how the training data are sampled for the evaluation of a
+        population. For the "minibatch" and "interleaved" modes, a new
+        random sample of the training data is drawn. For the "racing" mode,
+        the threshold is found from the population which was evaluated
+        last, i.e. (most of) the current population. The context (i.e. the
+        seed of the sample or the threshold) is sent to the worker
+        processes, which draw the same sample.
+
+        :param individuals: The population which is about to be evaluated.
+        :return: Nothing.
+        """
+
+        if not self.sampled:
+            return
+
+        if params['SUBSAMPLE'] == "racing":
+            metric = params['ERROR_METRIC']
+
+            if not hasattr(metric, 'pointwise'):
+                s = "fitness.supervised_learning.supervised_learning." \
+                    "supervised_learning.update_context\n" \
+                    "Error: the error metric %s cannot be used for " \
+                    "racing.\n" \
+                    "       Racing requires a sum or mean of pointwise " \
+                    "errors, e.g. mse, rmse or mae." % metric.__name__
+                raise Exception(s)
+
+            context = ("racing", self.get_threshold())
+
+            # Keep the population, whose fitnesses give the threshold for
+            # the next population.
+            self.population = individuals
+
+        elif params['SUBSAMPLE'] == "interleaved" and \
+                getattr(self, 'context', None) and self.context[1] is not None:
+            # Use the full training data after a sampled generation.
+            context = ("interleaved", None)
 
         else:
-            # phenotype won't refer to C
-            yhat = eval(ind.phenotype)
+            # Draw a new sample.
+            context = (params['SUBSAMPLE'], getrandbits(32))
+
+        self.set_context(context)
+
+    def set_context(self, context):
+        """
+        Set the context of sampling, and draw the sample of the training
+        data if need be. A context of None means the full training data are
+        used.
+
+        :param context: The mode and either the seed of the sample or the
+        racing threshold.
+        :return: Nothing.
+        """
+
+        if context == self.context:
+            # The sample has already been drawn.
+            return
+
+        self.context, self.sample = context, None
+
+        if context is not None and context[0] != "racing" and \
+                context[1] is not None:
+            # Draw a sample of the training data, in the same order.
+            n = len(self.training_exp)
+            size = max(1, int(round(n * params['SUBSAMPLE_SIZE'])))
+
+            rng = np.random.RandomState(context[1])
+            rows = np.sort(rng.choice(n, min(size, n), replace=False))
+
+            self.sample = format_dataset(self.training_in[rows]), \
+                self.training_exp[rows]
+
+    def get_threshold(self):
+        """
+        Get the racing threshold from the fitnesses of the last evaluated
+        population. Individuals whose errors are at least the threshold
+        cannot beat the current population: either they could not win a
+        tournament (an individual can only win a tournament of size t if
+        the t-1 other contestants are all worse), or they could not be an
+        elite.
+
+        :return: The racing threshold. Infinite if there is no population
+        yet, or it is too small.
+        """
+
+        population = getattr(self, 'population', [])
+
+        # Errors of invalid individuals and runtime errors count as infinite.
+        errors = np.array([ind.fitness for ind in population], dtype=float)
+        errors[np.isnan(errors)] = np.inf
+        errors.sort()
+
+        if params['RACING_THRESHOLD'] == "elite":
+            # The error of the worst elite.
+            rank = params['ELITE_SIZE'] - 1
+        else:
+            # The error of the (t-1)th worst individual.
+            rank = len(errors) - params['TOURNAMENT_SIZE'] + 1
+
+        if 0 <= rank < len(errors):
+            return float(errors[rank])
+
+        return np.inf
+
+    def race(self, ind, x, y):
+        """
+        Evaluate an individual on progressively larger chunks of the
+        training data, and stop as soon as its error cannot fall below the
+        racing threshold. Since the pointwise errors are non-negative, the
+        error over the rows seen so far (as if the other rows had no error)
+        is a lower bound on the error over the full training data.
+
+        :param ind: An individual to be evaluated.
+        :param x: The training inputs.
+        :param y: The training outputs.
+        :return: The error of the individual over the full training data,
+        or a lower bound on it if the individual has lost the race.
+        """
+
+        metric, threshold = params['ERROR_METRIC'], self.context[1]
+        f = compile_phenotype(ind)
+
+        total, n = 0, len(y)
+
+        # The chunks double in size.
+        bounds = sorted(set([n // 2 ** i for i in
+                             range(params['RACING_CHUNKS'])]) - {0})
+
+        for start, stop in zip([0] + bounds, bounds):
+            yhat = f(x[start:stop], None)
+
             assert np.isrealobj(yhat)
-            # Phenotypes that don't refer to x are constants, ie will
-            # return a single value (not an array). That will work
-            # fine when we pass it to our error metric, but our shape
-            # mismatch check (re x[:, 0] v x[0]) will check the
-            # shape. So, only run it when yhat is an array, not when
-            # yhat is a single value. Note np.isscalar doesn't work
-            # here, see help(np.isscalar).
-            if np.ndim(yhat) != 0:
-                if y.shape != yhat.shape:
-                    raise ValueError(shape_mismatch_txt)
-
-            # let's always call the error function with the true
-            # values first, the estimate second
-            return params['ERROR_METRIC'](y, yhat)
+            if np.ndim(yhat) != 0 and yhat.shape != y[start:stop].shape:
+                # Check the shape of yhat as on the full data.
+                self.get_error(y[start:stop], yhat)
+
+            total += np.sum(metric.pointwise(y[start:stop], yhat))
+            error = metric.reduce(total, n)
+
+            if error >= threshold:
+                # The individual cannot beat the threshold.
+                break
+
+        return error
+
+    def rescore(self, individuals):
+        """
+        Re-evaluate individuals on the full training data, e.g. at the end
+        of a run in which training fitnesses were measured on samples of
+        the training data.
+
+        :param individuals: A list of individuals.
+        :return: Nothing.
+        """
+
+        self.set_context(None)
+
+        for ind in individuals:
+            if not ind.invalid:
+                ind.fitness = self(ind)
+
+    def share_data(self):
+        """
+        Move the training and test datasets into shared memory. Worker
+        processes of a multiprocessing pool then attach to the same memory
+        when the fitness function is sent to them, rather than each holding
+        its own copy of the datasets. Datasets which are memory mapped from
+        disk (see DATASET_CACHE) are already shared, and are left as they
+        are. Nothing is done if shared memory is not available.
+
+        :return: Nothing.
+        """
+
+        if SharedMemory is None:
+            return
+
+        self.shared = {}
+
+        for name in DATASETS:
+            array = getattr(self, name, None)
+
+            if type(array) is np.ndarray:
+                self.shared[name] = SharedArray(array)
+                setattr(self, name, self.shared[name].array)
+
+    def unlink_data(self):
+        """
+        Remove the shared memory blocks of the datasets once no more worker
+        processes need to attach to them. The datasets remain usable in
+        this process.
+
+        :return: Nothing.
+        """
+
+        for shared in getattr(self, 'shared', {}).values():
+            shared.unlink()
+
+        # Keep the blocks open, since the datasets still use them.
+        self.unlinked = getattr(self, 'unlinked', []) + \
+            list(getattr(self, 'shared', {}).values())
+        self.shared = {}
+
+    def __getstate__(self):
+        # Shared datasets are sent as the names of their shared memory
+        # blocks (see utilities.fitness.shared_array) rather than copied.
+        state = self.__dict__.copy()
+
+        for name in getattr(self, 'shared', {}):
+            state[name] = None
+
+        state.pop('unlinked', None)
+
+        # Samples are drawn again from the context.
+        state['context'], state['sample'] = None, None
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+        # Attach to the shared datasets.
+        for name, shared in getattr(self, 'shared', {}).items():
+            setattr(self, name, shared.array)
+
+    @staticmethod
+    def get_error(y, yhat):
+        """
+        Get the error between the expected and the estimated outputs.
+
+        :param y: The expected outputs.
+        :param yhat: The estimated outputs.
+        :return: The value of the error metric.
+        """
+
+        supervised_learning.check_estimate(y, yhat)
+
+        # let's always call the error function with the true
+        # values first, the estimate second
+        return params['ERROR_METRIC'](y, yhat)
+
+    @staticmethod
+    def check_estimate(y, yhat):
+        """
+        Check that the estimated outputs are real and match the shape of
+        the expected outputs.
+
+        :param y: The expected outputs.
+        :param yhat: The estimated outputs.
+        :return: Nothing.
+        """
+
+        shape_mismatch_txt = """Shape mismatch between y and yhat. Please check
+that your grammar uses the `x[:, 0]` style, not `x[0]`. Please see change
+at https://github.com/PonyGE/PonyGE2/issues/130."""
+
+        assert np.isrealobj(yhat)
+
+        # Phenotypes that don't refer to x are constants, ie will
+        # return a single value (not an array). That will work
+        # fine when we pass it to our error metric, but our shape
+        # mismatch check (re x[:, 0] v x[0]) will check the
+        # shape. So, only run it when yhat is an array, not when
+        # yhat is a single value. Note np.isscalar doesn't work
+        # here, see help(np.isscalar).
+        if np.ndim(yhat) != 0:
+            if y.shape != yhat.shape:
+                raise ValueError(shape_mismatch_txt)
@@ -66,6 +66,11 @@ def crossover_inds(parent_0, parent_1):
     # Perform crossover on ind_0 and ind_1.
     inds = params['CROSSOVER'](ind_0, ind_1)
 
+    # Each child keeps some attributes of the parent it was mostly created
+    # from.
+    for ind, parent in zip(inds, [parent_0, parent_1]):
+        ind.inherit(parent)
+
     # Check each individual is ok (i.e. does not violate specified limits).
     checks = [check_ind(ind, "crossover") for ind in inds]
 
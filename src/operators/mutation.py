@@ -47,6 +47,9 @@ def mutation(pop):
             # Check ind does not violate specified limits.
             check = check_ind(new_ind, "mutation")
 
+        # The mutated individual keeps some attributes of the original.
+        new_ind.inherit(ind)
+
         # Append mutated individual to population.
         new_pop.append(new_ind)
 
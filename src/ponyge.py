@@ -13,6 +13,7 @@ check_python_version()
 
 from stats.stats import get_stats, import_errors
 from algorithm.parameters import params, set_params
+from utilities.algorithm.broker import run_worker
 import sys
 
 
@@ -20,6 +21,11 @@ def mane():
     """ Run program """
     set_params(sys.argv[1:])  # exclude the ponyge.py arg itself
 
+    if params['WORKER']:
+        # Evaluate individuals for a broker.
+        run_worker(params['WORKER'])
+        return
+
     import_errors()
 
     # Run evolution
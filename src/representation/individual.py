@@ -79,6 +79,14 @@ class Individual(object):
             return self.fitness <= other.fitness if params[
                 'FITNESS_FUNCTION'].maximise else other.fitness <= self.fitness
 
+    def __getstate__(self):
+        # Compiled phenotypes cannot be pickled (e.g. when saving the state
+        # of a run). They are compiled again when needed.
+        state = self.__dict__.copy()
+        state.pop('compiled', None)
+
+        return state
+
     def __str__(self):
         """
         Generates a string by which individuals can be identified. Useful
@@ -115,6 +123,25 @@ class Individual(object):
 
         return new_ind
 
+    def inherit(self, parent):
+        """
+        Pass on to a new individual the attributes which it keeps from the
+        individual it was created from. These are the optimised constants of
+        the parent (see utilities.fitness.optimize_constants), which can be
+        used as a warm start for the constants of the child. Children which
+        are created from children which have not been evaluated yet (e.g. by
+        mutation after crossover) keep the constants of the original parent.
+
+        :param parent: The individual from which this one was created.
+        :return: Nothing.
+        """
+
+        consts = getattr(parent, 'opt_consts',
+                         getattr(parent, 'parent_consts', None))
+
+        if consts is not None:
+            self.parent_consts = consts
+
     def evaluate(self):
         """
         Evaluates phenotype in using the fitness function set in the params
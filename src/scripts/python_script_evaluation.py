@@ -1,21 +1,95 @@
+import argparse
 import json
 import logging
 import multiprocessing as mp
+import signal
 import sys
 from queue import Empty
+from time import perf_counter
 from types import ModuleType
 
 logging.basicConfig(filename='python_log.txt',
                     format='%(asctime)s:%(process)d:%(thread)d:%(message)s',
                     level=logging.INFO)  # set to DEBUG for debug info ;)
 
+# seconds to wait beyond the timeout for the worker to interrupt a script
+# itself, before the worker is terminated and replaced. Only scripts stuck
+# in a single long call (which signals cannot interrupt) need this.
+GRACE = 1.0
+
+# seconds between further interruptions of a script which has swallowed
+# its timeout (e.g. with a bare except) and carries on running.
+REPEAT = 0.01
+
+TIMEOUT_MESSAGE = 'Timeout occurred.'
+
+
+class ScriptTimeout(BaseException):
+    """raised inside a script which runs for longer than its timeout. It is
+    not an Exception, so that it is not caught by except Exception. A bare
+    except can still catch it, so once the script has timed out it is raised
+    again at the next line of the script and every REPEAT seconds, until the
+    script stops. Without setitimer, a script which swallows the timeout
+    runs on until the worker is replaced."""
+    pass
+
+
+def in_worker(frame):
+    """whether a frame belongs to the code of this module rather than to the
+    script, e.g. while the timer is being stopped. The timeout is never
+    raised there."""
+    return frame is not None and frame.f_code.co_filename == __file__
+
+
+def trace_timeout(frame, event, arg):
+    """trace function which raises the timeout at the next line of a script
+    which has timed out, e.g. inside the except clause which caught it"""
+    if event == 'line' and not in_worker(frame):
+        raise ScriptTimeout()
+    return trace_timeout
+
+
+def raise_timeout(signum, frame):
+    if not in_worker(frame):
+        # trace the frames which are already running as well as new ones
+        sys.settrace(trace_timeout)
+        while frame is not None and not in_worker(frame):
+            frame.f_trace = trace_timeout
+            frame = frame.f_back
+        raise ScriptTimeout()
+
+
+def start_timer(timeout):
+    """interrupt the script after timeout seconds, using a timer signal
+    where available and a trace function otherwise"""
+    if hasattr(signal, 'setitimer'):
+        signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout, REPEAT)
+    else:
+        deadline = perf_counter() + timeout
+
+        def trace(frame, event, arg):
+            if perf_counter() > deadline and not in_worker(frame):
+                raise ScriptTimeout()
+            return trace
+
+        sys.settrace(trace)
+
+
+def stop_timer():
+    if hasattr(signal, 'setitimer'):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    sys.settrace(None)
+
 
 class Worker(mp.Process):
-    def __init__(self, consume, produce):
+    def __init__(self, consume, produce, datasets=None):
         super(Worker, self).__init__()
         self.consume = consume
         self.produce = produce
         self.stop = mp.Value('b', False)
+        # source code of the datasets which scripts can be run on, by name
+        self.datasets = datasets or {}
 
     def run(self):
         # START LINUX: used to receive Memory Error faster in Linux
@@ -28,14 +102,37 @@ class Worker(mp.Process):
         except ValueError:
             pass # In MacOS Catalina and newer, setting the stack results in a ValueError.
         # END LINUX:
+        # compile the datasets only once. They are executed again for every
+        # script, so that each script gets fresh copies of the data.
+        datasets, dataset_names = {}, set()
+        for name, source in self.datasets.items():
+            datasets[name] = compile(source, name, 'exec')
+            dataset_globals = {}
+            exec(datasets[name], dataset_globals)
+            dataset_names.update(dataset_globals)
         while True:
             exception = None
             self.stop.value = False
-            script = self.consume.get()
-            if script:
+            message = self.consume.get()
+            if message:
+                dataset, script, timeout = message
                 help_globals = {'stop': self.stop}
+                deadline = perf_counter() + timeout
                 try:
-                    exec(script, help_globals)
+                    # the script is interrupted here once it times out, so
+                    # that the worker stays alive
+                    start_timer(timeout)
+                    try:
+                        if dataset:
+                            exec(datasets[dataset], help_globals)
+                        exec(script, help_globals)
+                    finally:
+                        stop_timer()
+                    if perf_counter() >= deadline:
+                        # the script has swallowed its timeout
+                        raise ScriptTimeout()
+                except ScriptTimeout:
+                    exception = TIMEOUT_MESSAGE
                 except BaseException as e:
                     exc_type, exc_obj, exc_tb = sys.exc_info()
                     exception = '{} {} {}'.format(exc_type, exc_obj, e.args)
@@ -48,8 +145,9 @@ class Worker(mp.Process):
                          not isinstance(value,
                                         ModuleType) and  # cannot be a module
                          key not in ['__builtins__',
-                                     'stop']})  # cannot be builtins or
-                    # synchronized objects
+                                     'stop'] and  # cannot be builtins or
+                         # synchronized objects
+                         key not in dataset_names})  # or the dataset
                 del help_globals
             else:
                 break
@@ -59,9 +157,22 @@ class Worker(mp.Process):
 
 
 if __name__ == '__main__':
+    # datasets are loaded once at startup. Messages which name a dataset
+    # then only need to contain the program itself.
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--training', help='file of the training data')
+    parser.add_argument('--test', help='file of the test data')
+    args = parser.parse_args()
+    datasets = {}
+    for name, file_name in (('training', args.training),
+                            ('test', args.test)):
+        if file_name:
+            with open(file_name, 'r') as data_file:
+                datasets[name] = data_file.read()
+
     consume = mp.Queue()
     produce = mp.Queue()
-    p = Worker(consume, produce)
+    p = Worker(consume, produce, datasets)
     p.start()
     while True:
         try:
@@ -86,15 +197,17 @@ if __name__ == '__main__':
             logging.debug(message)
             print(json.dumps({'exception': exception}), flush=True)
             continue
-        consume.put(message_dict['script'])
+        consume.put((message_dict.get('dataset'), message_dict['script'],
+                     message_dict['timeout']))
         try:
-            results = produce.get(block=True, timeout=message_dict['timeout'])
+            results = produce.get(block=True,
+                                  timeout=message_dict['timeout'] + GRACE)
         except Empty:
             results = None
-        if not results:
+        if results is None:
             p.stop_current()
             try:
-                produce.get(block=True, timeout=message_dict['timeout'] * 10)
+                produce.get(block=True, timeout=GRACE)
             except Empty:
                 # START: Used to terminate worker process if it does not return
                 # Possible reasons: OS X does not throw a MemoryError and
@@ -103,11 +216,11 @@ if __name__ == '__main__':
                 p.terminate()
                 consume = mp.Queue()
                 produce = mp.Queue()
-                p = Worker(consume, produce)
+                p = Worker(consume, produce, datasets)
                 p.start()
                 logging.debug('terminated worker')
                 # END:
-            print(json.dumps({'exception': 'Timeout occurred.'}), flush=True)
+            print(json.dumps({'exception': TIMEOUT_MESSAGE}), flush=True)
             logging.debug('Sent output timeout')
         elif 'exception' in results:
             print(json.dumps(results), flush=True)
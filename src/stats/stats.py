@@ -21,6 +21,8 @@ stats = {
     "runtime_error": 0,
     "unique_inds": len(trackers.cache),
     "unused_search": 0,
+    "subtree_cache_hits": 0,
+    "subtree_cache_misses": 0,
     "ave_genome_length": 0,
     "max_genome_length": 0,
     "min_genome_length": 0,
@@ -122,6 +124,14 @@ def get_soo_stats(individuals, end):
     :return: Nothing.
     """
 
+    if end and getattr(params['FITNESS_FUNCTION'], 'sampled', False):
+        # Training fitnesses have been measured on samples of the training
+        # data. Re-score the final population and the best individual on the
+        # full training data.
+        rescored = individuals + [trackers.best_ever]
+        params['FITNESS_FUNCTION'].rescore(rescored)
+        trackers.best_ever = max(rescored)
+
     # Get best individual.
     best = max(individuals)
 
@@ -330,13 +340,23 @@ def update_stats(individuals, end):
         stats['total_time'] = trackers.time_list[-1] - \
                               trackers.time_list[0]
 
+    # Counts which have been merged from other processes, e.g. the islands
+    # of the island model, are used instead of the counts of this process.
+    merged = trackers.merged_stats
+
     # Population Stats
-    stats['total_inds'] = params['POPULATION_SIZE'] * (stats['gen'] + 1)
+    stats['total_inds'] = merged.get('total_inds', params['POPULATION_SIZE'] *
+                                     (stats['gen'] + 1))
     stats['runtime_error'] = len(trackers.runtime_error_cache)
     if params['CACHE']:
-        stats['unique_inds'] = len(trackers.cache)
+        stats['unique_inds'] = merged.get('unique_inds', len(trackers.cache))
         stats['unused_search'] = 100 - stats['unique_inds'] / \
                                  stats['total_inds'] * 100
+    if params['SUBTREE_CACHE']:
+        stats['subtree_cache_hits'] = merged.get(
+            'subtree_cache_hits', trackers.subtree_cache.hits)
+        stats['subtree_cache_misses'] = merged.get(
+            'subtree_cache_misses', trackers.subtree_cache.misses)
 
     # Genome Stats
     genome_lengths = [len(i.genome) for i in individuals]
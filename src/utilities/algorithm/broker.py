@@ -0,0 +1,494 @@
+from collections import deque
+from itertools import count
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from queue import Queue
+from threading import Condition, Event, Lock, Thread
+from time import sleep
+from traceback import format_exc
+
+from algorithm.parameters import params
+
+
+class Job(object):
+    """
+    A single job handed out by the broker: a function to be called with
+    some arguments on a worker, and a function to be called with the result.
+    """
+
+    def __init__(self, job_id, func, args, done):
+        """
+        Create a job.
+
+        :param job_id: A unique id for the job.
+        :param func: A function to be called on a worker. Must be picklable,
+        i.e. defined at the top level of a module.
+        :param args: A tuple of arguments for the function.
+        :param done: A function which is called with the result of the job
+        and an error message (one of which is None) once the job is done.
+        """
+
+        self.id = job_id
+        self.func = func
+        self.args = args
+        self.done = done
+
+        # The number of times the job has been re-queued after the worker
+        # running it has died.
+        self.retries = 0
+
+
+class WorkerHandle(object):
+    """
+    The broker side of the connection to a single worker.
+    """
+
+    def __init__(self, conn):
+        """
+        Create a handle for a newly connected worker.
+
+        :param conn: The connection to the worker.
+        """
+
+        self.conn = conn
+        self.alive = True
+
+        # Jobs which have been sent to the worker and not yet returned.
+        self.jobs = {}
+
+
+class Broker(object):
+    """
+    A network evaluation backend which can be used in place of a
+    multiprocessing pool. The broker listens for worker processes (started
+    with "ponyge.py --worker host:port", on the same or another machine) to
+    connect over TCP, sends them the parameters of the run, and then hands
+    out evaluation jobs to them.
+
+    Each worker has at most a fixed number of jobs in flight at once, so
+    that jobs are queued at the broker and faster workers take on more jobs
+    (backpressure). Workers send heartbeats while they are connected. If a
+    worker disconnects or misses its heartbeats, it is dropped and the jobs
+    it was running are re-queued for other workers.
+
+    Only the parts of the multiprocessing.Pool interface used by PonyGE2
+    are provided: imap_unordered(), apply_async() and close().
+
+    Jobs and results are pickled, so workers must only be connected over a
+    trusted network.
+    """
+
+    def __init__(self, address, authkey, in_flight=2, timeout=10.0,
+                 max_retries=3):
+        """
+        Start listening for workers.
+
+        :param address: The address on which to listen, as "host:port".
+        :param authkey: A string which workers must know in order to
+        connect.
+        :param in_flight: The maximum number of jobs in flight on each
+        worker.
+        :param timeout: The number of seconds after which a worker which has
+        not been heard from is dropped.
+        :param max_retries: The number of times a job is re-queued after the
+        worker running it has died, before the job is failed.
+        """
+
+        self.in_flight = in_flight
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+        self.listener = Listener(parse_address(address),
+                                 authkey=authkey.encode())
+
+        # Jobs waiting to be sent to a worker, and all connected workers.
+        self.jobs, self.workers = deque(), []
+        self.job_ids = count()
+        self.condition = Condition()
+        self.closed = False
+
+        Thread(target=self.accept, daemon=True).start()
+
+        self.dispatcher = Thread(target=self.dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def accept(self):
+        """
+        Accept new workers. Runs in a separate thread.
+
+        :return: Nothing.
+        """
+
+        while not self.closed:
+            try:
+                conn = self.listener.accept()
+
+            except AuthenticationError:
+                # Ignore connections with the wrong authkey.
+                continue
+
+            except OSError:
+                # The listener has been closed.
+                return
+
+            try:
+                # Send the parameters of the run to the worker.
+                conn.send(("params", get_worker_params()))
+
+            except OSError:
+                conn.close()
+                continue
+
+            handle = WorkerHandle(conn)
+
+            with self.condition:
+                self.workers.append(handle)
+                self.condition.notify_all()
+
+            Thread(target=self.receive, args=(handle,), daemon=True).start()
+
+    def receive(self, handle):
+        """
+        Receive heartbeats and results from a worker. Runs in a separate
+        thread for each worker.
+
+        :param handle: The handle of the worker.
+        :return: Nothing.
+        """
+
+        while handle.alive:
+            try:
+                if not handle.conn.poll(self.timeout):
+                    # The worker has missed its heartbeats.
+                    break
+
+                message = handle.conn.recv()
+
+            except (EOFError, OSError):
+                # The worker has disconnected.
+                break
+
+            if message[0] == "heartbeat":
+                continue
+
+            kind, job_id, value = message
+
+            with self.condition:
+                job = handle.jobs.pop(job_id, None)
+
+                # The worker can take on another job.
+                self.condition.notify_all()
+
+            if job is None:
+                # The job has already been re-queued.
+                continue
+
+            if kind == "result":
+                job.done(value, None)
+            else:
+                job.done(None, value)
+
+        self.drop(handle)
+
+    def dispatch(self):
+        """
+        Send waiting jobs to workers which have fewer than the maximum
+        number of jobs in flight. Runs in a separate thread.
+
+        :return: Nothing.
+        """
+
+        while True:
+            with self.condition:
+                handle = self.get_free_worker()
+
+                while not self.closed and not (self.jobs and handle):
+                    self.condition.wait()
+                    handle = self.get_free_worker()
+
+                if self.closed:
+                    return
+
+                job = self.jobs.popleft()
+                handle.jobs[job.id] = job
+
+            try:
+                handle.conn.send(("job", job.id, job.func, job.args))
+
+            except OSError:
+                # The worker has disconnected. The job is re-queued.
+                self.drop(handle)
+
+            except Exception:
+                # The job could not be pickled.
+                with self.condition:
+                    handle.jobs.pop(job.id, None)
+                job.done(None, format_exc())
+
+    def get_free_worker(self):
+        """
+        Find the connected worker with the fewest jobs in flight, if it can
+        take on another job. Must be called while holding the condition.
+
+        :return: The handle of a worker, or None if all workers are busy.
+        """
+
+        free = [w for w in self.workers if len(w.jobs) < self.in_flight]
+
+        if free:
+            return min(free, key=lambda w: len(w.jobs))
+
+        return None
+
+    def drop(self, handle):
+        """
+        Drop a worker which has disconnected or missed its heartbeats, and
+        re-queue the jobs it was running.
+
+        :param handle: The handle of the worker.
+        :return: Nothing.
+        """
+
+        failed = []
+
+        with self.condition:
+            if not handle.alive:
+                return
+
+            handle.alive = False
+            self.workers.remove(handle)
+
+            for job in handle.jobs.values():
+                job.retries += 1
+
+                if job.retries > self.max_retries:
+                    failed.append(job)
+                else:
+                    self.jobs.appendleft(job)
+
+            handle.jobs = {}
+            self.condition.notify_all()
+
+        handle.conn.close()
+
+        for job in failed:
+            job.done(None, "Job failed: %d workers died while running it."
+                     % job.retries)
+
+    def submit(self, func, args, done):
+        """
+        Queue a job to be run on a worker.
+
+        :param func: A function to be called on a worker.
+        :param args: A tuple of arguments for the function.
+        :param done: A function which is called with the result of the job
+        and an error message (one of which is None) once the job is done.
+        :return: Nothing.
+        """
+
+        with self.condition:
+            self.jobs.append(Job(next(self.job_ids), func, args, done))
+            self.condition.notify_all()
+
+    def imap_unordered(self, func, iterable, chunksize=1):
+        """
+        Apply a function to every item of an iterable on the workers, in
+        chunks, and yield the results in the order in which they are done.
+
+        :param func: A function to be called on each item.
+        :param iterable: An iterable of items.
+        :param chunksize: The number of items in each job.
+        :return: A generator of results.
+        """
+
+        items = list(iterable)
+        chunks = [items[i:i + chunksize] for i in range(0, len(items),
+                                                         chunksize)]
+        results = Queue()
+
+        for chunk in chunks:
+            self.submit(map_chunk, (func, chunk),
+                        lambda value, error: results.put((value, error)))
+
+        for _ in chunks:
+            value, error = results.get()
+
+            if error is not None:
+                raise Exception(get_error_message(error))
+
+            for result in value:
+                yield result
+
+    def apply_async(self, func, args=(), callback=None, error_callback=None):
+        """
+        Call a function on a worker without waiting for the result.
+
+        :param func: A function to be called on a worker.
+        :param args: A tuple of arguments for the function.
+        :param callback: A function which is called with the result.
+        :param error_callback: A function which is called with an exception
+        if the job fails.
+        :return: Nothing.
+        """
+
+        def done(value, error):
+            if error is None:
+                if callback:
+                    callback(value)
+
+            elif error_callback:
+                error_callback(Exception(get_error_message(error)))
+
+        self.submit(func, args, done)
+
+    def close(self):
+        """
+        Stop handing out jobs, tell all workers to stop, and stop listening.
+
+        :return: Nothing.
+        """
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+        self.dispatcher.join()
+
+        for handle in list(self.workers):
+            try:
+                handle.conn.send(("stop",))
+
+            except OSError:
+                pass
+
+            self.drop(handle)
+
+        self.listener.close()
+
+
+def map_chunk(func, chunk):
+    """
+    Apply a function to every item of a chunk. Runs on a worker.
+
+    :param func: A function to be called on each item.
+    :param chunk: A list of items.
+    :return: A list of results.
+    """
+
+    return [func(item) for item in chunk]
+
+
+def run_worker(address):
+    """
+    Run a worker for a broker. Connects to the broker, waiting for it to
+    start if need be, takes on the parameters of the run from the broker,
+    and then runs the jobs it is sent until the broker stops it or goes
+    away. Heartbeats are sent to the broker from a separate thread while the
+    worker is connected.
+
+    :param address: The address of the broker, as "host:port".
+    :return: Nothing.
+    """
+
+    authkey = params['BROKER_AUTHKEY'].encode()
+    conn = None
+
+    for _ in range(60):
+        try:
+            conn = Client(parse_address(address), authkey=authkey)
+            break
+
+        except ConnectionRefusedError:
+            # The broker has not started yet.
+            sleep(1)
+
+    if conn is None:
+        s = "utilities.algorithm.broker.run_worker\n" \
+            "Error: could not connect to broker at %s." % address
+        raise Exception(s)
+
+    # Take on the parameters of the run.
+    _, params_ = conn.recv()
+    params.update(params_)
+
+    lock, stop = Lock(), Event()
+
+    def heartbeat():
+        while not stop.wait(params['HEARTBEAT_INTERVAL']):
+            try:
+                with lock:
+                    conn.send(("heartbeat",))
+
+            except OSError:
+                return
+
+    Thread(target=heartbeat, daemon=True).start()
+
+    while True:
+        try:
+            message = conn.recv()
+
+        except (EOFError, OSError):
+            # The broker has gone away.
+            break
+
+        if message[0] == "stop":
+            break
+
+        _, job_id, func, args = message
+
+        try:
+            reply = ("result", job_id, func(*args))
+
+        except Exception:
+            reply = ("error", job_id, format_exc())
+
+        try:
+            with lock:
+                conn.send(reply)
+
+        except OSError:
+            break
+
+    stop.set()
+    conn.close()
+
+
+def get_worker_params():
+    """
+    Get the parameters which are sent to workers. The pool itself and any
+    shared cache cannot be sent.
+
+    :return: A copy of the parameters dictionary.
+    """
+
+    worker_params = {key: value for key, value in params.items() if
+                     key != 'POOL'}
+    worker_params['SHARED_CACHE'] = False
+
+    return worker_params
+
+
+def get_error_message(error):
+    """
+    Format the error message of a failed job.
+
+    :param error: The traceback or error message of the failed job.
+    :return: The formatted error message.
+    """
+
+    return "utilities.algorithm.broker.Broker\n" \
+           "Error: a job failed on a worker.\n" + error
+
+
+def parse_address(address):
+    """
+    Parse a network address.
+
+    :param address: An address as "host:port".
+    :return: A tuple of the host and port.
+    """
+
+    host, port = address.rsplit(":", 1)
+
+    return host, int(port)
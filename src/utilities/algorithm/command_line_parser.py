@@ -129,6 +129,18 @@ def parse_cmd_args(arguments):
                         dest='STEP',
                         type=str,
                         help='Sets the desired search step function.')
+    parser.add_argument('--async_in_flight',
+                        dest='ASYNC_IN_FLIGHT',
+                        type=int,
+                        help='Sets the number of evaluations kept running at '
+                             'once by the asynchronous search loop. Requires '
+                             'int.')
+    parser.add_argument('--report_interval',
+                        dest='REPORT_INTERVAL',
+                        type=int,
+                        help='Sets the number of finished evaluations between '
+                             'reports of statistics for the asynchronous '
+                             'search loop. Requires int.')
 
     # POPULATION OPTIONS
     parser.add_argument('--population_size',
@@ -325,6 +337,64 @@ def parse_cmd_args(arguments):
                         help='For use with problems that use a dataset. '
                              'Specifies the delimiter for the dataset. '
                              'Requires string such as "\\t".')
+    parser.add_argument('--dataset_order',
+                        dest='DATASET_ORDER',
+                        type=str,
+                        help='For use with problems that use a dataset. '
+                             'Specifies the memory layout of input data. '
+                             'Requires "F" (columns contiguous, default) or '
+                             '"C" (rows contiguous).')
+    parser.add_argument('--dataset_dtype',
+                        dest='DATASET_DTYPE',
+                        type=str,
+                        help='For use with problems that use a dataset. '
+                             'Specifies the data type of floating point '
+                             'data. Requires string such as "float64" '
+                             '(default) or "float32".')
+    parser.add_argument('--dataset_cache',
+                        dest='DATASET_CACHE',
+                        action='store_true',
+                        default=None,
+                        help='For use with problems that use a dataset. '
+                             'Parses datasets only once and saves them as '
+                             'binary files, which are loaded as shared '
+                             'memory maps in later runs.')
+    parser.add_argument('--dataset_cache_dir',
+                        dest='DATASET_CACHE_DIR',
+                        type=str,
+                        help='For use with problems that use a dataset. '
+                             'Specifies the directory of the binary dataset '
+                             'files. Default is next to the dataset files.')
+    parser.add_argument('--dataset_cache_verify',
+                        dest='DATASET_CACHE_VERIFY',
+                        action='store_true',
+                        default=None,
+                        help='For use with problems that use a dataset. '
+                             'Checks the contents of the dataset files, '
+                             'rather than only their size and modification '
+                             'time, before their binary files are used.')
+    parser.add_argument('--bitslice',
+                        dest='BITSLICE',
+                        action='store_true',
+                        default=None,
+                        help='For use with Boolean problems. Packs the truth '
+                             'table into 64-bit words, so that phenotypes '
+                             'evaluate 64 fitness cases per bitwise '
+                             'operation. Grammars must use the bitwise '
+                             'operators &, |, ^, ~ and if_then_else.')
+    parser.add_argument('--regex_test_cache',
+                        dest='REGEX_TEST_CACHE',
+                        action='store_true',
+                        default=None,
+                        help='For use with the regex fitness function. Saves '
+                             'the test suites generated for seed regexes to '
+                             'disk, and loads them in later runs.')
+    parser.add_argument('--regex_test_cache_dir',
+                        dest='REGEX_TEST_CACHE_DIR',
+                        type=str,
+                        help='For use with the regex fitness function. '
+                             'Specifies the directory of the saved test '
+                             'suites. Default is the "seeds" folder.')
     parser.add_argument('--target',
                         dest='TARGET',
                         type=str,
@@ -344,6 +414,102 @@ def parse_cmd_args(arguments):
                              'gradient descent in supervised learning '
                              'problems. Requires True or False, default '
                              'False.')
+    parser.add_argument('--constants_gradient',
+                        dest='CONSTANTS_GRADIENT',
+                        type=str,
+                        help='Sets how the gradient is found when optimizing '
+                             'constants. Requires string such as "analytic" '
+                             'or "finite", default "analytic".')
+    parser.add_argument('--batch_optimize_constants',
+                        dest='BATCH_OPTIMIZE_CONSTANTS',
+                        action='store_true',
+                        default=None,
+                        help='Optimizes the constants of whole populations '
+                             'as a batch, which is split over the pool of '
+                             'workers with --multicore.')
+    parser.add_argument('--constants_cache',
+                        dest='CONSTANTS_CACHE',
+                        action='store_true',
+                        default=None,
+                        help='Caches the optimized constants of each '
+                             'structural form of phenotype, so that forms '
+                             'which are seen again are not optimized again.')
+    parser.add_argument('--constants_cache_size',
+                        dest='CONSTANTS_CACHE_SIZE',
+                        type=int,
+                        help='Sets the maximum number of forms in the '
+                             'constants cache, requires int value. Default '
+                             '100000.')
+    parser.add_argument('--constants_warm_start',
+                        dest='CONSTANTS_WARM_START',
+                        action='store_true',
+                        default=None,
+                        help='Starts the optimization of the constants of a '
+                             'child from the optimized constants of its '
+                             'parent.')
+    parser.add_argument('--constants_top_k',
+                        dest='CONSTANTS_TOP_K',
+                        type=int,
+                        help='Only optimizes the constants of the best k '
+                             'individuals of each generation, when scored at '
+                             'their initial constants. Requires int value.')
+    parser.add_argument('--constants_top_fraction',
+                        dest='CONSTANTS_TOP_FRACTION',
+                        action=FloatAction,
+                        help='Only optimizes the constants of the best '
+                             'fraction of each generation, when scored at '
+                             'their initial constants. Requires float value '
+                             'between 0 and 1.')
+    parser.add_argument('--constants_time_budget',
+                        dest='CONSTANTS_TIME_BUDGET',
+                        type=float,
+                        help='Sets the time in seconds for which constants '
+                             'are optimized in each generation, best '
+                             'individuals first. Requires float value.')
+    parser.add_argument('--evaluation_engine',
+                        dest='EVALUATION_ENGINE',
+                        type=str,
+                        help='Sets the evaluation engine to be used with '
+                             'supervised learning problems. Requires string '
+                             'such as "eval" or "dag", default "eval".')
+    parser.add_argument('--subtree_cache',
+                        dest='SUBTREE_CACHE',
+                        action='store_true',
+                        default=None,
+                        help='Caches the outputs of subtrees on the training '
+                             'set across generations in supervised learning '
+                             'problems. Implies --evaluation_engine dag.')
+    parser.add_argument('--subtree_cache_size',
+                        dest='SUBTREE_CACHE_SIZE',
+                        type=int,
+                        help='Sets the maximum memory used by the subtree '
+                             'cache in megabytes, requires int value. '
+                             'Default 256.')
+    parser.add_argument('--subsample',
+                        dest='SUBSAMPLE',
+                        type=str,
+                        help='Measures training fitness in supervised '
+                             'learning problems on samples of the training '
+                             'data. Requires string such as "minibatch", '
+                             '"interleaved" or "racing".')
+    parser.add_argument('--subsample_size',
+                        dest='SUBSAMPLE_SIZE',
+                        action=FloatAction,
+                        help='Sets the fraction of the training data in '
+                             'each sample, requires float value between 0 '
+                             'and 1. Default 0.1.')
+    parser.add_argument('--racing_chunks',
+                        dest='RACING_CHUNKS',
+                        type=int,
+                        help='Sets the number of chunks of the training data '
+                             'used for racing, requires int value. Default '
+                             '4.')
+    parser.add_argument('--racing_threshold',
+                        dest='RACING_THRESHOLD',
+                        type=str,
+                        help='Sets the threshold which racing individuals '
+                             'must beat. Requires "tournament" (default) or '
+                             '"elite".')
     parser.add_argument('--multicore',
                         dest='MULTICORE',
                         action='store_true',
@@ -354,6 +520,44 @@ def parse_cmd_args(arguments):
                         type=int,
                         help='Specify the number of cores to be used for '
                              'multi-core evaluation. Requires int.')
+    parser.add_argument('--shared_cache',
+                        dest='SHARED_CACHE',
+                        action='store_true',
+                        default=None,
+                        help='Shares a fitness cache between all workers '
+                             'for multi-core evaluation.')
+    parser.add_argument('--broker',
+                        dest='BROKER',
+                        type=str,
+                        help='Evaluates individuals on network workers which '
+                             'connect to the given address. Requires '
+                             '"host:port".')
+    parser.add_argument('--worker',
+                        dest='WORKER',
+                        type=str,
+                        help='Runs as a network worker for the broker at the '
+                             'given address. Requires "host:port".')
+    parser.add_argument('--broker_authkey',
+                        dest='BROKER_AUTHKEY',
+                        type=str,
+                        help='Sets the key which network workers need in '
+                             'order to connect to a broker.')
+    parser.add_argument('--broker_in_flight',
+                        dest='BROKER_IN_FLIGHT',
+                        type=int,
+                        help='Sets the maximum number of jobs in flight on '
+                             'each network worker. Requires int.')
+    parser.add_argument('--heartbeat_interval',
+                        dest='HEARTBEAT_INTERVAL',
+                        type=float,
+                        help='Sets the number of seconds between heartbeats '
+                             'sent by network workers. Requires float.')
+    parser.add_argument('--heartbeat_timeout',
+                        dest='HEARTBEAT_TIMEOUT',
+                        type=float,
+                        help='Sets the number of seconds after which a '
+                             'network worker which has not been heard from '
+                             'is dropped. Requires float.')
 
     # REPLACEMENT
     parser.add_argument('--replacement',
@@ -491,6 +695,36 @@ def parse_cmd_args(arguments):
                              ' 0.5 probability is used. Higher the probability the time'
                              ' to find the solution would be reduced')
 
+    # ISLAND MODEL
+    parser.add_argument('--islands',
+                        dest='ISLANDS',
+                        type=int,
+                        help='Sets the number of islands for the island '
+                             'model. Requires int.')
+    parser.add_argument('--migration_interval',
+                        dest='MIGRATION_INTERVAL',
+                        type=int,
+                        help='Sets the number of generations between '
+                             'migrations for the island model. Requires '
+                             'int.')
+    parser.add_argument('--migration_size',
+                        dest='MIGRATION_SIZE',
+                        type=int,
+                        help='Sets the number of individuals which emigrate '
+                             'from each island per migration. Requires int.')
+    parser.add_argument('--migration_topology',
+                        dest='MIGRATION_TOPOLOGY',
+                        type=str,
+                        help='Sets the migration topology for the island '
+                             'model. Can be either "ring", "random" or '
+                             '"full".')
+    parser.add_argument('--migration_policy',
+                        dest='MIGRATION_POLICY',
+                        type=str,
+                        help='Sets the migration policy for the island '
+                             'model, as "<emigrants>_<replaced>", e.g. '
+                             '"best_worst".')
+
     # CACHING
     class CachingAction(argparse.Action):
         """
@@ -555,6 +789,37 @@ def parse_cmd_args(arguments):
                                MUTATE_DUPLICATES=True,
                                help='Replaces duplicate individuals with '
                                     'mutated versions. Uses cache.')
+    parser.add_argument('--cache_size',
+                        dest='CACHE_SIZE',
+                        type=int,
+                        help='Sets the maximum number of entries held in the '
+                             'cache in memory, requires int value. Default '
+                             'is None, i.e. the cache can grow indefinitely.')
+    parser.add_argument('--cache_eviction',
+                        dest='CACHE_EVICTION',
+                        type=str,
+                        help='Sets the policy for evicting entries from a '
+                             'full cache. Requires "lru" (least recently '
+                             'used) or "lfu" (least frequently used).')
+    parser.add_argument('--cache_file',
+                        dest='CACHE_FILE',
+                        type=str,
+                        help='Specifies an SQLite database file in which all '
+                             'cache entries are stored. Later runs on the '
+                             'same problem can warm-start from this file.')
+    parser.add_argument('--cache_digest',
+                        dest='CACHE_DIGEST',
+                        action='store_true',
+                        default=None,
+                        help='Keys cache entries by a 128-bit digest of the '
+                             'phenotype rather than the phenotype itself.')
+    parser.add_argument('--cache_digest_verify',
+                        dest='CACHE_DIGEST_VERIFY',
+                        action='store_true',
+                        default=None,
+                        help='Checks the full phenotype of cache entries on '
+                             'lookup to guard against digest collisions. '
+                             'Requires --cache_digest.')
 
     # Parse command line arguments using all above information.
     args, unknown = parser.parse_known_args(arguments)
@@ -26,6 +26,23 @@ def initialise_run_params(create_files):
         params['RANDOM_SEED'] = int(start.microsecond)
     seed(params['RANDOM_SEED'])
 
+    # Set up the fitness cache.
+    if params['CACHE']:
+        trackers.cache.configure(params['CACHE_SIZE'],
+                                 params['CACHE_EVICTION'],
+                                 params['CACHE_FILE'],
+                                 get_cache_namespace(),
+                                 params['CACHE_DIGEST'],
+                                 params['CACHE_DIGEST_VERIFY'])
+
+    # Set up the subtree cache.
+    if params['SUBTREE_CACHE']:
+        trackers.subtree_cache.configure(params['SUBTREE_CACHE_SIZE'] * 2**20)
+
+    # Set up the cache of optimised constants.
+    if params['CONSTANTS_CACHE']:
+        trackers.constants_cache.configure(params['CONSTANTS_CACHE_SIZE'])
+
     # Generate a time stamp for use with folder and file names.
     hms = "%02d%02d%02d" % (start.hour, start.minute, start.second)
     params['TIME_STAMP'] = "_".join([gethostname(),
@@ -46,6 +63,22 @@ def initialise_run_params(create_files):
         generate_folders_and_files()
 
 
+def get_cache_namespace():
+    """
+    Generate a namespace for entries in the fitness cache which describes the
+    problem being solved, so that fitnesses of the same phenotype on
+    different problems are kept apart when the cache is stored on disk.
+    Must be called before the fitness function is imported.
+
+    :return: A string describing the current problem.
+    """
+
+    return "|".join([str(params[key]) for key in
+                     ['FITNESS_FUNCTION', 'DATASET_TRAIN', 'ERROR_METRIC',
+                      'OPTIMIZE_CONSTANTS', 'TARGET']] +
+                    [str(params.get('EXTRA_PARAMETERS'))])
+
+
 def set_param_imports():
     """
     This function makes the command line experience easier for users. When
@@ -280,14 +313,14 @@ def return_attr_from_module(module_name, attr_name):
 def pool_init(params_):
     """
     When initialising the pool the original params dict (params_) is passed in
-    and used to update the newly created instance of params, as Windows does
-    not retain the system memory of the parent process.
+    and used to update the newly created instance of params, as Windows (and
+    any other platform which spawns rather than forks worker processes) does
+    not retain the system memory of the parent process. Forked workers
+    already share the params of the parent process.
 
     :param params_: original params dict
     :return: Nothing.
     """
 
-    from platform import system
-
-    if system() == 'Windows':
+    if params_ is not params:
         params.update(params_)
@@ -0,0 +1,67 @@
+from functools import lru_cache
+
+import numpy as np
+from utilities.fitness import math_functions
+
+# The maximum number of compiled phenotypes which are held in memory.
+COMPILE_CACHE_SIZE = 10000
+
+# Phenotypes are compiled in a namespace holding numpy and all math functions
+# which grammars can use.
+namespace = dict(vars(math_functions), np=np)
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def get_function(phenotype):
+    """
+    Compile a phenotype string which refers to inputs x and (optionally)
+    constants c into a function of x and c. The most recently used compiled
+    phenotypes are cached, so that a phenotype is only parsed and compiled
+    once however often it is evaluated.
+
+    :param phenotype: A phenotype string, e.g. "x[:, 0] + c[0]".
+    :return: A function f(x, c) which evaluates the phenotype.
+    """
+
+    return eval("lambda x, c: " + phenotype, namespace)
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def get_code(phenotype):
+    """
+    Compile a phenotype string into a code object, which can be evaluated
+    with eval() in any namespace. The most recently used compiled phenotypes
+    are cached.
+
+    :param phenotype: A phenotype string.
+    :return: A code object.
+    """
+
+    return compile(phenotype, "<phenotype>", "eval")
+
+
+def compile_phenotype(ind, phenotype=None):
+    """
+    Get the compiled function of a phenotype of an individual. Compiled
+    functions are attached to the individual (as ind.compiled, a dictionary
+    of functions by phenotype string), so that repeated evaluations of the
+    individual, e.g. on the test set, do not need to look them up again.
+
+    :param ind: An individual.
+    :param phenotype: The phenotype string to compile. Defaults to the
+    phenotype of the individual.
+    :return: A function f(x, c) which evaluates the phenotype.
+    """
+
+    if phenotype is None:
+        phenotype = ind.phenotype
+
+    compiled = getattr(ind, 'compiled', None)
+
+    if compiled is None:
+        compiled = ind.compiled = {}
+
+    if phenotype not in compiled:
+        compiled[phenotype] = get_function(phenotype)
+
+    return compiled[phenotype]
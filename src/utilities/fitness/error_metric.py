@@ -19,6 +19,49 @@ def mae(y, yhat):
 # Set maximise attribute for mae error metric.
 mae.maximise = False
 
+# Set the pointwise errors, and how the error metric is found from their
+# total and number, for racing (see supervised_learning).
+mae.pointwise = lambda y, yhat: np.abs(y - yhat)
+mae.reduce = lambda total, n: total / n
+
+
+def mae_batch(y, yhat):
+    """
+    Calculate the mean absolute error of many estimates at once.
+
+    :param y: The expected input (i.e. from dataset).
+    :param yhat: A 2-D array of given inputs (i.e. from phenotypes), with
+    one row per individual. It is not modified.
+    :return: An array of the mean absolute error of each row.
+    """
+
+    error = np.subtract(yhat, y)
+    np.abs(error, out=error)
+
+    return error.mean(axis=1)
+
+
+# Set the batched version of the error metric.
+mae.batch = mae_batch
+
+
+def mae_gradient(y, yhat):
+    """
+    Calculate the gradient of the mean absolute error with respect to each
+    estimate, for the optimisation of constants.
+
+    :param y: The expected input (i.e. from dataset).
+    :param yhat: The given input (i.e. from phenotype).
+    :return: An array of the derivative of the error with respect to each
+    element of yhat.
+    """
+
+    return np.sign(yhat - y) / y.size
+
+
+# Set the gradient of the error metric.
+mae.gradient = mae_gradient
+
 
 def rmse(y, yhat):
     """
@@ -35,6 +78,52 @@ def rmse(y, yhat):
 # Set maximise attribute for rmse error metric.
 rmse.maximise = False
 
+# Set the pointwise errors for racing.
+rmse.pointwise = lambda y, yhat: np.square(y - yhat)
+rmse.reduce = lambda total, n: np.sqrt(total / n)
+
+
+def rmse_batch(y, yhat):
+    """
+    Calculate the root mean square error of many estimates at once.
+
+    :param y: The expected input (i.e. from dataset).
+    :param yhat: A 2-D array of given inputs (i.e. from phenotypes), with
+    one row per individual. It is not modified.
+    :return: An array of the root mean square error of each row.
+    """
+
+    return np.sqrt(mse_batch(y, yhat))
+
+
+# Set the batched version of the error metric.
+rmse.batch = rmse_batch
+
+
+def rmse_gradient(y, yhat):
+    """
+    Calculate the gradient of the root mean square error with respect to
+    each estimate, for the optimisation of constants.
+
+    :param y: The expected input (i.e. from dataset).
+    :param yhat: The given input (i.e. from phenotype).
+    :return: An array of the derivative of the error with respect to each
+    element of yhat.
+    """
+
+    error = yhat - y
+    root = np.sqrt(np.mean(np.square(error)))
+
+    if root == 0:
+        # The error is at its minimum.
+        return np.zeros_like(error)
+
+    return error / (y.size * root)
+
+
+# Set the gradient of the error metric.
+rmse.gradient = rmse_gradient
+
 
 def mse(y, yhat):
     """
@@ -51,6 +140,48 @@ def mse(y, yhat):
 # Set maximise attribute for mse error metric.
 mse.maximise = False
 
+# Set the pointwise errors for racing.
+mse.pointwise = lambda y, yhat: np.square(y - yhat)
+mse.reduce = lambda total, n: total / n
+
+
+def mse_batch(y, yhat):
+    """
+    Calculate the mean square error of many estimates at once.
+
+    :param y: The expected input (i.e. from dataset).
+    :param yhat: A 2-D array of given inputs (i.e. from phenotypes), with
+    one row per individual. It is not modified.
+    :return: An array of the mean square error of each row.
+    """
+
+    error = np.subtract(yhat, y)
+    np.square(error, out=error)
+
+    return error.mean(axis=1)
+
+
+# Set the batched version of the error metric.
+mse.batch = mse_batch
+
+
+def mse_gradient(y, yhat):
+    """
+    Calculate the gradient of the mean square error with respect to each
+    estimate, for the optimisation of constants.
+
+    :param y: The expected input (i.e. from dataset).
+    :param yhat: The given input (i.e. from phenotype).
+    :return: An array of the derivative of the error with respect to each
+    element of yhat.
+    """
+
+    return 2 * (yhat - y) / y.size
+
+
+# Set the gradient of the error metric.
+mse.gradient = mse_gradient
+
 
 def hinge(y, yhat):
     """
@@ -65,9 +196,10 @@ def hinge(y, yhat):
 
     # Deal with possibility of {-1, 1} or {0, 1} class label convention
     y_vals = set(y)
-    # convert from {0, 1} to {-1, 1}
+    # convert from {0, 1} to {-1, 1}. The dataset itself is not modified,
+    # since it may be read-only (e.g. memory mapped) or shared.
     if 0 in y_vals:
-        y[y == 0] = -1
+        y = np.where(y == 0, -1, y)
 
     # Our definition of hinge loss cannot be used for multi-class
     assert len(y_vals) == 2
@@ -82,6 +214,56 @@ def hinge(y, yhat):
 hinge.maximise = False
 
 
+def hinge_batch(y, yhat):
+    """
+    Calculate the hinge loss of many estimates at once.
+
+    :param y: The expected input (i.e. from dataset).
+    :param yhat: A 2-D array of given inputs (i.e. from phenotypes), with
+    one row per individual. It is not modified.
+    :return: An array of the hinge loss of each row.
+    """
+
+    # Deal with possibility of {-1, 1} or {0, 1} class label convention
+    y_vals = set(y)
+    if 0 in y_vals:
+        y = np.where(y == 0, -1, y)
+
+    assert len(y_vals) == 2
+
+    loss = np.multiply(yhat, y)
+    np.subtract(1, loss, out=loss)
+    np.maximum(loss, 0, out=loss)
+
+    return loss.mean(axis=1)
+
+
+# Set the batched version of the error metric.
+hinge.batch = hinge_batch
+
+
+def hinge_gradient(y, yhat):
+    """
+    Calculate the (sub)gradient of the hinge loss with respect to each
+    estimate, for the optimisation of constants.
+
+    :param y: The expected input (i.e. from dataset).
+    :param yhat: The given input (i.e. from phenotype).
+    :return: An array of the derivative of the loss with respect to each
+    element of yhat.
+    """
+
+    # Deal with possibility of {-1, 1} or {0, 1} class label convention
+    if 0 in set(y):
+        y = np.where(y == 0, -1, y)
+
+    return np.where(1 - y * yhat > 0, -y, 0) / y.size
+
+
+# Set the gradient of the error metric.
+hinge.gradient = hinge_gradient
+
+
 def f1_score(y, yhat):
     """
     The F_1 score is a metric for classification which tries to balance
@@ -104,9 +286,10 @@ def f1_score(y, yhat):
     # convention elsewhere and/or create user parameter to control it?
     # See https://github.com/PonyGE/PonyGE2/issues/113.
     y_vals = set(y)
-    # convert from {-1, 1} to {0, 1}
+    # convert from {-1, 1} to {0, 1}. The dataset itself is not modified,
+    # since it may be read-only (e.g. memory mapped) or shared.
     if -1 in y_vals:
-        y[y == -1] = 0
+        y = np.where(y == -1, 0, y)
 
     # We binarize with a threshold, so this cannot be used for multi-class
     assert len(y_vals) == 2
@@ -127,6 +310,68 @@ def f1_score(y, yhat):
 f1_score.maximise = True
 
 
+def f1_score_batch(y, yhat):
+    """
+    Calculate the F_1 score of many estimates at once. As in f1_score, real
+    values are converted to boolean predictions with a zero threshold, and
+    the score is the average of the F_1 scores of both classes, weighted by
+    the number of true instances of each class (i.e. sklearn's "weighted"
+    average).
+
+    :param y: The expected input (i.e. from dataset).
+    :param yhat: A 2-D array of given inputs (i.e. from phenotypes), with
+    one row per individual. It is not modified.
+    :return: An array of the f1 score of each row.
+    """
+
+    # Deal with possibility of {-1, 1} or {0, 1} class label convention.
+    y_vals = set(y)
+    if -1 in y_vals:
+        y = np.where(y == -1, 0, y)
+
+    # We binarize with a threshold, so this cannot be used for multi-class
+    assert len(y_vals) == 2
+
+    if set(y) != {0, 1}:
+        # Other labels are never matched by boolean predictions. Leave
+        # them to sklearn.
+        return np.array([f1_score(y, row) for row in yhat])
+
+    positive = (y == 1).astype(float)
+    n, n_positive = len(y), positive.sum()
+
+    # The confusion matrix of each row. True positives are counted with a
+    # single matrix-vector product.
+    predicted = yhat > 0
+    tp = predicted.astype(float) @ positive
+    predicted_positive = predicted.sum(axis=1)
+    fp = predicted_positive - tp
+    fn = n_positive - tp
+
+    # For the negative class, the roles of false positives and false
+    # negatives are swapped.
+    tn = (n - n_positive) - fp
+
+    def f1(tp, fp, fn):
+        # As in sklearn, the F_1 score is found from precision and recall,
+        # and is zero where either is undefined.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.where(tp + fp > 0, tp / (tp + fp), 0)
+            recall = np.where(tp + fn > 0, tp / (tp + fn), 0)
+            f = np.where(precision + recall > 0, 2 * precision * recall /
+                         (precision + recall), 0)
+        return f
+
+    # The average of both classes (negative first, as in sklearn), weighted
+    # by the number of true instances of each class.
+    return ((n - n_positive) * f1(tn, fn, fp) + n_positive * f1(tp, fp, fn)) \
+        / n
+
+
+# Set the batched version of the error metric.
+f1_score.batch = f1_score_batch
+
+
 def Hamming_error(y, yhat):
     """
     The number of mismatches between y and yhat. Suitable
@@ -137,3 +382,18 @@ def Hamming_error(y, yhat):
 
 
 Hamming_error.maximise = False
+
+# Set the pointwise errors for racing.
+Hamming_error.pointwise = lambda y, yhat: y != yhat
+Hamming_error.reduce = lambda total, n: total
+
+
+def Hamming_error_batch(y, yhat):
+    """
+    The number of mismatches between y and each row of yhat.
+    """
+    return np.count_nonzero(yhat != y, axis=1)
+
+
+# Set the batched version of the error metric.
+Hamming_error.batch = Hamming_error_batch
@@ -0,0 +1,372 @@
+import ast
+import operator
+
+from utilities.fitness.compile_phenotype import namespace
+
+# Python operators, by the name of their AST node class.
+BINARY_OPERATORS = {
+    'Add': operator.add,
+    'Sub': operator.sub,
+    'Mult': operator.mul,
+    'Div': operator.truediv,
+    'FloorDiv': operator.floordiv,
+    'Mod': operator.mod,
+    'Pow': operator.pow,
+    'MatMult': operator.matmul,
+    'LShift': operator.lshift,
+    'RShift': operator.rshift,
+    'BitAnd': operator.and_,
+    'BitOr': operator.or_,
+    'BitXor': operator.xor,
+}
+
+UNARY_OPERATORS = {
+    'USub': operator.neg,
+    'UAdd': operator.pos,
+    'Invert': operator.invert,
+    'Not': operator.not_,
+}
+
+COMPARISON_OPERATORS = {
+    'Eq': operator.eq,
+    'NotEq': operator.ne,
+    'Lt': operator.lt,
+    'LtE': operator.le,
+    'Gt': operator.gt,
+    'GtE': operator.ge,
+    'Is': operator.is_,
+    'IsNot': operator.is_not,
+}
+
+# Kinds of nodes whose values are worth caching across generations. Names,
+# constants and subscripts (e.g. x[:, 0]) are cheap to evaluate.
+CACHED_NODES = ("BinOp", "UnaryOp", "Compare", "Call")
+
+# Errors which give an individual a runtime error rather than stopping the
+# run, as in fitness.base_ff_classes.base_ff.
+RUNTIME_ERRORS = (FloatingPointError, ZeroDivisionError, OverflowError,
+                  MemoryError)
+
+
+class Unsupported(Exception):
+    """
+    Raised when a phenotype uses syntax which the expression DAG does not
+    support. Such phenotypes are evaluated on their own instead.
+    """
+
+    pass
+
+
+class ExpressionDAG(object):
+    """
+    A directed acyclic graph of the expressions of a whole population of
+    phenotypes. Every phenotype is parsed into its syntax tree, and each
+    sub-expression is hash-consed: identical sub-expressions (e.g. the same
+    "pdiv(x[:, 0], x[:, 3])" appearing in many individuals) become a single
+    node of the graph. Every unique node is then evaluated only once on a
+    dataset, and its value is freed as soon as nothing else needs it.
+
+    Phenotypes are evaluated with the same semantics as eval(), in a
+    namespace of numpy and all math functions which grammars can use, with
+    the inputs bound to x and constants bound to c.
+
+    Every node also has a canonical string, which is the same for the same
+    subtree in any graph. Values of nodes can therefore be kept across
+    graphs (i.e. generations) in a subtree cache, see
+    utilities.fitness.subtree_cache.
+    """
+
+    def __init__(self):
+        """
+        Create an empty graph.
+        """
+
+        # The operation and the children of each node, as a tuple which is
+        # also the key of the node. Nodes are numbered in the order in which
+        # they are created, so children always come before their parents.
+        self.nodes = []
+
+        # The number of each node, by key.
+        self.ids = {}
+
+        # The canonical string of each node.
+        self.strings = []
+
+        # Nodes which are the root of a phenotype.
+        self.roots = set()
+
+    def add(self, phenotype):
+        """
+        Add a phenotype to the graph.
+
+        :param phenotype: A phenotype string.
+        :return: The number of the root node of the phenotype, or None if
+        the phenotype uses syntax which is not supported (or is not valid).
+        """
+
+        try:
+            tree = ast.parse(phenotype.strip(), mode="eval")
+            root = self.add_node(tree.body)
+
+        except (SyntaxError, Unsupported):
+            return None
+
+        self.roots.add(root)
+
+        return root
+
+    def add_node(self, node):
+        """
+        Recursively add a node of a syntax tree, and all of its children,
+        to the graph.
+
+        :param node: A node of a syntax tree.
+        :return: The number of the node in the graph.
+        """
+
+        kind = type(node).__name__
+
+        if kind in ("Constant", "NameConstant"):
+            op = (kind, repr(node.value), type(node.value).__name__)
+            children = ()
+
+        elif kind == "Num":
+            op, children = (kind, repr(node.n), type(node.n).__name__), ()
+
+        elif kind == "Name":
+            op, children = (kind, node.id), ()
+
+        elif kind == "Attribute":
+            op, children = (kind, node.attr), (node.value,)
+
+        elif kind == "Index":
+            op, children = (kind,), (node.value,)
+
+        elif kind == "Subscript":
+            op, children = (kind,), (node.value, node.slice)
+
+        elif kind == "Slice":
+            parts = (node.lower, node.upper, node.step)
+            op = (kind,) + tuple([n is not None for n in parts])
+            children = tuple([n for n in parts if n is not None])
+
+        elif kind == "Tuple":
+            op, children = (kind,), tuple(node.elts)
+
+        elif kind == "BinOp":
+            op = (kind, type(node.op).__name__)
+            children = (node.left, node.right)
+
+            if op[1] not in BINARY_OPERATORS:
+                raise Unsupported(op[1])
+
+        elif kind == "UnaryOp":
+            op, children = (kind, type(node.op).__name__), (node.operand,)
+
+            if op[1] not in UNARY_OPERATORS:
+                raise Unsupported(op[1])
+
+        elif kind == "Compare":
+            op = (kind,) + tuple([type(o).__name__ for o in node.ops])
+            children = (node.left,) + tuple(node.comparators)
+
+            if not all([o in COMPARISON_OPERATORS for o in op[1:]]):
+                raise Unsupported(kind)
+
+        elif kind == "Call":
+            if any([type(arg).__name__ == "Starred" for arg in node.args]) or \
+                    any([kw.arg is None for kw in node.keywords]):
+                raise Unsupported(kind)
+
+            op = (kind, len(node.args)) + \
+                tuple([kw.arg for kw in node.keywords])
+            children = (node.func,) + tuple(node.args) + \
+                tuple([kw.value for kw in node.keywords])
+
+        else:
+            raise Unsupported(kind)
+
+        # Identical sub-expressions share a single node.
+        key = (op, tuple([self.add_node(child) for child in children]))
+
+        if key not in self.ids:
+            self.ids[key] = len(self.nodes)
+            self.nodes.append(key)
+            self.strings.append("%r(%s)" % (op, ", ".join(
+                [self.strings[child] for child in key[1]])))
+
+        return self.ids[key]
+
+    def evaluate(self, x, c=None, cache=None):
+        """
+        Evaluate every node of the graph once on a dataset. Values of nodes
+        are freed once all of their parents (and, for roots, the caller)
+        have used them.
+
+        If a subtree cache is given, nodes whose values are cached are not
+        evaluated again, and neither are any of their children which are
+        not otherwise needed. The values of all other nodes which are worth
+        caching are added to the cache. The cache must only ever be used
+        with the same dataset.
+
+        :param x: The inputs of the dataset.
+        :param c: The constants, if any.
+        :param cache: An optional subtree cache.
+        :return: A generator of tuples of the number of each root node and
+        its value. If evaluating the root produced a runtime error, the
+        value is the exception which was raised.
+        """
+
+        # Find the nodes which need to be evaluated, and the values of those
+        # which are cached. Parents always come after their children.
+        needed = [i in self.roots for i in range(len(self.nodes))]
+        cached = {}
+
+        for i in reversed(range(len(self.nodes))):
+            op, children = self.nodes[i]
+
+            if not needed[i]:
+                continue
+
+            if cache is not None and op[0] in CACHED_NODES:
+                value = cache.get(self.strings[i])
+
+                if value is not None:
+                    cached[i] = value
+                    continue
+
+            for child in children:
+                needed[child] = True
+
+        # The number of remaining uses of the value of each node.
+        uses = [1 if i in self.roots else 0 for i in range(len(self.nodes))]
+        for i, (_, children) in enumerate(self.nodes):
+            if needed[i] and i not in cached:
+                for child in children:
+                    uses[child] += 1
+
+        values = {}
+
+        for i, (op, children) in enumerate(self.nodes):
+            if not needed[i]:
+                continue
+
+            if i in cached:
+                values[i], children = cached.pop(i), ()
+
+            else:
+                args = [values[child] for child in children]
+
+                error = [a for a in args if isinstance(a, RuntimeErrorValue)]
+
+                if error:
+                    # The error of a child is passed on to its parents.
+                    values[i] = error[0]
+
+                else:
+                    try:
+                        values[i] = evaluate_node(op, args, x, c)
+
+                    except RUNTIME_ERRORS as err:
+                        values[i] = RuntimeErrorValue(err)
+
+                    else:
+                        if cache is not None and op[0] in CACHED_NODES:
+                            cache.add(self.strings[i], values[i])
+
+            if i in self.roots:
+                value = values[i]
+
+                if isinstance(value, RuntimeErrorValue):
+                    value = value.error
+
+                yield i, value
+
+                uses[i] -= 1
+
+            for child in children:
+                uses[child] -= 1
+
+            for node in set(children + (i,)):
+                if not uses[node]:
+                    del values[node]
+
+
+def evaluate_node(op, args, x, c):
+    """
+    Evaluate a single node of an expression DAG given the values of its
+    children.
+
+    :param op: The operation of the node.
+    :param args: The values of the children of the node.
+    :param x: The inputs of the dataset.
+    :param c: The constants, if any.
+    :return: The value of the node.
+    """
+
+    kind = op[0]
+
+    if kind in ("Constant", "NameConstant", "Num"):
+        return ast.literal_eval(op[1])
+
+    elif kind == "Name":
+        if op[1] == "x":
+            return x
+        elif op[1] == "c":
+            return c
+
+        return namespace[op[1]]
+
+    elif kind == "Attribute":
+        return getattr(args[0], op[1])
+
+    elif kind == "Index":
+        return args[0]
+
+    elif kind == "Subscript":
+        return args[0][args[1]]
+
+    elif kind == "Slice":
+        args = iter(args)
+        return slice(*[next(args) if given else None for given in op[1:]])
+
+    elif kind == "Tuple":
+        return tuple(args)
+
+    elif kind == "BinOp":
+        return BINARY_OPERATORS[op[1]](args[0], args[1])
+
+    elif kind == "UnaryOp":
+        return UNARY_OPERATORS[op[1]](args[0])
+
+    elif kind == "Compare":
+        # Chained comparisons have the same semantics as in Python.
+        comparisons = list(zip(op[1:], args, args[1:]))
+
+        for name, left, right in comparisons[:-1]:
+            result = COMPARISON_OPERATORS[name](left, right)
+            if not result:
+                return result
+
+        name, left, right = comparisons[-1]
+
+        return COMPARISON_OPERATORS[name](left, right)
+
+    elif kind == "Call":
+        n_args = op[1]
+        keywords = dict(zip(op[2:], args[1 + n_args:]))
+
+        return args[0](*args[1:1 + n_args], **keywords)
+
+
+class RuntimeErrorValue(object):
+    """
+    The value of a node whose evaluation produced a runtime error.
+    """
+
+    def __init__(self, error):
+        """
+        :param error: The exception which was raised.
+        """
+
+        self.error = error
@@ -1,4 +1,5 @@
-from os import path
+from hashlib import blake2b
+from os import getpid, makedirs, path, replace, stat
 
 import numpy as np
 from algorithm.parameters import params
@@ -52,14 +53,10 @@ def get_Xy_train_test_separate(train_filename, test_filename, skip_header=0):
                     break
         f.close()
 
-    # Read in all training data.
-    train_Xy = np.genfromtxt(train_filename, skip_header=skip_header,
-                             delimiter=delimiter)
-
     try:
-        # Separate out input (X) and output (y) data.
-        train_X = train_Xy[:, :-1] # all columns but last
-        train_y = train_Xy[:, -1]  # last column
+        # Read in all training data, and separate out input (X) and output
+        # (y) data.
+        train_X, train_y = load_Xy(train_filename, delimiter, skip_header)
 
     except IndexError:
         s = "utilities.fitness.get_data.get_Xy_train_test_separate\n" \
@@ -68,13 +65,9 @@ def get_Xy_train_test_separate(train_filename, test_filename, skip_header=0):
         raise Exception(s)
 
     if test_filename:
-        # Read in all testing data.
-        test_Xy = np.genfromtxt(test_filename, skip_header=skip_header,
-                                delimiter=delimiter)
-
-        # Separate out input (X) and output (y) data.
-        test_X = test_Xy[:, :-1] # all columns but last
-        test_y = test_Xy[:, -1]  # last column
+        # Read in all testing data, and separate out input (X) and output
+        # (y) data.
+        test_X, test_y = load_Xy(test_filename, delimiter, skip_header)
 
     else:
         test_X, test_y = None, None
@@ -82,6 +75,126 @@ def get_Xy_train_test_separate(train_filename, test_filename, skip_header=0):
     return train_X, train_y, test_X, test_y
 
 
+def read_Xy(filename, delimiter, skip_header):
+    """
+    Parse a data file and split it into X (all columns up to last) and y
+    (last column), in the layout and type used for evaluation.
+
+    :param filename: The file name of the dataset.
+    :param delimiter: The delimiter of the dataset.
+    :param skip_header: The number of header lines to skip.
+    :return: Numpy arrays of the input (x) and output (y) data.
+    """
+
+    Xy = np.genfromtxt(filename, skip_header=skip_header,
+                       delimiter=delimiter)
+
+    X = Xy[:, :-1]  # all columns but last
+    y = Xy[:, -1]  # last column
+
+    return format_dataset(X), format_dataset(y)
+
+
+def load_Xy(filename, delimiter, skip_header):
+    """
+    Load a data file split into X and y. If DATASET_CACHE is set, the data
+    are only parsed once and saved in binary (.npy) files in
+    DATASET_CACHE_DIR (by default, next to the data file). Later runs load
+    the binary files as read-only memory maps, which is nearly instant, and
+    all processes which load the same files share the same pages of memory
+    rather than each holding its own copy.
+
+    The binary files are keyed by the path, size and modification time of
+    the data file and by everything else which changes the parsed arrays
+    (the delimiter, the header, and the layout and type of the data), so
+    that they are not used for a data file which has changed since. If
+    DATASET_CACHE_VERIFY is set, a digest of the contents of the data file
+    is added to the key, so that the binary files are not used even for a
+    data file which has changed without a change of size or modification
+    time. This means reading the whole data file in every run.
+
+    :param filename: The file name of the dataset.
+    :param delimiter: The delimiter of the dataset.
+    :param skip_header: The number of header lines to skip.
+    :return: Numpy arrays of the input (x) and output (y) data.
+    """
+
+    if not params['DATASET_CACHE']:
+        return read_Xy(filename, delimiter, skip_header)
+
+    # Get the names of the binary files.
+    info = stat(filename)
+
+    digest = blake2b(repr((path.abspath(filename), info.st_size,
+                           info.st_mtime_ns, delimiter, skip_header,
+                           params['DATASET_ORDER'],
+                           params['DATASET_DTYPE'])).encode(),
+                     digest_size=16)
+
+    if params['DATASET_CACHE_VERIFY']:
+        with open(filename, "rb") as f:
+            for block in iter(lambda: f.read(2**20), b""):
+                digest.update(block)
+
+    cache_dir = params['DATASET_CACHE_DIR'] or path.dirname(filename)
+    stem = path.join(cache_dir, "%s.%s" % (path.basename(filename),
+                                          digest.hexdigest()))
+    X_file, y_file = stem + ".X.npy", stem + ".y.npy"
+
+    if not (path.isfile(X_file) and path.isfile(y_file)):
+        # Parse the data file and save the arrays. The files are written
+        # under temporary names and then renamed, so that other processes
+        # never load partly written files.
+        X, y = read_Xy(filename, delimiter, skip_header)
+
+        makedirs(cache_dir, exist_ok=True)
+
+        for array, file_name in ((X, X_file), (y, y_file)):
+            temp_file = "%s.%d.tmp.npy" % (file_name[:-4], getpid())
+            np.save(temp_file, array)
+            replace(temp_file, file_name)
+
+    return np.load(X_file, mmap_mode="r"), np.load(y_file, mmap_mode="r")
+
+
+def format_dataset(array, order=None):
+    """
+    Convert an array of a dataset to the memory layout and data type used
+    for evaluation.
+
+    Grammars index input data by column, e.g. x[:, 0]. By default, inputs
+    are therefore stored in column-major (Fortran) order, so that every
+    column is contiguous in memory and accessing it does not need a strided
+    copy. Datasets which hold one variable per row, e.g. x[0], should be
+    stored in row-major (C) order instead.
+
+    Floating point data are cast to DATASET_DTYPE, e.g. "float32" to halve
+    the memory (and memory bandwidth) used by the dataset. Data of other
+    types, e.g. boolean inputs, keep their type.
+
+    :param array: A numpy array of inputs or outputs.
+    :param order: The memory layout, either "F" (column-major) or "C"
+    (row-major). Defaults to DATASET_ORDER.
+    :return: The array in the given layout and type. The array itself is
+    returned if it already has that layout and type.
+    """
+
+    if order is None:
+        order = params['DATASET_ORDER']
+
+    if order not in ("C", "F"):
+        s = "utilities.fitness.get_data.format_dataset\n" \
+            "Error: unknown dataset order '%s'.\n" \
+            "       Valid orders are 'C' and 'F'." % order
+        raise Exception(s)
+
+    dtype = None
+    if np.issubdtype(array.dtype, np.floating):
+        dtype = params['DATASET_DTYPE']
+
+    return np.require(array, dtype=dtype, requirements=[order])
+
+
 def get_data(train, test):
     """
     Return the training and test data for the current experiment.
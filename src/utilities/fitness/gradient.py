@@ -0,0 +1,268 @@
+from functools import lru_cache
+
+import numpy as np
+from utilities.fitness.compile_phenotype import COMPILE_CACHE_SIZE
+from utilities.fitness.expression_dag import ExpressionDAG, Unsupported, \
+    evaluate_node
+from utilities.fitness.math_functions import aq, pdiv, plog, ppow, ppow2, \
+    psqrt, psqrt2, rlog
+
+# The partial derivatives of Python operators, by the name of their AST node
+# class. Each is a function of the arguments and the value of the operation,
+# and returns the partial derivative of the value with respect to each
+# argument.
+BINARY_DERIVATIVES = {
+    'Add': lambda a, b, v: (1, 1),
+    'Sub': lambda a, b, v: (1, -1),
+    'Mult': lambda a, b, v: (b, a),
+    'Div': lambda a, b, v: (1 / b, -v / b),
+    'Pow': lambda a, b, v: (b * a ** (b - 1), v * np.log(a)),
+}
+
+UNARY_DERIVATIVES = {
+    'USub': lambda a, v: (-1,),
+    'UAdd': lambda a, v: (1,),
+}
+
+# The partial derivatives of the functions which grammars can use.
+FUNCTION_DERIVATIVES = {
+    np.add: BINARY_DERIVATIVES['Add'],
+    np.subtract: BINARY_DERIVATIVES['Sub'],
+    np.multiply: BINARY_DERIVATIVES['Mult'],
+    np.divide: BINARY_DERIVATIVES['Div'],
+    np.power: BINARY_DERIVATIVES['Pow'],
+    np.negative: UNARY_DERIVATIVES['USub'],
+    np.sin: lambda a, v: (np.cos(a),),
+    np.cos: lambda a, v: (-np.sin(a),),
+    np.tan: lambda a, v: (1 + v ** 2,),
+    np.exp: lambda a, v: (v,),
+    np.log: lambda a, v: (1 / a,),
+    np.sqrt: lambda a, v: (0.5 / v,),
+    np.tanh: lambda a, v: (1 - v ** 2,),
+    np.abs: lambda a, v: (np.sign(a),),
+    np.square: lambda a, v: (2 * a,),
+    aq: lambda a, b, v: (1 / np.sqrt(1 + b ** 2), -v * b / (1 + b ** 2)),
+    pdiv: lambda a, b, v: (np.where(b == 0, 0, 1 / b),
+                           np.where(b == 0, 0, -v / b)),
+    rlog: lambda a, v: (np.where(a == 0, 0, 1 / a),),
+    ppow: lambda a, b, v: (b * np.sign(a) * np.abs(a) ** (b - 1),
+                           v * np.log(np.abs(a))),
+    ppow2: lambda a, b, v: (b * np.abs(a) ** (b - 1),
+                            v * np.log(np.abs(a))),
+    psqrt: lambda a, v: (np.sign(a) * 0.5 / v,),
+    psqrt2: lambda a, v: (0.5 / np.abs(v),),
+    plog: lambda a, v: (np.sign(a) / (1 + np.abs(a)),),
+}
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def get_graph(phenotype):
+    """
+    Parse a phenotype into an expression DAG (see
+    utilities.fitness.expression_dag), and find which of its nodes are
+    static and which vary with the constants. The most recently used graphs
+    are cached.
+
+    :param phenotype: A phenotype string.
+    :return: The graph of the phenotype.
+    :raises Unsupported: If the phenotype uses syntax or functions whose
+    derivatives are not known.
+    """
+
+    graph = ExpressionDAG()
+
+    if graph.add(phenotype) is None:
+        raise Unsupported(phenotype)
+
+    # The values of nodes which depend on neither the inputs nor the
+    # constants (e.g. numbers, and functions such as np.sin), which are not
+    # evaluated again on every call. Calls are not assumed to be pure.
+    graph.static = {}
+
+    # Whether or not the value of each node varies with the constants.
+    graph.varying = []
+
+    for i, (op, children) in enumerate(graph.nodes):
+        kind = op[0]
+
+        if kind not in ("Call", "Subscript") and \
+                op not in (("Name", "x"), ("Name", "c")) and \
+                all([child in graph.static for child in children]):
+            graph.static[i] = evaluate_node(op, [graph.static[child] for
+                                                 child in children], None,
+                                            None)
+
+        varying = [graph.varying[child] for child in children]
+
+        if op == ("Name", "c"):
+            graph.varying.append(True)
+
+        elif not any(varying) or kind == "Compare":
+            # Comparisons are piecewise constant.
+            graph.varying.append(False)
+
+        elif (kind == "Index") or \
+                (kind == "Subscript" and not varying[1]) or \
+                (kind == "BinOp" and op[1] in BINARY_DERIVATIVES) or \
+                (kind == "UnaryOp" and op[1] in UNARY_DERIVATIVES) or \
+                (kind == "Call" and len(op) == 2 and
+                 children[0] in graph.static and
+                 get_derivatives(graph.static[children[0]], op[1])):
+            graph.varying.append(True)
+
+        else:
+            raise Unsupported(kind)
+
+    return graph
+
+
+def loss_and_gradient(phenotype, x, y, c, loss):
+    """
+    Evaluate the loss of a phenotype, along with its gradient with respect
+    to the constants of the phenotype, by reverse-mode automatic
+    differentiation. The phenotype is evaluated in a forward pass over the
+    nodes of its graph, and the derivatives of the loss with respect to the
+    value of each node (the adjoints) are then passed back from the root to
+    the constants by the chain rule. The gradient therefore costs about as
+    much as a second evaluation of the phenotype, however many constants
+    it has.
+
+    Values are evaluated with the same semantics as eval(), so runtime
+    errors are raised as usual. Floating point errors in the gradient are
+    ignored: derivatives which are not defined are not finite.
+
+    :param phenotype: A phenotype string which refers to inputs x and
+    constants c.
+    :param x: The inputs of the dataset.
+    :param y: The expected outputs of the dataset.
+    :param c: An array of values for the constants.
+    :param loss: The error metric, which must have a gradient attribute
+    (see utilities.fitness.error_metric).
+    :return: The value of the loss, and an array of its derivative with
+    respect to each constant.
+    :raises Unsupported: If the phenotype uses syntax or functions whose
+    derivatives are not known.
+    """
+
+    graph = get_graph(phenotype)
+    values = []
+
+    for i, (op, children) in enumerate(graph.nodes):
+        if i in graph.static:
+            values.append(graph.static[i])
+        else:
+            values.append(evaluate_node(op, [values[child] for child in
+                                             children], x, c))
+
+    # The root of the phenotype is the last node of the graph.
+    root = len(graph.nodes) - 1
+    fitness = loss(y, values[root])
+
+    gradient = np.zeros(len(c))
+
+    if not graph.varying[root]:
+        return fitness, gradient
+
+    with np.errstate(all="ignore"):
+        adjoints = {root: unbroadcast(loss.gradient(y, values[root]),
+                                      np.shape(values[root]))}
+
+        for i in reversed(range(len(graph.nodes))):
+            if i not in adjoints:
+                continue
+
+            op, children = graph.nodes[i]
+            kind, adjoint = op[0], adjoints.pop(i)
+
+            if op == ("Name", "c"):
+                gradient += adjoint
+                continue
+
+            args = [values[child] for child in children]
+
+            if kind == "Index":
+                partials = [adjoint]
+
+            elif kind == "Subscript":
+                # Scatter the adjoint back to the subscripted elements.
+                partials = [np.zeros(np.shape(args[0]))]
+                np.add.at(partials[0], args[1], adjoint)
+
+            else:
+                if kind == "Call":
+                    derivatives = get_derivatives(args[0], op[1])
+                    args, children = args[1:], children[1:]
+                else:
+                    derivatives = BINARY_DERIVATIVES.get(op[1]) or \
+                        UNARY_DERIVATIVES[op[1]]
+
+                partials = derivatives(*(args + [values[i]]))
+
+            for child, arg, partial in zip(children, args, partials):
+                if not graph.varying[child]:
+                    continue
+
+                if kind not in ("Index", "Subscript"):
+                    # The chain rule.
+                    if isinstance(partial, int) and partial == 1:
+                        partial = adjoint
+                    else:
+                        partial = adjoint * partial
+
+                    partial = unbroadcast(partial, np.shape(arg))
+
+                if child in adjoints:
+                    adjoints[child] = adjoints[child] + partial
+                else:
+                    adjoints[child] = partial
+
+    return fitness, gradient
+
+
+def get_derivatives(func, n_args):
+    """
+    Get the partial derivatives of a function which grammars can use.
+
+    :param func: A function.
+    :param n_args: The number of arguments with which it is called.
+    :return: A function which gives the partial derivatives with respect to
+    each argument, or None if they are not known.
+    """
+
+    try:
+        derivatives = FUNCTION_DERIVATIVES.get(func)
+
+    except TypeError:
+        # The function is not hashable.
+        return None
+
+    if derivatives is None or \
+            derivatives.__code__.co_argcount != n_args + 1:
+        return None
+
+    return derivatives
+
+
+def unbroadcast(adjoint, shape):
+    """
+    Sum an adjoint over the axes along which a value was broadcast, so
+    that it has the shape of the value (e.g. a scalar constant which was
+    added to an array of inputs).
+
+    :param adjoint: The adjoint of the result of an operation.
+    :param shape: The shape of an argument of the operation.
+    :return: The adjoint of the argument.
+    """
+
+    if np.shape(adjoint) == shape:
+        return adjoint
+
+    adjoint = np.broadcast_to(adjoint, np.broadcast_shapes(
+        np.shape(adjoint), shape))
+
+    # Sum over the leading axes which were added by broadcasting, and over
+    # any axes of length one which were stretched.
+    adjoint = adjoint.sum(axis=tuple(range(adjoint.ndim - len(shape))))
+    stretched = tuple([axis for axis, n in enumerate(shape) if n == 1])
+
+    return adjoint.sum(axis=stretched, keepdims=True)
@@ -162,6 +162,20 @@ def plog(x):
     return np.log(1.0 + np.abs(x))
 
 
+def if_then_else(a, b, c):
+    """
+    Boolean if-then-else (multiplexer) operator, built from bitwise
+    operators so that it works both on arrays of booleans and on truth
+    tables packed into words of bits.
+
+    :param a: np.array, the condition
+    :param b: np.array, the value where the condition is true
+    :param c: np.array, the value where the condition is false
+    :return: np.array of b where a is true, and of c elsewhere
+    """
+    return (a & b) | (~a & c)
+
+
 def ave(x):
     """
     Returns the average value of a list.
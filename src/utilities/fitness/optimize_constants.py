@@ -2,10 +2,14 @@ import re
 
 import scipy
 from algorithm.parameters import params
+from utilities.fitness.compile_phenotype import compile_phenotype
+from utilities.fitness.expression_dag import Unsupported
+from utilities.fitness.gradient import get_graph, loss_and_gradient
 from utilities.fitness.math_functions import *
+from utilities.stats import trackers
 
 
-def optimize_constants(x, y, ind):
+def optimize_constants(x, y, ind, optimize=True):
     """
     Use gradient descent to search for values for the constants in
     ind.phenotype which minimise loss.
@@ -13,6 +17,10 @@ def optimize_constants(x, y, ind):
     :param x: Input (an array of x values).
     :param y: Expected output (expected y values for given inputs).
     :param ind: A GE individual.
+    :param optimize: Whether or not to optimise the constants. If not, the
+    constants are set to their initial values (unless they have already
+    been optimised, see CONSTANTS_CACHE), e.g. in order to find out which
+    individuals are worth optimising.
     :return: The value of the error metric at those values
     """
 
@@ -26,8 +34,9 @@ def optimize_constants(x, y, ind):
     # Create new consecutive constant attribute for individual.
     ind.phenotype_consec_consts = s
 
-    # Eval the phenotype.
-    f = eval("lambda x, c: " + s)
+    # Compile the phenotype. The compiled phenotype is kept with the
+    # individual for evaluation on test data.
+    f = compile_phenotype(ind, s)
 
     # Pre-load the error metric fitness function.
     loss = params['ERROR_METRIC']
@@ -47,15 +56,58 @@ at https://github.com/PonyGE/PonyGE2/issues/130."""
         ind.opt_consts = c
         return fitness
 
-    obj = lambda c: loss(y, f(x, c))
+    if params['CONSTANTS_CACHE'] and s in trackers.constants_cache:
+        # The constants of this form have already been optimised.
+        ind.opt_consts, fitness = trackers.constants_cache[s]
+        ind.phenotype = replace_consts_with_values(s, ind.opt_consts)
+        return fitness
+
+    # The loss is cast to a Python float, since L-BFGS-B works in double
+    # precision even if the dataset is stored as e.g. float32.
+    obj = lambda c: float(loss(y, f(x, c)))
     # obj is now a function of c only for L-BFGS-B. Using 0 as the init seems a
     # reasonable choice. But for scipy.curve_fit we might use [1.0] * n_consts.
     # Maybe other minimizers do better with some other choices? There are other
     # methods to try out.
     init = [0.0] * n_consts
 
+    # Children can start from the optimised constants of their parent. The
+    # constants of the child need not mean the same as those of the parent,
+    # but often do, since most of the phenotype of a child is inherited.
+    parent_consts = getattr(ind, 'parent_consts', None)
+    if params['CONSTANTS_WARM_START'] and parent_consts is not None and \
+            len(parent_consts) == n_consts:
+        init = list(parent_consts)
+
+    if not optimize:
+        # Score the individual at its initial constants.
+        try:
+            fitness = obj(init)
+        except ValueError:
+            raise ValueError("Error during evaluation of constants. " \
+                             "Possible cause: " + shape_mismatch_txt)
+
+        ind.opt_consts = np.array(init)
+        ind.phenotype = replace_consts_with_values(s, ind.opt_consts)
+
+        return fitness
+
+    # The gradient is estimated by finite differences unless it can be
+    # derived from the phenotype. With lower precision datasets the default
+    # step size is lost in rounding error, so the step size is scaled to the
+    # precision of the data.
+    options, eps = {}, np.sqrt(np.finfo(float).eps)
+    if np.issubdtype(x.dtype, np.floating) and \
+            np.finfo(x.dtype).bits < 64:
+        eps = options['eps'] = np.sqrt(np.finfo(x.dtype).eps)
+
+    fun, jac = obj, None
+    if params['CONSTANTS_GRADIENT'] == "analytic":
+        fun, jac = get_objective(s, x, y, loss, obj, eps)
+
     try:
-        res = scipy.optimize.minimize(obj, init, method="L-BFGS-B")
+        res = scipy.optimize.minimize(fun, init, method="L-BFGS-B",
+                                      jac=jac, options=options)
     except ValueError:
         raise ValueError("Error during optimization of constants. " \
                          "Possible cause: " + shape_mismatch_txt)
@@ -68,9 +120,56 @@ at https://github.com/PonyGE/PonyGE2/issues/130."""
     # with actual numbers, so can be eval'd directly
     ind.phenotype = replace_consts_with_values(s, ind.opt_consts)
 
+    if params['CONSTANTS_CACHE']:
+        trackers.constants_cache[s] = ind.opt_consts, res['fun']
+
     return res['fun']
 
 
+def get_objective(s, x, y, loss, obj, eps):
+    """
+    Get an objective function which returns both the loss and its gradient
+    with respect to the constants, so that each step of L-BFGS-B needs only
+    a single pass over the dataset rather than one pass per constant. The
+    gradient is derived from the phenotype by automatic differentiation
+    (see utilities.fitness.gradient). Where the gradient is not finite
+    (e.g. at a singularity of an operator), it is estimated by finite
+    differences instead.
+
+    :param s: The phenotype string, with consecutive constants.
+    :param x: Input (an array of x values).
+    :param y: Expected output (expected y values for given inputs).
+    :param loss: The error metric.
+    :param obj: The loss as a function of the constants only.
+    :param eps: The step size for finite differences.
+    :return: The objective function and the jac argument of
+    scipy.optimize.minimize. If the gradient cannot be derived from the
+    phenotype (e.g. it uses functions whose derivatives are not known, or
+    the error metric has no gradient), the loss and None are returned, and
+    the gradient is estimated by finite differences throughout.
+    """
+
+    if not hasattr(loss, 'gradient'):
+        return obj, None
+
+    def fun(c):
+        fitness, grad = loss_and_gradient(s, x, y, c, loss)
+
+        if not np.all(np.isfinite(grad)):
+            grad = scipy.optimize.approx_fprime(c, obj, eps)
+
+        return float(fitness), grad
+
+    try:
+        # Check that the phenotype can be differentiated.
+        get_graph(s)
+
+    except Unsupported:
+        return obj, None
+
+    return fun, True
+
+
 def make_consts_consecutive(s):
     """
     The given phenotype will have zero or more occurrences of each const c[0],
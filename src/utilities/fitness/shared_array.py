@@ -0,0 +1,73 @@
+import numpy as np
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+
+except ImportError:
+    # Shared memory requires Python 3.8 or later.
+    SharedMemory = None
+
+
+class SharedArray(object):
+    """
+    A numpy array held in a block of shared memory. The array is copied into
+    the block once by the process which creates it. When a shared array is
+    pickled, e.g. in order to be sent to the workers of a multiprocessing
+    pool, only the name, shape and type of the block are pickled, and the
+    receiving process attaches to the same block without copying the array.
+
+    Attached arrays are read-only. The block must be unlinked by the process
+    which created it once no more processes need to attach to it.
+    """
+
+    def __init__(self, array):
+        """
+        Create a block of shared memory and copy an array into it.
+
+        :param array: A numpy array.
+        """
+
+        self.shape, self.dtype = array.shape, array.dtype
+
+        # Keep column-major arrays column-major.
+        self.order = "F" if array.flags.f_contiguous and \
+            not array.flags.c_contiguous else "C"
+
+        self.memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+
+        self.array = self.attach()
+        self.array[...] = array
+
+    def attach(self):
+        """
+        Get the array held in the block.
+
+        :return: A numpy array which uses the shared memory as its buffer.
+        """
+
+        return np.ndarray(self.shape, self.dtype, buffer=self.memory.buf,
+                          order=self.order)
+
+    def unlink(self):
+        """
+        Remove the block, so that no more processes can attach to it. The
+        memory itself is freed once all processes which have attached to it
+        have exited.
+
+        :return: Nothing.
+        """
+
+        self.memory.unlink()
+
+    def __getstate__(self):
+        return {'name': self.memory.name, 'shape': self.shape,
+                'dtype': self.dtype, 'order': self.order}
+
+    def __setstate__(self, state):
+        self.shape, self.dtype = state['shape'], state['dtype']
+        self.order = state['order']
+
+        self.memory = SharedMemory(name=state['name'])
+
+        self.array = self.attach()
+        self.array.setflags(write=False)
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SubtreeCache(object):
+    """
+    A cache of the output arrays of sub-expressions (subtrees) of phenotypes
+    on the training set, which persists across generations. Since children
+    produced by subtree crossover and mutation mostly re-use subtrees of
+    their parents, most of the sub-expressions of a child have already been
+    evaluated in an earlier generation, and only the parts of the tree which
+    have changed need to be evaluated again.
+
+    The key for each entry is a canonical string of a subtree (see
+    utilities.fitness.expression_dag), and the value is its output array.
+    The cache is bounded by the total memory (in bytes) of the arrays it
+    holds. Once full, the least recently used entries are evicted.
+
+    Cached arrays are made read-only, since they are shared between all
+    expressions which contain the same subtree.
+    """
+
+    def __init__(self, max_bytes=0):
+        """
+        Initialise an empty subtree cache.
+
+        :param max_bytes: The maximum total size of the cached arrays in
+        bytes.
+        """
+
+        self.configure(max_bytes)
+
+    def configure(self, max_bytes):
+        """
+        (Re-)configure the cache. Any existing entries are discarded.
+
+        :param max_bytes: The maximum total size of the cached arrays in
+        bytes.
+        :return: Nothing.
+        """
+
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+
+        # The number of lookups which were and were not found in the cache.
+        self.hits, self.misses = 0, 0
+
+    def get(self, key):
+        """
+        Look up a subtree in the cache.
+
+        :param key: The canonical string of a subtree.
+        :return: The output array of the subtree, or None if it is not
+        cached.
+        """
+
+        value = self.entries.get(key)
+
+        if value is None:
+            self.misses += 1
+
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+        return value
+
+    def add(self, key, value):
+        """
+        Add the output array of a subtree to the cache, evicting the least
+        recently used entries if the cache is full. Values which are not
+        numpy arrays, or which are larger than the whole cache, are not
+        cached.
+
+        :param key: The canonical string of a subtree.
+        :param value: The output array of the subtree.
+        :return: Nothing.
+        """
+
+        if not isinstance(value, np.ndarray) or key in self.entries or \
+                value.nbytes > self.max_bytes:
+            return
+
+        value.setflags(write=False)
+
+        self.entries[key] = value
+        self.nbytes += value.nbytes
+
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
@@ -14,5 +14,9 @@ def clean_stats():
         stats.pop('unique_inds')
         stats.pop('unused_search')
 
+    if not params['SUBTREE_CACHE']:
+        stats.pop('subtree_cache_hits')
+        stats.pop('subtree_cache_misses')
+
     if not params['MUTATE_DUPLICATES']:
         stats.pop('regens')
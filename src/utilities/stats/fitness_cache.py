@@ -0,0 +1,375 @@
+import pickle
+import sqlite3
+from collections import OrderedDict
+from hashlib import blake2b
+
+
+class FitnessCache(object):
+    """
+    A fitness cache for an evolutionary run. The cache behaves like a
+    dictionary where the key for each entry is the phenotype of an individual
+    and the value is its fitness.
+
+    The cache can optionally be bounded to a maximum number of entries held
+    in memory. Once full, entries are evicted using either a least recently
+    used ("lru") or a least frequently used ("lfu") policy.
+
+    The cache can also optionally be backed by an SQLite database on disk.
+    All entries are written to the database (including those which have been
+    evicted from memory) and are looked up again on a memory miss. Since the
+    database persists between runs, a later run can warm-start from the
+    cache of an earlier run. Entries are stored under a namespace describing
+    the problem being solved, so that fitnesses from different problems are
+    never mixed up.
+
+    Since phenotypes can be many kilobytes long, the cache can optionally
+    key entries by a fixed-size (128-bit BLAKE2) digest of the phenotype
+    rather than by the phenotype itself, so that memory use is proportional
+    to the number of unique phenotypes rather than to their total length.
+    Collisions are astronomically unlikely, but can optionally be guarded
+    against by also storing the full phenotype of each entry and checking it
+    on lookup (at the cost of the memory saving).
+
+    Note that len(cache) returns the number of unique phenotypes which have
+    been added to the cache over the current run, including those which have
+    since been evicted from memory. Phenotypes found in the database from an
+    earlier run are not counted. Without a database, a phenotype which is
+    evicted and later re-evaluated is counted again.
+    """
+
+    def __init__(self, max_size=None, eviction="lru", file_name=None,
+                 namespace="", digest=False, verify=False):
+        """
+        Initialise an empty fitness cache.
+
+        :param max_size: The maximum number of entries held in memory. None
+        means the cache is unbounded.
+        :param eviction: The eviction policy, either "lru" or "lfu".
+        :param file_name: The file name of an SQLite database in which to
+        store all entries. None means the cache is held in memory only.
+        :param namespace: The namespace under which entries are stored in
+        the database.
+        :param digest: Whether or not to key entries by a digest of the
+        phenotype.
+        :param verify: Whether or not to check the full phenotype of an
+        entry on lookup when keying by digest.
+        """
+
+        self.configure(max_size, eviction, file_name, namespace, digest,
+                       verify)
+
+    def configure(self, max_size=None, eviction="lru", file_name=None,
+                  namespace="", digest=False, verify=False):
+        """
+        (Re-)configure the cache. Any existing entries held in memory are
+        discarded.
+
+        :param max_size: The maximum number of entries held in memory. None
+        means the cache is unbounded.
+        :param eviction: The eviction policy, either "lru" or "lfu".
+        :param file_name: The file name of an SQLite database in which to
+        store all entries. None means the cache is held in memory only.
+        :param namespace: The namespace under which entries are stored in
+        the database.
+        :param digest: Whether or not to key entries by a digest of the
+        phenotype.
+        :param verify: Whether or not to check the full phenotype of an
+        entry on lookup when keying by digest.
+        :return: Nothing.
+        """
+
+        if eviction not in ("lru", "lfu"):
+            s = "utilities.stats.fitness_cache.FitnessCache.configure\n" \
+                "Error: unknown cache eviction policy '%s'.\n" \
+                "       Valid policies are 'lru' and 'lfu'." % eviction
+            raise Exception(s)
+
+        if max_size is not None and max_size < 1:
+            s = "utilities.stats.fitness_cache.FitnessCache.configure\n" \
+                "Error: cache size must be at least 1.\n" \
+                "       Value given: %s" % max_size
+            raise Exception(s)
+
+        self.max_size = max_size
+        self.eviction = eviction
+        self.file_name = file_name
+        self.digest = digest
+        self.verify = digest and verify
+
+        # Entries of different key types are stored apart in the database.
+        self.namespace = namespace
+        if self.digest:
+            self.namespace += "|digest"
+            if self.verify:
+                self.namespace += "|verify"
+
+        # Entries held in memory, in order of least to most recent use.
+        self.entries = OrderedDict()
+
+        # For LFU eviction, the number of uses of each entry, and the
+        # entries for each number of uses, in order of least to most recent
+        # use. This allows for eviction in constant time.
+        self.uses, self.buckets, self.min_uses = {}, {}, 0
+
+        # The number of unique phenotypes added over the current run.
+        self.unique = 0
+
+        # The full phenotype of each entry held in memory, if verifying
+        # digests.
+        self.phenotypes = {}
+
+        # The number of digest collisions detected.
+        self.collisions = 0
+
+        # Entries which have not yet been written to the database.
+        self.pending = {}
+
+        self.db = None
+        if self.file_name:
+            self.open()
+
+    def open(self):
+        """
+        Open (or create) the database which backs the cache.
+
+        :return: Nothing.
+        """
+
+        self.db = sqlite3.connect(self.file_name)
+        self.db.execute("CREATE TABLE IF NOT EXISTS cache "
+                        "(namespace TEXT, key, fitness BLOB, "
+                        "PRIMARY KEY (namespace, key))")
+        self.db.commit()
+
+    def flush(self):
+        """
+        Write all pending entries to the database.
+
+        :return: Nothing.
+        """
+
+        if self.db is not None and self.pending:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                [(self.namespace, key, pickle.dumps(value)) for key, value
+                 in self.pending.items()])
+            self.db.commit()
+
+        self.pending = {}
+
+    def close(self):
+        """
+        Write all pending entries to the database and close it.
+
+        :return: Nothing.
+        """
+
+        self.flush()
+
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def key(self, phenotype):
+        """
+        Return the cache key for a phenotype. This is either the phenotype
+        itself, or a 128-bit digest of the phenotype.
+
+        :param phenotype: The phenotype string of an individual.
+        :return: The cache key for the phenotype.
+        """
+
+        if self.digest:
+            return blake2b(phenotype.encode(), digest_size=16).digest()
+
+        return phenotype
+
+    def matches(self, key, phenotype):
+        """
+        Check that an entry held in memory was stored for the given
+        phenotype. Only fails on a digest collision when verifying digests.
+
+        :param key: A cache key held in memory.
+        :param phenotype: The phenotype string of an individual.
+        :return: Whether or not the entry belongs to the phenotype.
+        """
+
+        if self.verify and self.phenotypes[key] != phenotype:
+            self.collisions += 1
+            return False
+
+        return True
+
+    def lookup(self, key, phenotype):
+        """
+        Look up a key which is not held in memory in the database. If found,
+        the entry is brought back into memory.
+
+        :param key: A cache key.
+        :param phenotype: The phenotype string of an individual.
+        :return: Whether or not the key was found.
+        """
+
+        if key in self.pending:
+            record = self.pending[key]
+
+        elif self.db is not None:
+            row = self.db.execute(
+                "SELECT fitness FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)).fetchone()
+
+            if row is None:
+                return False
+
+            record = pickle.loads(row[0])
+
+        else:
+            return False
+
+        if self.verify:
+            value, stored = record
+
+            if stored != phenotype:
+                self.collisions += 1
+                return False
+
+        else:
+            value = record
+
+        self.insert(key, value, phenotype)
+
+        return True
+
+    def insert(self, key, value, phenotype):
+        """
+        Insert a new entry into memory, evicting an old entry if the cache
+        is full.
+
+        :param key: A cache key.
+        :param value: A fitness value.
+        :param phenotype: The phenotype string of an individual.
+        :return: Nothing.
+        """
+
+        if self.max_size is not None and len(self.entries) >= self.max_size:
+            self.evict()
+
+        self.entries[key] = value
+
+        if self.verify:
+            self.phenotypes[key] = phenotype
+
+        if self.eviction == "lfu":
+            self.uses[key] = 1
+            self.buckets.setdefault(1, OrderedDict())[key] = None
+            self.min_uses = 1
+
+    def touch(self, key):
+        """
+        Record a use of an entry held in memory.
+
+        :param key: A cache key.
+        :return: Nothing.
+        """
+
+        if self.eviction == "lru":
+            self.entries.move_to_end(key)
+
+        else:
+            uses = self.uses[key]
+
+            # Move the entry to the next bucket.
+            bucket = self.buckets[uses]
+            del bucket[key]
+            if not bucket:
+                del self.buckets[uses]
+                if self.min_uses == uses:
+                    self.min_uses = uses + 1
+
+            self.uses[key] = uses + 1
+            self.buckets.setdefault(uses + 1, OrderedDict())[key] = None
+
+    def evict(self):
+        """
+        Evict a single entry from memory according to the eviction policy.
+
+        :return: Nothing.
+        """
+
+        if self.eviction == "lru":
+            key, _ = self.entries.popitem(last=False)
+
+        else:
+            bucket = self.buckets[self.min_uses]
+            key, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self.buckets[self.min_uses]
+
+            del self.uses[key], self.entries[key]
+
+        self.phenotypes.pop(key, None)
+
+    def __contains__(self, phenotype):
+        key = self.key(phenotype)
+
+        if key in self.entries:
+            return self.matches(key, phenotype)
+
+        return self.lookup(key, phenotype)
+
+    def __getitem__(self, phenotype):
+        if phenotype not in self:
+            raise KeyError(phenotype)
+
+        key = self.key(phenotype)
+        self.touch(key)
+
+        return self.entries[key]
+
+    def __setitem__(self, phenotype, value):
+        key = self.key(phenotype)
+
+        if key in self.entries and self.matches(key, phenotype):
+            self.entries[key] = value
+            self.touch(key)
+
+        elif key not in self.entries and self.lookup(key, phenotype):
+            # The entry was found in the database.
+            self.entries[key] = value
+
+        else:
+            # This is a new unique phenotype (or, on a digest collision, a
+            # phenotype which replaces the entry of another).
+            if key in self.entries:
+                self.entries[key] = value
+                self.phenotypes[key] = phenotype
+                self.touch(key)
+
+            else:
+                self.insert(key, value, phenotype)
+
+            self.unique += 1
+
+        if self.db is not None:
+            self.pending[key] = (value, phenotype) if self.verify else value
+
+            if len(self.pending) >= 1000:
+                self.flush()
+
+    def __len__(self):
+        return self.unique
+
+    def __getstate__(self):
+        # Database connections cannot be pickled (e.g. when saving the state
+        # of a run). Write all pending entries and re-open on unpickling.
+        self.flush()
+        state = self.__dict__.copy()
+        state['db'] = None
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+        if self.file_name:
+            self.open()
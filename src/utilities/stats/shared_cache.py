@@ -0,0 +1,221 @@
+from multiprocessing.managers import BaseManager
+from os import getpid, kill, name as os_name
+from threading import Lock
+from time import sleep
+
+from utilities.stats.fitness_cache import FitnessCache
+
+
+class SharedCacheServer(object):
+    """
+    The server side of a shared fitness cache. A single instance lives in a
+    manager process and is accessed by all workers of a multicore pool
+    through a proxy. Every method call is a single round trip to the manager
+    and is executed atomically.
+
+    Alongside the cache of finished evaluations, the server keeps track of
+    which keys are currently being evaluated ("in flight") and by which
+    worker, so that no two workers evaluate the same phenotype at once.
+    """
+
+    def __init__(self, max_size, eviction):
+        """
+        Initialise an empty shared cache.
+
+        :param max_size: The maximum number of entries held in the cache.
+        :param eviction: The eviction policy, either "lru" or "lfu".
+        """
+
+        self.cache = FitnessCache(max_size, eviction)
+        self.in_flight = {}
+        self.lock = Lock()
+
+    def claim(self, key, owner):
+        """
+        Look up a key in the cache. If it is not found and no other worker is
+        evaluating it, the calling worker becomes responsible for evaluating
+        it.
+
+        :param key: A cache key.
+        :param owner: The process id of the calling worker.
+        :return: A tuple of the cached value (or None if not cached) and the
+        process id of the worker responsible for evaluating the key.
+        """
+
+        with self.lock:
+            if key in self.cache:
+                return self.cache[key], None
+
+            return None, self.in_flight.setdefault(key, owner)
+
+    def publish(self, key, value):
+        """
+        Add a finished evaluation to the cache.
+
+        :param key: A cache key.
+        :param value: The result of the evaluation.
+        :return: Nothing.
+        """
+
+        with self.lock:
+            self.cache[key] = value
+            self.in_flight.pop(key, None)
+
+    def release(self, key, owner):
+        """
+        Give up responsibility for evaluating a key without publishing a
+        result, e.g. because the evaluation failed or the responsible worker
+        has died.
+
+        :param key: A cache key.
+        :param owner: The process id of the responsible worker.
+        :return: Nothing.
+        """
+
+        with self.lock:
+            if self.in_flight.get(key) == owner:
+                del self.in_flight[key]
+
+
+class SharedCacheManager(BaseManager):
+    """
+    Manager process which hosts the shared cache server.
+    """
+
+    pass
+
+
+SharedCacheManager.register('SharedCacheServer', SharedCacheServer)
+
+
+class SharedCache(object):
+    """
+    A fitness cache shared between all worker processes of a multicore pool.
+    Workers check the shared cache before evaluating an individual and add
+    the result after evaluating it. If another worker is already evaluating
+    the same phenotype, the result of that evaluation is awaited rather than
+    the phenotype being evaluated again.
+
+    The cache values are dictionaries of the attributes set on an individual
+    by its evaluation, i.e. its fitness, runtime error and any other
+    attributes set by the fitness function.
+    """
+
+    def __init__(self, max_size=None, eviction="lru"):
+        """
+        Start a manager process which hosts the shared cache.
+
+        :param max_size: The maximum number of entries held in the cache.
+        :param eviction: The eviction policy, either "lru" or "lfu".
+        """
+
+        self.manager = SharedCacheManager()
+        self.manager.start()
+        self.server = self.manager.SharedCacheServer(max_size, eviction)
+
+    def claim(self, key):
+        """
+        Look up a key in the shared cache without waiting. If it is not found
+        and no other worker is evaluating it, the calling worker becomes
+        responsible for evaluating it and must then call either publish() or
+        release().
+
+        :param key: A cache key.
+        :return: A tuple of the cached value (or None if not cached) and
+        whether or not the calling worker is responsible for evaluating the
+        key.
+        """
+
+        me = getpid()
+        value, owner = self.server.claim(key, me)
+
+        if value is None and owner != me and not alive(owner):
+            # The responsible worker has died. Take over.
+            self.server.release(key, owner)
+            value, owner = self.server.claim(key, me)
+
+        return value, owner == me
+
+    def wait(self, key):
+        """
+        Wait for another worker to finish evaluating a key. If that worker
+        gives up, the calling worker becomes responsible for evaluating the
+        key and must then call either publish() or release().
+
+        :param key: A cache key.
+        :return: The cached value, or None if the calling worker is now
+        responsible for evaluating the key.
+        """
+
+        delay = 0.001
+
+        while True:
+            value, owned = self.claim(key)
+
+            if value is not None or owned:
+                return value
+
+            # Back off exponentially up to a tenth of a second.
+            sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    def publish(self, key, value):
+        """
+        Add a finished evaluation to the shared cache.
+
+        :param key: A cache key.
+        :param value: A dictionary of the evaluated attributes.
+        :return: Nothing.
+        """
+
+        self.server.publish(key, value)
+
+    def release(self, key):
+        """
+        Give up responsibility for evaluating a key.
+
+        :param key: A cache key.
+        :return: Nothing.
+        """
+
+        self.server.release(key, getpid())
+
+    def shutdown(self):
+        """
+        Shut down the manager process.
+
+        :return: Nothing.
+        """
+
+        self.manager.shutdown()
+
+    def __getstate__(self):
+        # Only the proxy to the server is needed by worker processes.
+        state = self.__dict__.copy()
+        state['manager'] = None
+
+        return state
+
+
+def alive(pid):
+    """
+    Check whether or not a process is still running. Always assumes the
+    process is running on non-POSIX systems.
+
+    :param pid: A process id.
+    :return: Whether or not the process is running.
+    """
+
+    if os_name != "posix":
+        return True
+
+    try:
+        kill(pid, 0)
+
+    except ProcessLookupError:
+        return False
+
+    except PermissionError:
+        pass
+
+    return True
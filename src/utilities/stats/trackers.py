@@ -1,13 +1,29 @@
 """Utilities for tracking progress of runs, including time taken per
 generation, fitness plots, fitness caches, etc."""
 
-cache = {}
-# This dict stores the cache for an evolutionary run. The key for each entry
-# is the phenotype of the individual, the value is its fitness.
+from utilities.fitness.subtree_cache import SubtreeCache
+from utilities.stats.fitness_cache import FitnessCache
+
+cache = FitnessCache()
+# This stores the cache for an evolutionary run. The key for each entry is
+# the phenotype of the individual, the value is its fitness. The cache can be
+# bounded and backed by a database on disk, see
+# utilities.stats.fitness_cache.
+
+subtree_cache = SubtreeCache()
+# This stores the outputs of subtrees of phenotypes on the training set of
+# supervised learning problems, see utilities.fitness.subtree_cache.
+
+constants_cache = FitnessCache()
+# This stores the optimised constants of supervised learning problems. The
+# key for each entry is the phenotype of an individual with its constants
+# made consecutive, the value is a tuple of the optimised constants and the
+# loss. See utilities.fitness.optimize_constants.
 
 runtime_error_cache = []
 # This list stores a list of phenotypes which produce runtime errors over an
-# evolutionary run.
+# evolutionary run. If the cache keys entries by phenotype digest, digests
+# are stored instead.
 
 best_fitness_list = []
 # fitness_plot is simply a list of the best fitnesses at each generation.
@@ -27,3 +43,9 @@ stats_list = []
 
 best_ever = None
 # Store the best ever individual here.
+
+merged_stats = {}
+# Counts which have been merged from other processes (e.g. the total number
+# of individuals and of unique individuals over all islands of the island
+# model), which the final stats use instead of the counts of the main
+# process.
@@ -0,0 +1,51 @@
+from copy import copy
+from os import chdir, path
+import sys
+
+import pytest
+
+# Modules are imported from, and data files are found relative to, src.
+SRC = path.join(path.dirname(path.dirname(path.abspath(__file__))), "src")
+sys.path.insert(0, SRC)
+chdir(SRC)
+
+from algorithm import parameters  # noqa: E402
+from stats.stats import stats  # noqa: E402
+from utilities.stats import trackers  # noqa: E402
+
+# The parameters and stats before any run has been set up.
+DEFAULT_PARAMS = copy(parameters.params)
+DEFAULT_STATS = copy(stats)
+
+
+@pytest.fixture
+def set_params():
+    """
+    Set up the parameters of a run from command line arguments, as
+    ponyge.py does, starting from the default parameters and from empty
+    trackers. Runs are always in debug mode, so that no files are saved.
+
+    :return: A function which takes a list of command line arguments.
+    """
+
+    def setup(args):
+        parameters.params.clear()
+        parameters.params.update(copy(DEFAULT_PARAMS))
+        stats.clear()
+        stats.update(DEFAULT_STATS)
+
+        trackers.cache.configure()
+        trackers.subtree_cache.configure(0)
+        trackers.constants_cache.configure()
+        trackers.merged_stats = {}
+        trackers.runtime_error_cache = []
+        trackers.best_fitness_list = []
+        trackers.time_list = []
+        trackers.stats_list = []
+        trackers.best_ever = None
+
+        parameters.set_params(args + ["--debug", "--silent"])
+
+        return parameters.params
+
+    return setup
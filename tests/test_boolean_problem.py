@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from algorithm.parameters import params
+from fitness.supervised_learning import boolean_problem
+from fitness.supervised_learning.boolean_problem import pack_bits, popcount
+from operators.initialisation import initialisation
+
+
+class Ind(object):
+    """
+    A stand-in for an individual with a phenotype.
+    """
+
+    def __init__(self, phenotype):
+        self.phenotype = phenotype
+
+
+@pytest.mark.parametrize("problem", [["multiplexer", "6"],
+                                     ["nparity", "3"]])
+def test_bitslice_matches_scalar(set_params, problem):
+    args = ["--fitness_function", "supervised_learning.boolean_problem",
+            "--grammar_file", "supervised_learning/boolean_if.bnf",
+            "--extra_parameters"] + problem + ["--random_seed", "4"]
+
+    set_params(args)
+    phenotypes = [ind.phenotype for ind in initialisation(100)
+                  if not ind.invalid]
+    scalar = [params['FITNESS_FUNCTION'](Ind(p)) for p in phenotypes]
+
+    set_params(args + ["--bitslice"])
+    packed = [params['FITNESS_FUNCTION'](Ind(p)) for p in phenotypes]
+
+    assert packed == scalar
+    assert len(set(scalar)) > 1
+
+    # Phenotypes which use ~ set the padding bits of the last word, which
+    # must not count as errors.
+    assert any("~" in p for p in phenotypes)
+
+
+def test_pack_bits_order():
+    a = np.zeros((70, 2), dtype=bool)
+    a[0, 0] = a[65, 0] = a[63, 1] = True
+
+    words = pack_bits(a)
+
+    assert words.dtype == np.uint64 and words.shape == (2, 2)
+    assert words[:, 0].tolist() == [1, 2]
+    assert words[:, 1].tolist() == [2 ** 63, 0]
+
+
+def test_popcount_lookup_table(monkeypatch):
+    words = np.array([0, 1, 2 ** 64 - 1, 0b1011], dtype=np.uint64)
+
+    assert popcount(words) == 68
+
+    monkeypatch.setattr(boolean_problem, "bitwise_count", None)
+    assert popcount(words) == 68
@@ -0,0 +1,74 @@
+from multiprocessing.connection import Client
+from queue import Queue
+from threading import Thread
+
+import pytest
+
+from utilities.algorithm.broker import Broker, run_worker
+
+
+@pytest.fixture
+def broker(set_params):
+    """
+    :return: A broker listening on a free local port.
+    """
+
+    set_params([])
+
+    broker = Broker("127.0.0.1:0", "ponyge2", in_flight=1, timeout=5.0)
+    yield broker
+    broker.close()
+
+
+def address(broker):
+    """
+    :param broker: A broker.
+    :return: The address of the broker, as "host:port".
+    """
+
+    return "%s:%d" % broker.listener.address
+
+
+def start_worker(broker):
+    """
+    Run a worker for a broker in a separate thread.
+
+    :param broker: A broker.
+    :return: Nothing.
+    """
+
+    Thread(target=run_worker, args=(address(broker),), daemon=True).start()
+
+
+def test_jobs_run_on_workers(broker):
+    start_worker(broker)
+    start_worker(broker)
+
+    assert sorted(broker.imap_unordered(abs, range(-5, 5), 3)) == \
+        sorted(abs(i) for i in range(-5, 5))
+
+
+def test_failed_job_calls_error_callback(broker):
+    start_worker(broker)
+
+    errors = Queue()
+    broker.apply_async(int, ("x",), error_callback=errors.put)
+
+    assert "ValueError" in str(errors.get(timeout=10))
+
+
+def test_job_of_dropped_worker_is_requeued(broker):
+    # A worker which takes on a job and then disconnects without a result.
+    conn = Client(broker.listener.address, authkey=b"ponyge2")
+    assert conn.recv()[0] == "params"
+
+    results = Queue()
+    broker.apply_async(abs, (-3,), callback=results.put)
+
+    assert conn.recv()[:2] == ("job", 0)
+    conn.close()
+
+    # The job is run again on another worker.
+    start_worker(broker)
+
+    assert results.get(timeout=10) == 3
@@ -0,0 +1,36 @@
+import numpy as np
+
+from utilities.fitness.compile_phenotype import compile_phenotype, \
+    get_function, namespace
+
+
+class Ind(object):
+    """
+    A stand-in for an individual with a phenotype.
+    """
+
+    def __init__(self, phenotype):
+        self.phenotype = phenotype
+
+
+def test_compiled_phenotype_matches_eval():
+    phenotype = "pdiv(x[:, 0], x[:, 1]) + np.sin(c[0])"
+    x, c = np.random.RandomState(0).randn(20, 2), np.array([0.5])
+
+    expected = eval(phenotype, dict(namespace, x=x, c=c))
+
+    np.testing.assert_array_equal(compile_phenotype(Ind(phenotype))(x, c),
+                                  expected)
+
+
+def test_phenotype_is_compiled_once():
+    a, b = Ind("x[:, 0] * 2"), Ind("x[:, 0] * 2")
+
+    # Individuals with the same phenotype share the compiled function, and
+    # keep it for later evaluations.
+    assert compile_phenotype(a) is compile_phenotype(b)
+    assert a.compiled["x[:, 0] * 2"] is get_function("x[:, 0] * 2")
+
+    # Other phenotypes of the individual are compiled alongside.
+    compile_phenotype(a, "x[:, 0] + c[0]")
+    assert sorted(a.compiled) == ["x[:, 0] * 2", "x[:, 0] + c[0]"]
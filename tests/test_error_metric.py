@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from utilities.fitness import error_metric
+
+rng = np.random.RandomState(8)
+
+REGRESSION = rng.randn(50)
+LABELS = rng.randint(0, 2, 50).astype(float)
+
+CASES = [
+    ("mae", REGRESSION, rng.randn(6, 50)),
+    ("mse", REGRESSION, rng.randn(6, 50)),
+    ("rmse", REGRESSION, rng.randn(6, 50)),
+    ("hinge", LABELS, rng.randn(6, 50)),
+    ("hinge", 2 * LABELS - 1, rng.randn(6, 50)),
+    # Constant estimates predict a single class.
+    ("f1_score", LABELS, np.vstack([rng.randn(5, 50), np.ones((1, 50))])),
+    ("f1_score", 2 * LABELS - 1, rng.randn(6, 50)),
+    ("Hamming_error", LABELS.astype(bool), rng.randn(6, 50) > 0),
+]
+
+
+@pytest.mark.parametrize("name, y, yhat", CASES)
+def test_batch_matches_metric(name, y, yhat):
+    metric = getattr(error_metric, name)
+
+    np.testing.assert_allclose(metric.batch(y, yhat),
+                               [metric(y, row) for row in yhat],
+                               rtol=1e-12)
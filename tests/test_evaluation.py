@@ -0,0 +1,82 @@
+import numpy as np
+
+from algorithm.parameters import params
+from algorithm.search_loop import close_pool, start_pool
+from fitness.evaluation import evaluate_fitness
+from operators.initialisation import initialisation
+
+
+def serial_fitnesses(individuals):
+    """
+    :param individuals: A list of individuals.
+    :return: The fitnesses of the individuals, each evaluated on its own.
+    """
+
+    ff = params['FITNESS_FUNCTION']
+
+    return [ff.default_fitness if ind.invalid else ff(ind)
+            for ind in individuals]
+
+
+def population(size):
+    """
+    :param size: The number of unique individuals.
+    :return: A population with a copy of each of its first ten individuals.
+    """
+
+    individuals = initialisation(size)
+
+    return individuals + [ind.deep_copy() for ind in individuals[:10]]
+
+
+def test_batch_gets_each_phenotype_once(set_params):
+    set_params(["--cache", "--random_seed", "3"])
+
+    ff = params['FITNESS_FUNCTION']
+    ff.batch_evaluation = True
+
+    batches = []
+    evaluate_batch = ff.evaluate_batch
+
+    def record(individuals, **kwargs):
+        batches.append([ind.phenotype for ind in individuals])
+        return evaluate_batch(individuals, **kwargs)
+
+    ff.evaluate_batch = record
+
+    individuals = population(40)
+    expected = serial_fitnesses(individuals)
+
+    evaluate_fitness(individuals)
+
+    # The whole population is evaluated as a single batch, in which every
+    # valid phenotype appears once.
+    valid = set(ind.phenotype for ind in individuals if not ind.invalid)
+    assert len(batches) == 1
+    assert sorted(batches[0]) == sorted(valid)
+
+    np.testing.assert_array_equal([ind.fitness for ind in individuals],
+                                  expected)
+
+
+def test_multicore_payloads_match_serial(set_params):
+    set_params(["--multicore", "--cores", "2", "--random_seed", "4"])
+
+    individuals = population(40)
+    expected = serial_fitnesses(individuals)
+    genomes = [ind.genome for ind in individuals]
+
+    start_pool()
+
+    try:
+        evaluate_fitness(individuals)
+
+    finally:
+        close_pool()
+
+    np.testing.assert_array_equal([ind.fitness for ind in individuals],
+                                  expected)
+
+    # Only payloads were sent to the workers, the individuals in the
+    # population are the same.
+    assert [ind.genome for ind in individuals] == genomes
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from algorithm.parameters import params
+from operators.initialisation import initialisation
+from utilities.stats import trackers
+
+
+def engine_fitnesses(individuals):
+    """
+    Score individuals with the batched evaluation of the fitness function,
+    and on their own with eval.
+
+    :param individuals: A list of valid individuals.
+    :return: Arrays of the fitnesses from the batch and from eval.
+    """
+
+    ff = params['FITNESS_FUNCTION']
+
+    batch = ff.call_batch(individuals)
+    alone = [ff(ind) for ind in individuals]
+
+    return np.array(batch, dtype=float), np.array(alone, dtype=float)
+
+
+@pytest.mark.parametrize("metric", ["mse", "rmse", "mae"])
+def test_dag_matches_eval(set_params, metric):
+    set_params(["--parameters", "regression.txt", "--evaluation_engine",
+                "dag", "--error_metric", metric, "--random_seed", "7"])
+
+    individuals = [ind for ind in initialisation(100) if not ind.invalid]
+
+    # Shared sub-expressions make the DAG worthwhile.
+    individuals += [ind.deep_copy() for ind in individuals[:10]]
+
+    batch, alone = engine_fitnesses(individuals)
+
+    np.testing.assert_allclose(batch, alone, rtol=1e-10)
+
+
+def test_dag_matches_eval_on_classification(set_params):
+    set_params(["--parameters", "classification.txt", "--evaluation_engine",
+                "dag", "--random_seed", "7"])
+
+    individuals = [ind for ind in initialisation(60) if not ind.invalid]
+
+    batch, alone = engine_fitnesses(individuals)
+
+    np.testing.assert_array_equal(batch, alone)
+
+
+def test_subtree_cache_matches_eval(set_params):
+    set_params(["--parameters", "regression.txt", "--subtree_cache",
+                "--random_seed", "7"])
+
+    individuals = [ind for ind in initialisation(60) if not ind.invalid]
+
+    first, alone = engine_fitnesses(individuals)
+    np.testing.assert_allclose(first, alone, rtol=1e-10)
+
+    # In the next generation, the outputs of the subtrees are taken from
+    # the cache.
+    hits = trackers.subtree_cache.hits
+
+    second, _ = engine_fitnesses(individuals)
+    np.testing.assert_allclose(second, alone, rtol=1e-10)
+
+    assert trackers.subtree_cache.hits > hits
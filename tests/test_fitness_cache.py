@@ -0,0 +1,106 @@
+from utilities.stats.fitness_cache import FitnessCache
+
+
+def held(cache):
+    """
+    :param cache: A fitness cache.
+    :return: The sorted phenotypes of the entries held in memory.
+    """
+
+    return sorted(cache.entries)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = FitnessCache(max_size=3, eviction="lru")
+
+    for phenotype in "abc":
+        cache[phenotype] = 1.0
+
+    # Use "a", so that "b" is now the least recently used.
+    assert cache["a"] == 1.0
+
+    cache["d"] = 2.0
+    assert held(cache) == ["a", "c", "d"]
+
+    cache["e"] = 3.0
+    assert held(cache) == ["a", "d", "e"]
+
+
+def test_lfu_evicts_least_frequently_used():
+    cache = FitnessCache(max_size=3, eviction="lfu")
+
+    for phenotype in "abc":
+        cache[phenotype] = 1.0
+
+    # "a" is looked up three times and "c" twice, so "b" is evicted first.
+    for phenotype in "aacac":
+        cache[phenotype]
+
+    cache["d"] = 2.0
+    assert held(cache) == ["a", "c", "d"]
+
+    # "d" is evicted although it is the most recently used, since it has
+    # been used least.
+    cache["e"] = 3.0
+    assert held(cache) == ["a", "c", "e"]
+
+
+def test_len_counts_unique_phenotypes_over_the_run():
+    cache = FitnessCache(max_size=2)
+
+    for phenotype in "abcab":
+        cache[phenotype] = 1.0
+
+    # Without a database, evicted phenotypes which come back are counted
+    # again.
+    assert len(cache) == 5
+    assert len(cache.entries) == 2
+
+
+def test_database_keeps_evicted_entries(tmp_path):
+    file_name = str(tmp_path / "cache.db")
+
+    cache = FitnessCache(max_size=1, file_name=file_name, namespace="p")
+    cache["a"], cache["b"] = 1.0, 2.0
+
+    # "a" has been evicted from memory, but is found in the database.
+    assert held(cache) == ["b"]
+    assert "a" in cache and cache["a"] == 1.0
+    assert len(cache) == 2
+
+    cache.close()
+
+    # A later run warm-starts from the database, but only for the same
+    # namespace.
+    later = FitnessCache(file_name=file_name, namespace="p")
+    assert later["a"] == 1.0 and later["b"] == 2.0
+    assert len(later) == 0
+    later.close()
+
+    other = FitnessCache(file_name=file_name, namespace="q")
+    assert "a" not in other
+    other.close()
+
+
+def test_digest_keys():
+    cache = FitnessCache(digest=True)
+    cache["x[0] + x[1]"] = 1.0
+
+    assert cache["x[0] + x[1]"] == 1.0
+    assert "x[1] + x[0]" not in cache
+    assert [len(key) for key in cache.entries] == [16]
+
+
+def test_digest_verify_detects_collisions():
+    cache = FitnessCache(digest=True, verify=True)
+
+    # Force every phenotype onto the same digest.
+    cache.key = lambda phenotype: b"0" * 16
+
+    cache["a"] = 1.0
+    assert "b" not in cache and cache.collisions == 1
+
+    # The entry of the colliding phenotype replaces the old one.
+    cache["b"] = 2.0
+    assert cache["b"] == 2.0 and "a" not in cache
+    assert len(cache) == 2
@@ -0,0 +1,99 @@
+from os import listdir, utime
+
+import numpy as np
+import pytest
+
+from utilities.fitness.get_data import format_dataset, load_Xy
+
+
+def test_inputs_are_stored_by_column(set_params):
+    set_params([])
+
+    x = format_dataset(np.arange(12.0).reshape(4, 3))
+
+    assert x.flags['F_CONTIGUOUS'] and x[:, 1].flags['C_CONTIGUOUS']
+    assert format_dataset(x, "C").flags['C_CONTIGUOUS']
+
+
+def test_floating_point_data_are_cast(set_params):
+    set_params(["--dataset_dtype", "float32"])
+
+    assert format_dataset(np.ones((2, 2))).dtype == np.float32
+
+    # Data of other types keep their type.
+    assert format_dataset(np.ones((2, 2), dtype=bool)).dtype == bool
+
+
+def test_unknown_order_is_refused(set_params):
+    set_params([])
+
+    with pytest.raises(Exception, match="unknown dataset order"):
+        format_dataset(np.ones(2), "K")
+
+
+def write_data(file_name, rows):
+    """
+    Write a tab-separated data file with a header.
+
+    :param file_name: The file name.
+    :param rows: A list of rows of numbers.
+    :return: Nothing.
+    """
+
+    with open(file_name, "w") as f:
+        f.write("x0\tx1\ty\n")
+        for row in rows:
+            f.write("\t".join(str(v) for v in row) + "\n")
+
+
+def cached(directory):
+    """
+    :param directory: A temporary directory.
+    :return: The binary files of "data.txt" in its "cache" folder.
+    """
+
+    return [f for f in listdir(directory / "cache") if
+            f.startswith("data.txt")]
+
+
+def test_parsed_data_are_cached(set_params, tmp_path):
+    set_params(["--dataset_cache", "--dataset_cache_dir",
+                str(tmp_path / "cache")])
+
+    data = str(tmp_path / "data.txt")
+    write_data(data, [[1, 2, 3], [4, 5, 6]])
+
+    X, y = load_Xy(data, "\t", 1)
+    np.testing.assert_array_equal(X, [[1, 2], [4, 5]])
+    np.testing.assert_array_equal(y, [3, 6])
+
+    # Later loads are read-only memory maps of the binary files.
+    X, y = load_Xy(data, "\t", 1)
+    assert isinstance(X, np.memmap) and not X.flags['WRITEABLE']
+    assert len(cached(tmp_path)) == 2
+
+    # A data file which has changed is parsed again.
+    write_data(data, [[7, 8, 9], [1, 2, 3]])
+    utime(data, ns=(1, 1))
+
+    X, y = load_Xy(data, "\t", 1)
+    np.testing.assert_array_equal(X, [[7, 8], [1, 2]])
+    assert len(cached(tmp_path)) == 4
+
+
+def test_contents_are_verified(set_params, tmp_path):
+    set_params(["--dataset_cache", "--dataset_cache_dir",
+                str(tmp_path / "cache"), "--dataset_cache_verify"])
+
+    data = str(tmp_path / "data.txt")
+    write_data(data, [[1, 2, 3], [4, 5, 6]])
+    utime(data, ns=(1, 1))
+    load_Xy(data, "\t", 1)
+
+    # A change which keeps the size and modification time of the data file
+    # is only found by checking its contents.
+    write_data(data, [[4, 5, 6], [1, 2, 3]])
+    utime(data, ns=(1, 1))
+
+    X, y = load_Xy(data, "\t", 1)
+    np.testing.assert_array_equal(X, [[4, 5], [1, 2]])
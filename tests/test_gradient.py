@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from scipy.optimize import approx_fprime
+
+from utilities.fitness.compile_phenotype import get_function
+from utilities.fitness.error_metric import hinge, mae, mse, rmse
+from utilities.fitness.expression_dag import Unsupported
+from utilities.fitness.gradient import loss_and_gradient
+
+rng = np.random.RandomState(9)
+
+X = rng.rand(50, 3) + 0.5
+Y = rng.rand(50)
+C = rng.rand(3) + 0.3
+
+PHENOTYPES = [
+    "c[0]*x[:, 0] + c[1]",
+    "aq(x[:, 1], c[0]*x[:, 2]) - c[1]*c[2]",
+    "pdiv(c[0], x[:, 0] - c[1])",
+    "np.sin(c[0]*x[:, 1]) * np.exp(-c[1])",
+    "ppow(x[:, 0], c[0]) + psqrt(c[1] - x[:, 2]) + plog(c[2]*x[:, 0])",
+    "rlog(c[0] * x[:, 1]) + np.tanh(c[1]) ** 2 + c[2]",
+    "(c[0] - c[1]) / c[2] + x[:, 0]",
+    "c[0]*c[0] + x[:, 0]*c[0]",
+    "c[0]",
+]
+
+
+@pytest.mark.parametrize("loss", [mse, rmse, mae, hinge])
+@pytest.mark.parametrize("phenotype", PHENOTYPES)
+def test_gradient_matches_finite_differences(phenotype, loss):
+    y = np.sign(Y - 0.5) if loss is hinge else Y
+    f = get_function(phenotype)
+
+    value, gradient = loss_and_gradient(phenotype, X, y, C, loss)
+
+    assert np.isclose(value, loss(y, f(X, C)))
+
+    finite = approx_fprime(C, lambda c: loss(y, f(X, c)), 1e-7)
+    np.testing.assert_allclose(gradient, finite, rtol=1e-4, atol=1e-5)
+
+
+def test_unsupported_phenotype():
+    with pytest.raises(Unsupported):
+        loss_and_gradient("np.where(x[:, 0] > c[0], x[:, 1], c[1])", X, Y,
+                          C, mse)
@@ -0,0 +1,72 @@
+import re
+from multiprocessing import active_children, get_start_method
+
+import numpy as np
+import pytest
+
+from algorithm import island_model
+from algorithm.parameters import params
+from stats.stats import get_stats, stats
+
+ISLANDS = ["--search_loop", "island_model.search_loop", "--islands", "2",
+           "--population_size", "10", "--generations", "2",
+           "--migration_interval", "1", "--random_seed", "6"]
+
+
+def test_ring_topology(set_params):
+    set_params(ISLANDS + ["--islands", "3"])
+
+    assert [island_model.get_neighbours(i) for i in range(3)] == \
+        [[1], [2], [0]]
+
+
+def test_stats_cover_all_islands(set_params):
+    set_params(ISLANDS + ["--cache"])
+
+    individuals = island_model.search_loop()
+    get_stats(individuals, end=True)
+
+    assert len(individuals) == 20
+    assert params['POPULATION_SIZE'] == 10
+    assert stats['total_inds'] == 2 * 10 * 3
+    assert 0 < stats['unique_inds'] <= stats['total_inds']
+
+
+@pytest.mark.skipif(get_start_method() != "fork",
+                    reason="island processes must inherit the patch")
+def test_failed_island_stops_the_others(set_params, monkeypatch):
+    set_params(ISLANDS + ["--generations", "1000"])
+
+    migrate = island_model.migrate
+
+    def fail(index, individuals, inboxes):
+        if index == 1:
+            raise ValueError("migration failed")
+        return migrate(index, individuals, inboxes)
+
+    monkeypatch.setattr(island_model, "migrate", fail)
+
+    with pytest.raises(Exception, match="migration failed"):
+        island_model.search_loop()
+
+    assert not active_children()
+
+
+@pytest.mark.skipif(get_start_method() != "fork",
+                    reason="island processes must inherit the patch")
+def test_islands_seed_numpy(set_params, monkeypatch):
+    set_params(ISLANDS)
+
+    def draw(size):
+        raise ValueError("draw %d" % np.random.randint(2 ** 31))
+
+    monkeypatch.setattr(island_model, "initialisation", draw)
+
+    with pytest.raises(Exception) as error:
+        island_model.search_loop()
+
+    index, value = map(int, re.search(r"island (\d+).*draw (\d+)",
+                                      str(error.value), re.S).groups())
+
+    # Each island draws from numpy with its own seed.
+    assert value == np.random.RandomState(6 + index).randint(2 ** 31)
@@ -0,0 +1,139 @@
+import numpy as np
+import scipy.optimize
+
+from algorithm.parameters import params
+from representation.individual import Individual
+from utilities.fitness.optimize_constants import optimize_constants
+from utilities.stats import trackers
+
+
+class Ind(object):
+    """
+    A stand-in for an individual with a phenotype.
+    """
+
+    def __init__(self, phenotype):
+        self.phenotype = phenotype
+        self.runtime_error = False
+
+
+def record_starts(monkeypatch):
+    """
+    Record the initial constants of every optimisation.
+
+    :param monkeypatch: The monkeypatch fixture.
+    :return: A list, to which the initial constants are appended.
+    """
+
+    starts, minimize = [], scipy.optimize.minimize
+
+    def recording_minimize(fun, x0, *args, **kwargs):
+        starts.append(list(x0))
+        return minimize(fun, x0, *args, **kwargs)
+
+    monkeypatch.setattr(scipy.optimize, "minimize", recording_minimize)
+
+    return starts
+
+
+def training_data():
+    """
+    :return: The training inputs and outputs of the fitness function.
+    """
+
+    ff = params['FITNESS_FUNCTION']
+
+    return ff.training_in, ff.training_exp
+
+
+def test_constants_cache_shares_forms(set_params, monkeypatch):
+    set_params(["--parameters", "regression.txt", "--grammar_file",
+                "supervised_learning/supervised_learning_consts.bnf",
+                "--optimize_constants", "--constants_cache"])
+    starts = record_starts(monkeypatch)
+    x, y = training_data()
+
+    a = Ind("c[0]*x[:, 0] + c[1]")
+    b = Ind("c[3]*x[:, 0] + c[5]")
+
+    # Both phenotypes have the same form, which is optimised only once.
+    assert optimize_constants(x, y, a) == optimize_constants(x, y, b)
+    assert len(starts) == 1
+
+    np.testing.assert_array_equal(a.opt_consts, b.opt_consts)
+    assert a.phenotype == b.phenotype
+    assert "c[0]*x[:, 0] + c[1]" in trackers.constants_cache
+
+
+def test_warm_start_from_parent(set_params, monkeypatch):
+    set_params(["--parameters", "regression.txt", "--grammar_file",
+                "supervised_learning/supervised_learning_consts.bnf",
+                "--optimize_constants", "--constants_warm_start"])
+    starts = record_starts(monkeypatch)
+    x, y = training_data()
+
+    parent = Ind("c[0]*x[:, 0] + c[1]")
+    optimize_constants(x, y, parent)
+
+    # Children inherit the optimised constants of their parent, and of
+    # their grandparent if their parent has not been evaluated.
+    child, grandchild = Ind("c[0]*x[:, 1] + c[1]"), Ind("c[0]*x[:, 2]")
+    Individual.inherit(child, parent)
+    Individual.inherit(grandchild, child)
+    assert grandchild.parent_consts is parent.opt_consts
+
+    optimize_constants(x, y, child)
+    assert starts[-1] == list(parent.opt_consts)
+
+    # The constants of the parent are only used if they fit.
+    optimize_constants(x, y, grandchild)
+    assert starts[-1] == [0.0]
+
+
+def test_top_k_optimises_only_the_best_forms(set_params, monkeypatch):
+    set_params(["--parameters", "regression.txt", "--grammar_file",
+                "supervised_learning/supervised_learning_consts.bnf",
+                "--optimize_constants", "--constants_top_k", "2"])
+    starts = record_starts(monkeypatch)
+    x, y = training_data()
+
+    phenotypes = ["c[0]*x[:, 0] + x[:, 1]", "c[0]*x[:, 1] + x[:, 2]",
+                  "c[0]*x[:, 2] + x[:, 3]", "c[0]*x[:, 3] + x[:, 4]"]
+
+    # The fitness of each form at its initial constants.
+    initial = [optimize_constants(x, y, Ind(p), False) for p in phenotypes]
+    best = sorted(np.argsort(initial)[:2])
+
+    copy = Ind("c[1]*x[:, 0] + x[:, 1]")
+    individuals = [Ind(p) for p in phenotypes] + [copy]
+    fitnesses = params['FITNESS_FUNCTION'].optimize_batch(individuals)
+
+    # Only the two best forms are optimised, and the copy of the first form
+    # shares its constants.
+    assert len(starts) == 2
+    assert fitnesses[-1] == fitnesses[0]
+    assert copy.phenotype == individuals[0].phenotype
+
+    for i, ind in enumerate(individuals[:-1]):
+        if i in best:
+            assert fitnesses[i] < initial[i]
+            assert list(ind.opt_consts) != [0.0]
+
+        else:
+            # Forms which are not optimised keep their initial constants.
+            assert fitnesses[i] == initial[i]
+            assert list(ind.opt_consts) == [0.0]
+
+
+def test_time_budget(set_params, monkeypatch):
+    set_params(["--parameters", "regression.txt", "--grammar_file",
+                "supervised_learning/supervised_learning_consts.bnf",
+                "--optimize_constants", "--constants_time_budget", "0"])
+    starts = record_starts(monkeypatch)
+
+    individuals = [Ind("c[0]*x[:, 0]"), Ind("c[0]*x[:, 1]")]
+    params['FITNESS_FUNCTION'].optimize_batch(individuals)
+
+    # Forms are scored, but none are optimised.
+    assert starts == []
+    assert [list(ind.opt_consts) for ind in individuals] == [[0.0], [0.0]]
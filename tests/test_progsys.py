@@ -0,0 +1,76 @@
+import sys
+
+import pytest
+
+from algorithm.parameters import params
+from operators.initialisation import initialisation
+
+
+class Ind(object):
+    """
+    A stand-in for an individual with a phenotype.
+    """
+
+    def __init__(self, phenotype):
+        self.phenotype = phenotype
+
+
+@pytest.fixture
+def progsys(set_params):
+    """
+    Set up a program synthesis problem, and return a function which starts
+    its fitness function with the given number of cores. The evaluation
+    processes are stopped at the end of the test.
+    """
+
+    set_params(["--parameters", "progsys.txt", "--random_seed", "5"])
+    started = []
+
+    def start(cores):
+        from fitness.progsys import progsys
+
+        params['MULTICORE'], params['CORES'] = cores > 1, cores
+        started.append(progsys())
+
+        return started[-1]
+
+    yield start
+
+    for ff in started:
+        for process in ff.evals:
+            process.stdin.close()
+            process.wait()
+
+
+def test_pool_matches_single_evaluator(progsys):
+    phenotypes = [ind.phenotype for ind in initialisation(20)
+                  if not ind.invalid]
+    individuals = [Ind(p) for p in phenotypes]
+
+    single, pool = progsys(1), progsys(3)
+    assert len(pool.evals) == 3
+
+    for dist in ["training", "test"]:
+        fitnesses = single.evaluate_batch(individuals, dist=dist)
+
+        assert pool.evaluate_batch(individuals, dist=dist) == fitnesses
+        assert [single(ind, dist=dist) for ind in individuals[:3]] == \
+            fitnesses[:3]
+
+    assert len(set(fitnesses)) > 1
+
+
+def test_exited_evaluator_is_restarted(progsys):
+    ff = progsys(1)
+    process = ff.evals[0]
+
+    # A program which kills the evaluation process, and then its own worker
+    # within it.
+    ind = Ind("import os, signal\n"
+              "os.kill(os.getppid(), signal.SIGKILL)\n"
+              "os._exit(1)")
+    ff.format_program = lambda phenotype, header, footer: phenotype
+
+    assert ff.evaluate_batch([ind]) == [sys.maxsize]
+    assert ff.evals[0] is not process
+    assert ff.evaluate_batch([Ind("quality = 3")]) == [3]
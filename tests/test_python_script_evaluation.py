@@ -0,0 +1,69 @@
+import json
+import sys
+from subprocess import PIPE, Popen
+from time import perf_counter
+
+import pytest
+
+# As in scripts/python_script_evaluation.py, which is not imported, since it
+# sets up logging to a file when it is.
+GRACE = 1.0
+TIMEOUT_MESSAGE = "Timeout occurred."
+
+
+@pytest.fixture
+def evaluate():
+    """
+    Start an evaluation process, and return a function which runs a script
+    in it. The process is stopped at the end of the test.
+    """
+
+    process = Popen([sys.executable, "scripts/python_script_evaluation.py"],
+                    stdin=PIPE, stdout=PIPE)
+
+    def run(script, variables=(), timeout=0.5):
+        message = json.dumps({'script': script, 'timeout': timeout,
+                              'variables': list(variables)})
+        process.stdin.write((message + "\n").encode())
+        process.stdin.flush()
+
+        return json.loads(process.stdout.readline().decode())
+
+    yield run
+
+    process.stdin.close()
+    process.wait()
+
+
+WORKER_PID = "import os\npid = os.getpid()"
+
+
+@pytest.mark.parametrize("script", [
+    "while True:\n  pass",
+    # Scripts cannot catch the timeout.
+    "while True:\n  try:\n    while True:\n      pass\n"
+    "  except Exception:\n    pass",
+    "import re\nre.match('(a+)+b', 'a' * 40)",
+    # Nor swallow it with a bare except, and carry on.
+    "while True:\n  try:\n    while True:\n      pass\n"
+    "  except:\n    pass",
+    "try:\n  while True:\n    pass\nexcept:\n  pass",
+])
+def test_timeout_keeps_worker(evaluate, script):
+    pid = evaluate(WORKER_PID, ["pid"])['pid']
+
+    start = perf_counter()
+    assert evaluate(script) == {'exception': TIMEOUT_MESSAGE}
+    assert perf_counter() - start < 0.5 + GRACE
+
+    # The script is interrupted in the worker, which is not replaced.
+    assert evaluate(WORKER_PID, ["pid"])['pid'] == pid
+
+
+def test_results(evaluate):
+    assert evaluate("x = {1, 2}\ny = 3", ["x", "y", "z"]) == \
+        {'x': [1, 2], 'y': 3}
+
+    # A script which defines nothing is not a timeout.
+    assert evaluate("pass", ["x"]) == {}
+    assert 'ZeroDivisionError' in evaluate("1 / 0")['exception']
@@ -0,0 +1,212 @@
+import gc
+import re
+from itertools import count
+
+import numpy as np
+import pytest
+
+import fitness.regex.testing.RegexTestGenerator as TestGen
+from algorithm.parameters import params
+from fitness.regex.RegexEval import RegexEval
+from fitness.regex.testing import RegexTimer
+from fitness.regex.testing.RegexTest import RegexTest
+from stats.stats import stats
+
+
+class Ind(object):
+    """
+    A stand-in for an individual with a phenotype.
+    """
+
+    def __init__(self, phenotype):
+        self.phenotype = phenotype
+
+
+def make_test_case(search_string, regex_string):
+    """
+    :param search_string: The search string of the test case.
+    :param regex_string: The regex which finds the desired matches.
+    :return: A test case.
+    """
+
+    test_case = RegexTest(search_string)
+    test_case.matches = list(re.finditer(regex_string, search_string))
+
+    return test_case
+
+
+@pytest.fixture
+def regex_eval(set_params, monkeypatch):
+    """
+    A regex fitness function with a fixed test suite, whose workers are
+    stopped at the end of the test.
+    """
+
+    set_params([])
+
+    monkeypatch.setattr(RegexEval, "seed_regex", Ind("a+b"))
+    monkeypatch.setattr(RegexEval, "test_cases",
+                        [make_test_case("xaab ab b", "a+b"),
+                         make_test_case("a" * 28 + "c", "a+b")])
+    monkeypatch.setattr(RegexEval, "workers", None)
+
+    yield RegexEval()
+
+    for process, connection in RegexEval.workers or []:
+        process.terminate()
+        process.join()
+        connection.close()
+
+
+def errors(fitnesses):
+    """
+    :param fitnesses: A list of fitnesses.
+    :return: The functionality errors of the fitnesses, without the time.
+    """
+
+    return [f if np.isnan(f) else int(f) for f in fitnesses]
+
+
+@pytest.mark.parametrize("cores", [None, 3])
+def test_pool_matches_serial(regex_eval, cores):
+    if cores:
+        params['MULTICORE'], params['CORES'] = True, cores
+
+    phenotypes = ["a+b", "a", "b", "(", "ab", "x", "a*b"]
+
+    fitnesses = regex_eval.evaluate_batch([Ind(p) for p in phenotypes])
+    serial = [regex_eval.call_fitness(p) for p in phenotypes]
+
+    assert len(RegexEval.workers) == (cores or 1)
+    np.testing.assert_array_equal(errors(fitnesses), errors(serial))
+    assert errors(fitnesses)[0] == 0
+
+
+def test_timeout_replaces_worker(regex_eval, monkeypatch):
+    monkeypatch.setattr(RegexEval, "timeout", 0.5)
+
+    regex_eval.evaluate_batch([Ind("a+b")])
+    pid = RegexEval.workers[0][0].pid
+
+    # Catastrophic backtracking on the second test case.
+    fitnesses = regex_eval.evaluate_batch([Ind("(a+)+b"), Ind("a+b")])
+
+    assert np.isnan(fitnesses[0]) and errors(fitnesses)[1] == 0
+    assert stats['runtime_error'] == 1
+
+    # A new worker has taken the place of the one which timed out.
+    assert RegexEval.workers[0][0].pid != pid
+    assert RegexEval.workers[0][0].is_alive()
+
+
+def spans(test_cases):
+    """
+    :param test_cases: A list of test cases.
+    :return: The search strings of the test cases and the spans of their
+    matches.
+    """
+
+    return [(test_case.search_string,
+             [match.span() for match in test_case.matches])
+            for test_case in test_cases]
+
+
+def test_test_suite_cache(set_params, tmp_path, monkeypatch):
+    set_params(["--regex_test_cache", "--regex_test_cache_dir",
+                str(tmp_path)])
+
+    generated, generate = [], TestGen.generate_test_suite
+
+    def recording_generate(regex_string, processes=1):
+        generated.append(regex_string)
+        return generate(regex_string, processes)
+
+    monkeypatch.setattr(TestGen, "generate_test_suite", recording_generate)
+
+    regex_string = r"\d+\.\d+"
+    test_cases = TestGen.get_test_suite(regex_string)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # Later runs load the suite, with the same matches, instead of
+    # generating it again.
+    assert spans(TestGen.get_test_suite(regex_string)) == spans(test_cases)
+    assert generated == [regex_string]
+
+    # Other regexes get their own suites.
+    TestGen.get_test_suite(r"\d+")
+    assert generated == [regex_string, r"\d+"]
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_parallel_test_suite(set_params):
+    set_params([])
+
+    regex_string = r"\d+\.\d+"
+
+    assert spans(TestGen.generate_test_suite(regex_string, 2)) == \
+        spans(TestGen.generate_test_suite(regex_string))
+
+
+def fake_clock(monkeypatch, durations):
+    """
+    Replace the clock of the regex timer with one under which successive
+    runs take the given durations.
+
+    :param monkeypatch: The monkeypatch fixture.
+    :param durations: A function of the number of the run, which returns
+    its duration in nanoseconds.
+    :return: Nothing.
+    """
+
+    ticks, now = count(), [0]
+
+    def perf_counter_ns():
+        tick = next(ticks)
+        # Every run reads the clock twice, at its start and at its end.
+        if tick % 2:
+            now[0] += durations(tick // 2)
+        return now[0]
+
+    monkeypatch.setattr(RegexTimer, "perf_counter_ns", perf_counter_ns)
+
+
+def test_steady_runs_stop_early(monkeypatch):
+    fake_clock(monkeypatch, lambda run: 500)
+    runs = []
+
+    matches, times = RegexTimer.time_runs(
+        lambda s: runs.append(s) or iter([s]), "a", 100, None)
+
+    # The warm-up run is not timed, and runs stop as soon as the median is
+    # known precisely enough.
+    assert len(runs) == RegexTimer.WARMUP_RUNS + RegexTimer.MIN_RUNS
+    assert times == [400] * RegexTimer.MIN_RUNS
+    assert matches == ["a"]
+
+
+def test_noisy_runs_stop_at_max_runs(monkeypatch):
+    # Times spread evenly between 1000 and 2000 ns.
+    fake_clock(monkeypatch, lambda run: 1000 + run * 389 % 1000)
+
+    matches, times = RegexTimer.time_runs(lambda s: iter([]), "a", 0, None)
+
+    assert len(times) == RegexTimer.MAX_RUNS
+    assert times == sorted(times)
+
+
+def test_time_regex_test_case():
+    gc_enabled = gc.isenabled()
+    test_case = make_test_case("xaab ab b", "a+b")
+    compiled_regex = re.compile("a+b")
+
+    time, matches, runs, result_case = \
+        RegexTimer.time_regex_test_case(compiled_regex, test_case)
+
+    assert [m.span() for m in matches] == [(1, 4), (5, 7)]
+    assert RegexTimer.MIN_RUNS <= runs <= RegexTimer.MAX_RUNS
+    assert time >= 0 and result_case is test_case
+    assert gc.isenabled() == gc_enabled
+
+    # With no time left, a single run is timed.
+    assert RegexTimer.time_regex_test_case(compiled_regex, test_case,
+                                           0)[2] == 1
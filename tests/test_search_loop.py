@@ -0,0 +1,100 @@
+import pytest
+
+from algorithm import search_loop
+from algorithm.parameters import params
+from algorithm.search_loop import replace_async, search_loop_async
+from operators.initialisation import initialisation
+from utilities.stats import trackers
+
+
+def scored(fitnesses):
+    """
+    :param fitnesses: A list of fitnesses.
+    :return: A population of individuals with the given fitnesses.
+    """
+
+    individuals = initialisation(len(fitnesses))
+
+    for ind, fitness in zip(individuals, fitnesses):
+        ind.fitness = fitness
+
+    return individuals
+
+
+def test_steady_state_replaces_worst(set_params):
+    set_params(["--replacement", "steady_state", "--random_seed", "5"])
+
+    individuals = scored([0.3, 0.9, 0.1, 0.5])
+    child = scored([0.7])[0]
+
+    replace_async(child, individuals)
+
+    # Fitnesses are errors, so 0.9 is the worst.
+    assert [ind.fitness for ind in individuals] == [0.3, 0.7, 0.1, 0.5]
+
+
+def test_generational_replaces_oldest_non_elite(set_params):
+    set_params(["--search_loop", "search_loop_async", "--elite_size", "1",
+                "--random_seed", "5"])
+
+    individuals = scored([0.1, 0.9, 0.3, 0.5])
+
+    for fitness in [0.7, 0.8]:
+        replace_async(scored([fitness])[0], individuals)
+
+    # The elite (0.1) survives, the two oldest others are replaced.
+    assert [ind.fitness for ind in individuals] == [0.1, 0.5, 0.7, 0.8]
+
+
+def record_events(monkeypatch):
+    """
+    Record the order in which children are bred and added to the
+    population by the asynchronous search loop.
+
+    :param monkeypatch: The monkeypatch fixture.
+    :return: A list, to which "breed" and "replace" events are appended.
+    """
+
+    events = []
+    breed, replace = search_loop.breed, search_loop.replace_async
+
+    def recording_breed(individuals):
+        events.append("breed")
+        return breed(individuals)
+
+    def recording_replace(child, individuals):
+        events.append("replace")
+        return replace(child, individuals)
+
+    monkeypatch.setattr(search_loop, "breed", recording_breed)
+    monkeypatch.setattr(search_loop, "replace_async", recording_replace)
+
+    return events
+
+
+@pytest.mark.parametrize("replacement", ["generational", "steady_state"])
+def test_async_run(set_params, monkeypatch, replacement):
+    set_params(["--search_loop", "search_loop_async", "--replacement",
+                replacement, "--population_size", "20", "--generations",
+                "3", "--random_seed", "5"])
+    events = record_events(monkeypatch)
+
+    individuals = search_loop_async()
+
+    # Each pair of children is added to the population before the next
+    # pair is bred from it.
+    assert events.count("replace") == 60
+    assert events[:4] == ["breed", "replace", "replace", "breed"]
+    assert "breed breed" not in " ".join(events)
+
+    assert len(individuals) == params['POPULATION_SIZE']
+    assert trackers.best_ever.fitness <= min(ind.fitness for ind in
+                                             individuals)
+
+
+def test_async_refuses_other_replacement(set_params):
+    set_params(["--search_loop", "search_loop_async", "--replacement",
+                "nsga2_replacement"])
+
+    with pytest.raises(Exception, match="generational and steady_state"):
+        search_loop_async()
@@ -0,0 +1,51 @@
+import pickle
+
+import numpy as np
+
+from algorithm.parameters import params
+from utilities.fitness.shared_array import SharedArray
+
+
+def test_pickled_array_attaches_to_the_same_memory():
+    array = np.asfortranarray(np.arange(5000.0).reshape(1000, 5))
+    shared = SharedArray(array)
+
+    try:
+        data = pickle.dumps(shared)
+
+        # The array is only usable while the block is attached.
+        copy = pickle.loads(data)
+        attached = copy.array
+
+        # Only the name, shape and type of the block are pickled.
+        assert len(data) < 1000
+
+        np.testing.assert_array_equal(attached, array)
+        assert attached.flags['F_CONTIGUOUS']
+        assert not attached.flags['WRITEABLE']
+
+        shared.array[0, 0] = -1.0
+        assert attached[0, 0] == -1.0
+
+    finally:
+        shared.unlink()
+
+
+def test_workers_get_the_shared_datasets(set_params):
+    set_params(["--parameters", "regression.txt"])
+
+    ff = params['FITNESS_FUNCTION']
+    size = len(pickle.dumps(ff))
+
+    ff.share_data()
+
+    try:
+        data = pickle.dumps(ff)
+        worker = pickle.loads(data)
+
+        assert len(data) < size
+        np.testing.assert_array_equal(worker.training_in, ff.training_in)
+        np.testing.assert_array_equal(worker.test_exp, ff.test_exp)
+
+    finally:
+        ff.unlink_data()
@@ -0,0 +1,48 @@
+from multiprocessing import Process
+
+from utilities.stats.shared_cache import SharedCache, SharedCacheServer
+
+
+def test_one_worker_evaluates_each_key():
+    server = SharedCacheServer(None, "lru")
+
+    # The first worker to claim a key evaluates it, others wait for it.
+    assert server.claim("x", 1) == (None, 1)
+    assert server.claim("x", 2) == (None, 1)
+
+    # Only the responsible worker can give up the key.
+    server.release("x", 2)
+    assert server.claim("x", 2) == (None, 1)
+
+    server.publish("x", {'fitness': 1.0})
+    assert server.claim("x", 2) == ({'fitness': 1.0}, None)
+
+
+def test_released_key_is_taken_over():
+    server = SharedCacheServer(None, "lru")
+
+    server.claim("x", 1)
+    server.release("x", 1)
+
+    assert server.claim("x", 2) == (None, 2)
+
+
+def test_key_of_dead_worker_is_taken_over():
+    worker = Process(target=int)
+    worker.start()
+    worker.join()
+
+    cache = SharedCache()
+
+    try:
+        # The worker died while it was responsible for the key.
+        cache.server.claim("x", worker.pid)
+
+        assert cache.claim("x") == (None, True)
+        assert cache.wait("x") is None
+
+        cache.publish("x", {'fitness': 2.0})
+        assert cache.claim("x") == ({'fitness': 2.0}, False)
+
+    finally:
+        cache.shutdown()
@@ -0,0 +1,84 @@
+import numpy as np
+
+from algorithm.parameters import params
+from algorithm.search_loop import search_loop
+from operators.initialisation import initialisation
+from stats.stats import get_stats
+from utilities.stats import trackers
+
+
+def full_errors(individuals):
+    """
+    Score individuals on the full training data.
+
+    :param individuals: A list of individuals.
+    :return: A list of their errors.
+    """
+
+    ff = params['FITNESS_FUNCTION']
+    ff.set_context(None)
+
+    return [ff(ind) for ind in individuals]
+
+
+def test_racing_run_rescores_best_ever(set_params):
+    set_params(["--parameters", "regression.txt", "--subsample", "racing",
+                "--population_size", "30", "--generations", "3",
+                "--random_seed", "1"])
+
+    individuals = search_loop()
+
+    # Race the final population against a threshold of zero, so that every
+    # race is stopped after the first chunk of the training data and every
+    # fitness is only a lower bound on the error.
+    ff = params['FITNESS_FUNCTION']
+    ff.set_context(("racing", 0.0))
+
+    for ind in individuals:
+        if not ind.invalid:
+            ind.fitness = ff(ind)
+
+    trackers.best_ever = max(individuals)
+
+    get_stats(individuals, end=True)
+
+    best = trackers.best_ever
+
+    # The best individual has been scored on all training rows, and no
+    # individual of the final population is better on them.
+    assert best.fitness == full_errors([best])[0]
+
+    errors = [e for e in full_errors(individuals) if not np.isnan(e)]
+    assert best.fitness <= min(errors)
+
+
+def test_stopped_individuals_never_beat_full_ones(set_params):
+    set_params(["--parameters", "regression.txt", "--subsample", "racing",
+                "--random_seed", "2"])
+
+    individuals = [ind for ind in initialisation(60) if not ind.invalid]
+    errors = np.array(full_errors(individuals), dtype=float)
+
+    ff = params['FITNESS_FUNCTION']
+    threshold = float(np.nanmedian(errors))
+    ff.set_context(("racing", threshold))
+
+    stopped, full = [], []
+
+    for ind, error in zip(individuals, errors):
+        raced = ff(ind)
+
+        if np.isnan(error):
+            continue
+
+        if np.isclose(raced, error):
+            full.append(raced)
+
+        else:
+            # A race is only stopped once the lower bound on the error has
+            # reached the threshold.
+            assert threshold <= raced < error
+            stopped.append(raced)
+
+    assert stopped and full
+    assert all(f < s for f in full if f < threshold for s in stopped)